@@ -0,0 +1,64 @@
+"""Сравнение сериализации ответа get_all: jsonable_encoder + JSONResponse против FastJSONResponse (orjson).
+
+Запуск: python -m backend.benchmarks.bench_json_response [--users 10000] [--repeat 50]
+"""
+
+import argparse
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from backend.core.adapters.json_response import FastJSONResponse
+
+
+def make_users(count: int) -> list[dict]:
+    """Данные в том виде, в каком их возвращает репозиторий чтения (PUBLIC_USER_COLUMNS)."""
+
+    return [
+        {'id': number, 'tag': f'@user{number}', 'email': f'user{number}@mail.ru', 'role_id': 1}
+        for number in range(count)
+    ]
+
+
+def stdlib_response(users_data: list[dict]) -> bytes:
+    return JSONResponse(content=jsonable_encoder(users_data)).body
+
+
+def orjson_response(users_data: list[dict]) -> bytes:
+    return FastJSONResponse(content=users_data).body
+
+
+def measure(name: str, render, users_data: list[dict], repeat: int) -> float:
+    timings = []
+
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        body = render(users_data)
+        timings.append(time.perf_counter() - started_at)
+
+    median = statistics.median(timings)
+    print(
+        f'{name:>26}: {len(body) / 1024:.0f} KiB, median {median * 1000:.2f}ms, '
+        f'{1 / median:.0f} payloads/s, {len(body) / median / 2 ** 20:.0f} MiB/s'
+    )
+
+    return median
+
+
+def main(users: int, repeat: int):
+    users_data = make_users(users)
+
+    stdlib_time = measure('jsonable_encoder + json', stdlib_response, users_data, repeat)
+    orjson_time = measure('FastJSONResponse (orjson)', orjson_response, users_data, repeat)
+    print(f'speedup: x{stdlib_time / orjson_time:.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=50)
+    arguments = parser.parse_args()
+
+    main(arguments.users, arguments.repeat)
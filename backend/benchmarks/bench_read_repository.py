@@ -0,0 +1,76 @@
+"""Сравнение чтения пользователей через ORM-сущности + to_dict и через репозиторий чтения.
+
+Запуск: python -m backend.benchmarks.bench_read_repository [--rows 100000] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from backend.core.service_layer.unit_of_work import SqlAlchemyUnitOfWork, make_session_factory
+from backend.users.orm.models import Users
+
+
+async def fill_users(engine, rows: int):
+    async with engine.begin() as connection:
+        await connection.run_sync(Users.metadata.create_all)
+        await connection.execute(
+            insert(Users),
+            [
+                {'tag': f'@{number}', 'email': f'{number}@mail.ru', 'password': 'x' * 60, 'role_id': 1}
+                for number in range(rows)
+            ],
+        )
+
+
+async def orm_to_dict(uow):
+    async with uow:
+        users = await uow.users.get_all()
+
+        return [user.to_dict() for user in users]
+
+
+async def read_repository(uow):
+    async with uow:
+        return await uow.users_view.get_all()
+
+
+async def measure(name: str, read, uow, repeat: int):
+    timings = []
+
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        users_data = await read(uow)
+        timings.append(time.perf_counter() - started_at)
+
+    print(f'{name:>16}: {len(users_data)} rows, median {statistics.median(timings):.3f}s, best {min(timings):.3f}s')
+
+    return statistics.median(timings)
+
+
+async def main(rows: int, repeat: int):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f'sqlite+aiosqlite:///{Path(directory) / "bench.db"}')
+        await fill_users(engine, rows)
+        uow = SqlAlchemyUnitOfWork(session_factory=make_session_factory(engine), replica_router=None)
+
+        orm_time = await measure('orm + to_dict', orm_to_dict, uow, repeat)
+        view_time = await measure('read repository', read_repository, uow, repeat)
+        print(f'speedup: x{orm_time / view_time:.1f}')
+
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    arguments = parser.parse_args()
+
+    asyncio.run(main(arguments.rows, arguments.repeat))
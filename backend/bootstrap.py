@@ -1,15 +1,40 @@
 import inspect
-from typing import Callable
+from functools import partial, update_wrapper
+from typing import Callable, Optional, Sequence
 
+from backend.config import settings
 from backend.core.adapters import redis_eventpublisher
+from backend.core.adapters.cache import AbstractCache, build_cache
+from backend.core.adapters.local_cache import StaleWhileRevalidateCache
 from backend.core.adapters.notifications import AbstractNotifications
-from backend.core.service_layer.unit_of_work import AbstractUnitOfWork, SqlAlchemyUnitOfWork
-from backend.users.adapters.notifications import EmailNotifications
+from backend.core.adapters.rate_limit import build_rate_limiter
+from backend.core.adapters.worker_pool import WorkerPool
+from backend.core.metrics import metrics_registry
+from backend.core.service_layer.routing import ReplicaRouter
+from backend.core.service_layer.unit_of_work import DEFAULT_REPLICA_ROUTER, AbstractUnitOfWork, SqlAlchemyUnitOfWork
+from backend.users.adapters.availability import UserAvailabilityFilter, build_user_availability_filter
+from backend.users.adapters.login_throttle import LoginThrottle
+from backend.users.adapters.notifications import get_email_notifications
+from backend.users.adapters.passwords import PasswordHasher
+from backend.users.adapters.token_cache import VerifiedTokenCache
+from backend.users.adapters.token_store import AbstractTokenStore, build_token_store
 from backend.core.service_layer import messagebus
-from backend.users.service_layer.handlers import COMMAND_HANDLERS, EVENT_HANDLERS, QUERY_HANDLERS
+from backend.core.service_layer.middleware import (
+    InFlightMiddleware,
+    Middleware,
+    SampledMiddleware,
+    SlowMessageMiddleware,
+    TimingMiddleware,
+)
+from backend.users.service_layer.handlers import COMMAND_HANDLERS, EVENT_HANDLERS, QUERY_HANDLERS, WORKER_EVENT_HANDLERS
 
 
 def inject_dependencies(handler, dependencies):
+    """Связывает обработчик с зависимостями по именам параметров.
+
+    UoW не связывается заранее: шина создаёт его на каждое сообщение и передаёт вторым аргументом.
+    """
+
     params = inspect.signature(handler).parameters
     deps = {
         name: dependency
@@ -17,20 +42,127 @@ def inject_dependencies(handler, dependencies):
         if name in params
     }
 
-    return lambda message: handler(message, **deps)
+    if 'uow' in params:
+        def injected(message, uow):
+            return handler(message, uow=uow, **deps)
+    else:
+        def injected(message, uow):
+            return handler(message, **deps)
+
+    # Имя обработчика нужно middlewares, чтобы метрики событий различались по обработчикам.
+    return update_wrapper(injected, handler)
+
+
+def build_middlewares() -> list[Middleware]:
+    """Цепочка middlewares шины по настройкам MESSAGEBUS_*. Метрики звеньев регистрируются в реестре."""
+
+    timing = TimingMiddleware()
+    in_flight = InFlightMiddleware()
+    slow = SlowMessageMiddleware(
+        default_threshold=settings.MESSAGEBUS_SLOW_MESSAGE_THRESHOLD,
+        thresholds=settings.get_messagebus_slow_message_thresholds,
+    )
+    metrics_registry.register('messagebus_timing', timing.metrics_snapshot)
+    metrics_registry.register('messagebus_in_flight', in_flight.metrics_snapshot)
+    metrics_registry.register('messagebus_slow_messages', slow.metrics_snapshot)
+
+    return [
+        in_flight,
+        SampledMiddleware(timing, rate=settings.MESSAGEBUS_TIMING_SAMPLE_RATE),
+        slow,
+    ]
 
 
 def bootstrap(
-    uow: AbstractUnitOfWork = SqlAlchemyUnitOfWork(),
+    uow_factory: Callable[[], AbstractUnitOfWork] = None,
     notifications: AbstractNotifications = None,
     publish: Callable = redis_eventpublisher.publish,
+    cache: AbstractCache = None,
+    current_user_cache: StaleWhileRevalidateCache = None,
+    availability_filter: UserAvailabilityFilter = None,
+    password_hasher: PasswordHasher = None,
+    token_cache: VerifiedTokenCache = None,
+    token_store: AbstractTokenStore = None,
+    login_throttle: LoginThrottle = None,
+    middlewares: Optional[Sequence[Middleware]] = None,
+    coalesced_queries: Optional[Sequence[str]] = None,
+    replica_router: Optional[ReplicaRouter] = DEFAULT_REPLICA_ROUTER,
 ) -> messagebus.MessageBus:
-    redis_eventpublisher.start_redis()
+    if cache is None:
+        cache = build_cache(
+            settings.USERS_CACHE_BACKEND,
+            max_size=settings.USERS_CACHE_MAX_SIZE,
+            timeout=settings.USERS_CACHE_TIMEOUT,
+        )
+
+    if cache is not None:
+        metrics_registry.register('users_cache', cache.stats.snapshot)
+
+    if current_user_cache is None:
+        current_user_cache = StaleWhileRevalidateCache(
+            max_size=settings.USERS_ME_CACHE_MAX_SIZE,
+            ttl=settings.USERS_ME_CACHE_TTL,
+            stale_ttl=settings.USERS_ME_CACHE_STALE_TTL,
+        )
+
+    metrics_registry.register('current_user_cache', current_user_cache.metrics_snapshot)
+
+    if token_cache is None:
+        token_cache = VerifiedTokenCache(max_size=settings.USERS_TOKEN_CACHE_MAX_SIZE)
+
+    metrics_registry.register('verified_token_cache', token_cache.metrics_snapshot)
+
+    if token_store is None:
+        token_store = build_token_store(settings.USERS_TOKEN_STORE_BACKEND)
+
+    if login_throttle is None:
+        login_throttle = LoginThrottle(
+            limiter=build_rate_limiter(settings.USERS_LOGIN_RATE_LIMIT_BACKEND),
+            per_email=settings.USERS_LOGIN_LIMIT_PER_EMAIL,
+            per_ip=settings.USERS_LOGIN_LIMIT_PER_IP,
+            window=settings.USERS_LOGIN_LIMIT_WINDOW,
+        )
+
+    metrics_registry.register('login_throttle', login_throttle.metrics_snapshot)
+
+    if availability_filter is None:
+        availability_filter = build_user_availability_filter(settings.USERS_AVAILABILITY_FILTER_BACKEND)
+
+    metrics_registry.register('users_availability_filter', availability_filter.metrics_snapshot)
+
+    if password_hasher is None:
+        password_hasher = PasswordHasher(WorkerPool(
+            kind=settings.USERS_PASSWORD_POOL_KIND,
+            max_workers=settings.USERS_PASSWORD_POOL_WORKERS,
+            max_queue=settings.USERS_PASSWORD_POOL_MAX_QUEUE,
+        ))
+
+    metrics_registry.register('password_hashing_pool', password_hasher.metrics_snapshot)
+
+    if uow_factory is None:
+        uow_factory = partial(SqlAlchemyUnitOfWork, cache=cache, replica_router=replica_router)
 
     if notifications is None:
-        notifications = EmailNotifications()
+        notifications = get_email_notifications()
+        metrics_registry.register('email_notifications', notifications.metrics_snapshot)
+
+    if middlewares is None:
+        middlewares = build_middlewares()
+
+    if coalesced_queries is None:
+        coalesced_queries = settings.get_messagebus_coalesced_queries
 
-    dependencies = {'uow': uow, 'notifications': notifications, 'publish': publish}
+    dependencies = {
+        'notifications': notifications,
+        'publish': publish,
+        'cache': cache,
+        'current_user_cache': current_user_cache,
+        'availability_filter': availability_filter,
+        'password_hasher': password_hasher,
+        'token_cache': token_cache,
+        'token_store': token_store,
+        'login_throttle': login_throttle,
+    }
     injected_event_handlers = {
         event_type: [
             inject_dependencies(handler, dependencies)
@@ -38,6 +170,13 @@ def bootstrap(
         ]
         for event_type, event_handlers in EVENT_HANDLERS.items()
     }
+    injected_worker_event_handlers = {
+        event_type: [
+            inject_dependencies(handler, dependencies)
+            for handler in event_handlers
+        ]
+        for event_type, event_handlers in WORKER_EVENT_HANDLERS.items()
+    }
     injected_command_handlers = {
         command_type: inject_dependencies(handler, dependencies)
         for command_type, handler in COMMAND_HANDLERS.items()
@@ -47,9 +186,18 @@ def bootstrap(
         for command_type, handler in QUERY_HANDLERS.items()
     }
 
-    return messagebus.MessageBus(
-        uow=uow,
+    bus = messagebus.MessageBus(
+        uow_factory=uow_factory,
         event_handlers=injected_event_handlers,
         command_handlers=injected_command_handlers,
         query_handlers=injected_query_handlers,
+        handler_timeout=settings.MESSAGEBUS_HANDLER_TIMEOUT,
+        max_concurrent_handlers=settings.MESSAGEBUS_MAX_CONCURRENT_HANDLERS,
+        middlewares=middlewares,
+        coalesced_queries=[query_type for query_type in QUERY_HANDLERS if query_type.__name__ in coalesced_queries],
+        worker_event_handlers=injected_worker_event_handlers,
+        replica_router=replica_router,
     )
+    metrics_registry.register('messagebus', bus.metrics_snapshot)
+
+    return bus
@@ -19,15 +19,65 @@ class ProjectSettings(BaseSettings):
     POSTGR_DB_PASS: str
     POSTGR_DB_NAME: str
 
+    POSTGR_POOL_ENABLED: bool = True
+    POSTGR_POOL_SIZE: int = 5
+    POSTGR_POOL_MAX_OVERFLOW: int = 10
+    POSTGR_POOL_RECYCLE: int = 1800
+    POSTGR_POOL_PRE_PING: bool = True
+    POSTGR_POOL_TIMEOUT: float = 30.0
+
+    POSTGR_REPLICA_URLS: str = ''
+    POSTGR_REPLICA_STRATEGY: str = 'round_robin'
+    POSTGR_REPLICA_MAX_LAG: float = 5.0
+    POSTGR_REPLICA_LAG_CHECK_INTERVAL: float = 1.0
+    POSTGR_READ_YOUR_WRITES_WINDOW: float = 2.0
+
     REDIS_HOSTNAME: str
     REDIS_PORT: int
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_PUBLISH_BATCH_SIZE: int = 100
+    REDIS_PUBLISH_FLUSH_INTERVAL: float = 0.005
+    REDIS_SUBSCRIBE_CHANNELS: str = ''
+
+    USERS_CACHE_BACKEND: str = 'none'
+    USERS_CACHE_TTL: int = 300
+    USERS_CACHE_NEGATIVE_TTL: int = 30
+    USERS_CACHE_MAX_SIZE: int = 10000
+    USERS_CACHE_TIMEOUT: float = 0.5
+
+    USERS_ME_CACHE_MAX_SIZE: int = 10000
+    USERS_ME_CACHE_TTL: float = 30
+    USERS_ME_CACHE_STALE_TTL: float = 300
+
+    USERS_TOKEN_CACHE_MAX_SIZE: int = 10000
+    USERS_TOKEN_PROFILE_CLAIMS: bool = False
+
+    USERS_AVAILABILITY_FILTER_BACKEND: str = 'redis'
+    USERS_AVAILABILITY_FILTER_CAPACITY: int = 100000
+    USERS_AVAILABILITY_FILTER_ERROR_RATE: float = 0.01
+    USERS_AVAILABILITY_FILTER_REBUILD_INTERVAL: float = 600
 
     EMAIL_HOST: str
     EMAIL_PORT: str
+    EMAIL_HOST_EMAIL: str = ''
+    EMAIL_TIMEOUT: float = 10.0
+    EMAIL_POOL_SIZE: int = 4
+    EMAIL_WORKERS: int = 4
+    EMAIL_QUEUE_MAX_SIZE: int = 1000
+    EMAIL_MAX_RETRIES: int = 3
+    EMAIL_RETRY_BACKOFF: float = 0.5
+    EMAIL_DRAIN_TIMEOUT: float = 10.0
 
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str
     JWT_EXPIRES_IN: int
+    JWT_REFRESH_EXPIRES_IN: int = 43200
+    USERS_TOKEN_STORE_BACKEND: str = 'redis'
+
+    USERS_LOGIN_RATE_LIMIT_BACKEND: str = 'redis'
+    USERS_LOGIN_LIMIT_PER_EMAIL: int = 5
+    USERS_LOGIN_LIMIT_PER_IP: int = 20
+    USERS_LOGIN_LIMIT_WINDOW: int = 60
 
     PATH_TO_APP: str
     APP_NAME: str
@@ -39,6 +89,47 @@ class ProjectSettings(BaseSettings):
 
     USERS_PREFIX: str
     USERS_TAG: str
+    USERS_STREAM_YIELD_PER: int = 1000
+    USERS_REGISTER_BATCH_MAX_SIZE: int = 1000
+    USERS_BULK_DELETE_CHUNK_SIZE: int = 1000
+    USERS_PAGE_DEFAULT_LIMIT: int = 50
+    USERS_PAGE_MAX_LIMIT: int = 500
+    USERS_PASSWORD_POOL_KIND: str = 'thread'
+    USERS_PASSWORD_POOL_WORKERS: int = 4
+    USERS_PASSWORD_POOL_MAX_QUEUE: int = 64
+
+    PASSWORD_SCHEMES: str = 'bcrypt'
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_MEMORY_COST: int = 65536
+    PASSWORD_ARGON2_PARALLELISM: int = 4
+
+    MESSAGEBUS_HANDLER_TIMEOUT: float = 10.0
+    MESSAGEBUS_MAX_CONCURRENT_HANDLERS: int = 10
+    MESSAGEBUS_TIMING_SAMPLE_RATE: float = 1.0
+    MESSAGEBUS_SLOW_MESSAGE_THRESHOLD: float = 1.0
+    MESSAGEBUS_SLOW_MESSAGE_THRESHOLDS: str = ''
+    MESSAGEBUS_COALESCED_QUERIES: str = (
+        'GetAllUsers,GetAllUsersIfChanged,GetUserById,GetUserByIdIfChanged,'
+        'GetUserByEmail,GetUsersByFilter,CheckUserAvailability'
+    )
+
+    OUTBOX_RELAY_BATCH_SIZE: int = 100
+    OUTBOX_RELAY_POLL_INTERVAL: float = 1.0
+
+    COMMAND_STREAM_NAME: str = 'users:commands'
+    COMMAND_STREAM_GROUP: str = 'users-workers'
+    COMMAND_STREAM_CONSUMER: str = ''
+    COMMAND_STREAM_CONCURRENCY: int = 8
+    COMMAND_STREAM_BATCH_SIZE: int = 16
+    COMMAND_STREAM_BLOCK_MS: int = 5000
+    COMMAND_STREAM_CLAIM_IDLE_MS: int = 60000
+    COMMAND_STREAM_MAX_DELIVERIES: int = 5
+    COMMAND_STREAM_METRICS_HOST: str = '0.0.0.0'
+    COMMAND_STREAM_METRICS_PORT: int = 9100
+
+    METRICS_PREFIX: str = '/metrics'
+    METRICS_TAG: str = 'Метрики'
 
     @property
     def get_database_url(self) -> str:
@@ -51,14 +142,68 @@ class ProjectSettings(BaseSettings):
 
         return database_url
 
+    @property
+    def get_replica_database_urls(self) -> list[str]:
+        """Возвращает Database URL реплик для чтения (POSTGR_REPLICA_URLS через запятую)."""
+
+        return [url.strip() for url in self.POSTGR_REPLICA_URLS.split(',') if url.strip()]
+
     @property
     def get_redis_host_and_port(self) -> dict[str, Union[str, int]]:
         return {'host': self.REDIS_HOSTNAME, 'port': self.REDIS_PORT}
 
+    @property
+    def get_messagebus_slow_message_thresholds(self) -> dict[str, float]:
+        """Пороги медленных сообщений по типу или "Событие:обработчик": "RegisterUsers=5,GetAllUsers=2"."""
+
+        thresholds = {}
+
+        for item in self.MESSAGEBUS_SLOW_MESSAGE_THRESHOLDS.split(','):
+            if item.strip():
+                name, threshold = item.split('=')
+                thresholds[name.strip()] = float(threshold)
+
+        return thresholds
+
+    @property
+    def get_messagebus_coalesced_queries(self) -> list[str]:
+        """Типы запросов, одинаковые конкурентные выполнения которых объединяются (через запятую).
+
+        Запросы, возвращающие итераторы (StreamAllUsers), объединять нельзя.
+        """
+
+        return [name.strip() for name in self.MESSAGEBUS_COALESCED_QUERIES.split(',') if name.strip()]
+
+    @property
+    def get_redis_subscribe_channels(self) -> list[str]:
+        """Возвращает каналы Redis pub/sub, которые слушает приложение (REDIS_SUBSCRIBE_CHANNELS через запятую)."""
+
+        return [channel.strip() for channel in self.REDIS_SUBSCRIBE_CHANNELS.split(',') if channel.strip()]
+
     @property
     def get_auth_data(self) -> dict[str, str]:
         return {"secret_key": settings.JWT_SECRET_KEY, "algorithm": settings.JWT_ALGORITHM}
 
+    @property
+    def get_password_context_options(self) -> dict:
+        """Параметры CryptContext: первой схемой хэшируются новые пароли, остальные только проверяются."""
+
+        schemes = [scheme.strip() for scheme in self.PASSWORD_SCHEMES.split(',') if scheme.strip()]
+        options = {'schemes': schemes, 'deprecated': 'auto'}
+
+        if 'bcrypt' in schemes:
+            options['bcrypt__rounds'] = self.PASSWORD_BCRYPT_ROUNDS
+
+        if 'argon2' in schemes:
+            options.update({
+                'argon2__type': 'ID',
+                'argon2__time_cost': self.PASSWORD_ARGON2_TIME_COST,
+                'argon2__memory_cost': self.PASSWORD_ARGON2_MEMORY_COST,
+                'argon2__parallelism': self.PASSWORD_ARGON2_PARALLELISM,
+            })
+
+        return options
+
     class Config:
         env_file = '.test_env' if TESTING else '.env'
 
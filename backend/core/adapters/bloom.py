@@ -0,0 +1,51 @@
+import math
+from hashlib import blake2b
+
+MAX_COUNTER = 255
+
+
+def bloom_parameters(capacity: int, error_rate: float) -> tuple[int, int]:
+    """Размер фильтра и число хэш-функций для capacity элементов с долей ложноположительных error_rate."""
+
+    size = max(1, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+
+    return size, max(1, round(size / capacity * math.log(2)))
+
+
+def bloom_positions(item: str, size: int, hash_count: int) -> list[int]:
+    """Позиции элемента в фильтре: двойное хэширование по одному дайджесту blake2b."""
+
+    digest = blake2b(item.encode(), digest_size=16).digest()
+    first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+    return [(first + number * second) % size for number in range(hash_count)]
+
+
+class CountingBloomFilter:
+    """Counting Bloom filter: вероятностное множество с удалением.
+
+    Отрицательный ответ точный, положительный ошибочен с вероятностью около error_rate,
+    пока элементов не больше capacity. Счётчики насыщаются на 255 и после этого не уменьшаются.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size, self.hash_count = bloom_parameters(capacity, error_rate)
+        self.counters = bytearray(self.size)
+
+    def _positions(self, item: str) -> list[int]:
+        return bloom_positions(item, self.size, self.hash_count)
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            if self.counters[position] < MAX_COUNTER:
+                self.counters[position] += 1
+
+    def remove(self, item: str):
+        """Удаляет элемент. Удалять можно только добавленные элементы, иначе появятся ложноотрицательные ответы."""
+
+        for position in self._positions(item):
+            if 0 < self.counters[position] < MAX_COUNTER:
+                self.counters[position] -= 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.counters[position] for position in self._positions(item))
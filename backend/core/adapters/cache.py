@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from backend.core.adapters.redis_client import get_redis
+
+NONE_BACKEND = 'none'
+MEMORY_BACKEND = 'memory'
+REDIS_BACKEND = 'redis'
+
+CACHE_ERRORS = (RedisError, TimeoutError)
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStats:
+    """Счётчики кэша: попадания, промахи, попадания в негативный кэш, инвалидации, вытеснения и ошибки бэкенда."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def snapshot(self) -> dict:
+        return dict(self.__dict__)
+
+
+class AbstractCache(ABC):
+    """Абстракция кэша строковых значений с TTL.
+
+    Кэш не обязателен для ответа: ошибка бэкенда или тайм-аут (timeout секунд) учитываются в stats.errors
+    и пишутся в лог, get при этом возвращает None и данные берутся из источника, а set и delete пропускаются.
+    Несостоявшаяся инвалидация оставляет устаревшее значение до истечения его TTL.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.stats = CacheStats()
+        self.timeout = timeout
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            async with asyncio.timeout(self.timeout):
+                value = await self._get(key)
+        except CACHE_ERRORS as error:
+            self._failed('get', error)
+            return None
+
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+
+        return value
+
+    async def set(self, key: str, value: str, ttl: int):
+        try:
+            async with asyncio.timeout(self.timeout):
+                await self._set(key, value, ttl)
+        except CACHE_ERRORS as error:
+            self._failed('set', error)
+
+    async def delete(self, *keys: str):
+        if not keys:
+            return
+
+        try:
+            async with asyncio.timeout(self.timeout):
+                await self._delete(*keys)
+        except CACHE_ERRORS as error:
+            self._failed('delete', error)
+        else:
+            self.stats.invalidations += len(keys)
+
+    def _failed(self, operation: str, error: Exception):
+        self.stats.errors += 1
+        logger.warning(f'Cache {operation} failed, falling through: {error!r}')
+
+    @abstractmethod
+    async def _get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _set(self, key: str, value: str, ttl: int):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _delete(self, *keys: str):
+        raise NotImplementedError
+
+
+class RedisCache(AbstractCache):
+    """Кэш в Redis, общий для всех воркеров."""
+
+    def __init__(self, redis: aioredis.Redis, timeout: Optional[float] = None):
+        super().__init__(timeout)
+
+        self.redis = redis
+
+    async def _get(self, key: str) -> Optional[str]:
+        return await self.redis.get(key)
+
+    async def _set(self, key: str, value: str, ttl: int):
+        await self.redis.set(key, value, ex=ttl)
+
+    async def _delete(self, *keys: str):
+        await self.redis.delete(*keys)
+
+
+class InMemoryCache(AbstractCache):
+    """Кэш в памяти процесса с TTL и вытеснением давно не использованных ключей. Для тестов и одного воркера."""
+
+    def __init__(self, max_size: int = 10000):
+        super().__init__()
+
+        self.max_size = max_size
+        self._data: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+    async def _get(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+
+        if item is None:
+            return None
+
+        value, expires_at = item
+
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.stats.evictions += 1
+            return None
+
+        self._data.move_to_end(key)
+
+        return value
+
+    async def _set(self, key: str, value: str, ttl: int):
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def _delete(self, *keys: str):
+        for key in keys:
+            self._data.pop(key, None)
+
+
+def build_cache(backend: str, max_size: int = 10000, timeout: Optional[float] = None) -> Optional[AbstractCache]:
+    """Создаёт кэш по названию бэкенда: none, memory или redis. timeout ограничивает каждую операцию с Redis."""
+
+    if backend == NONE_BACKEND:
+        return None
+
+    if backend == MEMORY_BACKEND:
+        return InMemoryCache(max_size=max_size)
+
+    if backend == REDIS_BACKEND:
+        return RedisCache(get_redis(), timeout=timeout)
+
+    raise ValueError(f'Unknown cache backend {backend}')
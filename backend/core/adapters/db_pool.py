@@ -0,0 +1,84 @@
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+
+from backend.config import settings
+from backend.core.metrics import Histogram, metrics_registry
+
+
+class PoolMetrics:
+    """Счётчики пула соединений: ожидающие выдачи, тайм-ауты и время получения соединения."""
+
+    def __init__(self):
+        self.waiting = 0
+        self.timeouts = 0
+        self.acquire_wait = Histogram()
+
+    def snapshot(self, pool: 'InstrumentedAsyncAdaptedQueuePool') -> dict:
+        return {
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'waiting': self.waiting,
+            'timeouts': self.timeouts,
+            'acquire_wait_seconds': self.acquire_wait.snapshot(),
+        }
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Асинхронный пул соединений SQLAlchemy, собирающий метрики выдачи соединений."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        self.metrics.waiting += 1
+        started_at = time.perf_counter()
+
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.waiting -= 1
+            self.metrics.acquire_wait.observe(time.perf_counter() - started_at)
+
+    def recreate(self) -> 'InstrumentedAsyncAdaptedQueuePool':
+        pool = super().recreate()
+        pool.metrics = self.metrics
+
+        return pool
+
+    def metrics_snapshot(self) -> dict:
+        return self.metrics.snapshot(self)
+
+
+def create_engine(url: str, name: str = 'primary') -> AsyncEngine:
+    """Создаёт асинхронный движок БД с пулом соединений согласно настройкам проекта.
+
+    Метрики пула регистрируются в реестре под именем `db_pool.<name>`.
+    При POSTGR_POOL_ENABLED=False соединение открывается заново на каждую сессию (NullPool).
+    """
+
+    if not settings.POSTGR_POOL_ENABLED:
+        return create_async_engine(url=url, echo=False, poolclass=NullPool)
+
+    engine = create_async_engine(
+        url=url,
+        echo=False,
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_size=settings.POSTGR_POOL_SIZE,
+        max_overflow=settings.POSTGR_POOL_MAX_OVERFLOW,
+        pool_recycle=settings.POSTGR_POOL_RECYCLE,
+        pool_pre_ping=settings.POSTGR_POOL_PRE_PING,
+        pool_timeout=settings.POSTGR_POOL_TIMEOUT,
+    )
+    metrics_registry.register(f'db_pool.{name}', lambda: engine.pool.metrics_snapshot())
+
+    return engine
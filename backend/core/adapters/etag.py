@@ -0,0 +1,28 @@
+import hashlib
+from typing import Any, Optional
+
+
+def make_etag(*parts: Any) -> str:
+    """Строгий ETag из частей версии, например make_etag('user', 7, 3) -> '"user-7-3"'."""
+
+    return '"' + '-'.join(str(part) for part in parts) + '"'
+
+
+def body_etag(body: bytes) -> str:
+    """Строгий ETag по содержимому уже закодированного ответа."""
+
+    return make_etag(hashlib.blake2b(body, digest_size=12).hexdigest())
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверяет заголовок If-None-Match: список ETag через запятую или "*".
+
+    Для If-None-Match используется слабое сравнение, поэтому префикс W/ не учитывается.
+    """
+
+    if not if_none_match:
+        return False
+
+    candidates = (candidate.strip() for candidate in if_none_match.split(','))
+
+    return any(candidate == '*' or candidate.removeprefix('W/') == etag for candidate in candidates)
@@ -0,0 +1,22 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def dumps(content: Any) -> bytes:
+    """Кодирует в JSON через orjson без предварительного jsonable_encoder.
+
+    dict, list, str, числа, datetime, UUID и dataclass кодируются нативно, остальное - через str.
+    """
+
+    return orjson.dumps(content, default=str, option=OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ, который кодирует данные обработчика напрямую через orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
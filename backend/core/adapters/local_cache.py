@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StaleWhileRevalidateCache:
+    """Ограниченный LRU-кэш в памяти воркера с TTL и отдачей устаревших значений на время обновления.
+
+    Значение свежее ttl секунд. Ещё stale_ttl секунд после этого оно отдаётся как устаревшее,
+    а вызывающий запускает фоновое обновление через refresh. Позже значение считается отсутствующим.
+    """
+
+    def __init__(self, max_size: int, ttl: float, stale_ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._refreshing: dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[tuple[Any, bool]]:
+        """Возвращает пару (значение, устарело ли оно) или None, если значения нет."""
+
+        item = self._data.get(key)
+
+        if item is None:
+            self.misses += 1
+            return None
+
+        value, stored_at = item
+        age = time.monotonic() - stored_at
+
+        if age >= self.ttl + self.stale_ttl:
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+
+        if age >= self.ttl:
+            self.stale_hits += 1
+            return value, True
+
+        self.hits += 1
+
+        return value, False
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def evict(self, key: Hashable):
+        if self._data.pop(key, None) is not None:
+            self.evictions += 1
+
+        task = self._refreshing.pop(key, None)
+
+        if task is not None:
+            task.cancel()
+
+    def refresh(self, key: Hashable, load: Callable[[], Awaitable[Any]]):
+        """Запускает фоновое обновление значения, если оно ещё не запущено. Если load вернул None, ключ удаляется."""
+
+        if key in self._refreshing:
+            return
+
+        self._refreshing[key] = asyncio.create_task(self._refresh(key, load))
+
+    async def _refresh(self, key: Hashable, load: Callable[[], Awaitable[Any]]):
+        try:
+            value = await load()
+        except Exception:
+            logger.exception(f'Failed to refresh cached value for {key}')
+            return
+        finally:
+            if self._refreshing.get(key) is asyncio.current_task():
+                del self._refreshing[key]
+
+        self.refreshes += 1
+
+        if value is None:
+            self.evict(key)
+        else:
+            self.set(key, value)
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'evictions': self.evictions,
+        }
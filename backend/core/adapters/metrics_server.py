@@ -0,0 +1,41 @@
+import asyncio
+import logging
+
+from backend.core.adapters.json_response import dumps
+from backend.core.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+async def start_metrics_server(registry: MetricsRegistry, host: str, port: int, path: str) -> asyncio.Server:
+    """HTTP-сервер снимка метрик для процессов без FastAPI (воркер потока команд).
+
+    На GET path отвечает тем же JSON, что и /metrics приложения, на остальные запросы - 404.
+    """
+
+    async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode(errors='replace').split()
+
+            while (await reader.readline()).strip():
+                pass
+
+            if request_line[:2] == ['GET', path]:
+                status, body = '200 OK', dumps(registry.collect())
+            else:
+                status, body = '404 Not Found', b'{"detail":"Not Found"}'
+
+            writer.write(
+                f'HTTP/1.1 {status}\r\nContent-Type: application/json\r\n'
+                f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(serve, host, port)
+    logger.info(f'Serving metrics on {host}:{port}{path}')
+
+    return server
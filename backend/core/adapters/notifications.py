@@ -3,5 +3,5 @@ from abc import ABC, abstractmethod
 
 class AbstractNotifications(ABC):
     @abstractmethod
-    def send(self, destination, message):
+    async def send(self, destination, message):
         raise NotImplementedError
@@ -0,0 +1,173 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+from redis import asyncio as aioredis
+
+from backend.core.adapters.redis_client import get_redis
+
+MEMORY_BACKEND = 'memory'
+REDIS_BACKEND = 'redis'
+
+# KEYS: пары счётчиков текущего и предыдущего окна по каждому ключу;
+# ARGV: окно в секундах, прошедшая доля окна, лимиты по ключам.
+# Возвращает номер (с 1) первого превышенного лимита и его счётчики или {0, 0, 0}, если попытка учтена.
+SLIDING_WINDOW_SCRIPT = """
+local window, progress = tonumber(ARGV[1]), tonumber(ARGV[2])
+
+for i = 1, #KEYS / 2 do
+    local current = tonumber(redis.call('GET', KEYS[2 * i - 1]) or '0')
+    local previous = tonumber(redis.call('GET', KEYS[2 * i]) or '0')
+
+    if previous * (1 - progress) + current >= tonumber(ARGV[i + 2]) then
+        return {i, current, previous}
+    end
+end
+
+for i = 1, #KEYS / 2 do
+    redis.call('INCR', KEYS[2 * i - 1])
+    redis.call('EXPIRE', KEYS[2 * i - 1], 2 * window)
+end
+
+return {0, 0, 0}
+"""
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(retry_after)
+
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(limit: int, window: int, elapsed: float, current: int, previous: int) -> int:
+    """Оценивает, через сколько секунд взвешенный счётчик опустится ниже лимита."""
+
+    if current < limit and previous > 0:
+        wait = window * (1 - (limit - current) / previous) - elapsed
+    else:
+        wait = window - elapsed
+
+    return max(math.ceil(wait), 1)
+
+
+class AbstractRateLimiter(ABC):
+    """Ограничение частоты по ключу скользящим окном.
+
+    Используется приближение двумя соседними фиксированными окнами: счётчик предыдущего окна
+    берётся с весом оставшейся доли текущего. Отклонённые попытки не учитываются.
+    """
+
+    async def hit(self, key: str, limit: int, window: int) -> Optional[int]:
+        """Учитывает попытку. Если лимит превышен, попытка не учитывается и возвращается Retry-After в секундах."""
+
+        rejected = await self.hit_all([(key, limit)], window)
+
+        return rejected[1] if rejected is not None else None
+
+    async def hit_all(self, limits: list[tuple[str, int]], window: int) -> Optional[tuple[str, int]]:
+        """Учитывает попытку сразу по нескольким парам (ключ, лимит) атомарно.
+
+        Если превышен хотя бы один лимит, не увеличивается ни один счётчик и возвращаются ключ
+        первого превышенного лимита и Retry-After в секундах.
+        """
+
+        now = time.time()
+        number = int(now // window)
+        elapsed = now - number * window
+        rejected_index, current, previous = await self._hit_all(limits, number, window, elapsed / window)
+
+        if rejected_index is None:
+            return None
+
+        key, limit = limits[rejected_index]
+
+        return key, retry_after_seconds(limit, window, elapsed, current, previous)
+
+    @abstractmethod
+    async def _hit_all(
+        self,
+        limits: list[tuple[str, int]],
+        number: int,
+        window: int,
+        progress: float,
+    ) -> tuple[Optional[int], int, int]:
+        """Возвращает индекс первого превышенного лимита (None, если попытка учтена) и его счётчики."""
+
+        raise NotImplementedError
+
+
+class RedisRateLimiter(AbstractRateLimiter):
+    """Счётчики в Redis, общие для всех воркеров. Проверка и увеличение по всем ключам выполняются одним скриптом."""
+
+    def __init__(self, redis: aioredis.Redis):
+        self.redis = redis
+        self._script = redis.register_script(SLIDING_WINDOW_SCRIPT)
+
+    async def _hit_all(
+        self,
+        limits: list[tuple[str, int]],
+        number: int,
+        window: int,
+        progress: float,
+    ) -> tuple[Optional[int], int, int]:
+        rejected, current, previous = await self._script(
+            keys=[counter for key, _ in limits for counter in (f'rate:{key}:{number}', f'rate:{key}:{number - 1}')],
+            args=[window, progress, *(limit for _, limit in limits)],
+        )
+
+        return (int(rejected) - 1 if rejected else None), int(current), int(previous)
+
+
+class InMemoryRateLimiter(AbstractRateLimiter):
+    """Счётчики в памяти процесса для одного воркера и тестов. Хранится не больше max_size ключей."""
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self._windows: OrderedDict[str, tuple[int, int, int]] = OrderedDict()
+
+    def _counters(self, key: str, number: int) -> tuple[int, int]:
+        stored_number, current, previous = self._windows.get(key, (number, 0, 0))
+
+        if stored_number == number - 1:
+            return 0, current
+        if stored_number != number:
+            return 0, 0
+
+        return current, previous
+
+    async def _hit_all(
+        self,
+        limits: list[tuple[str, int]],
+        number: int,
+        window: int,
+        progress: float,
+    ) -> tuple[Optional[int], int, int]:
+        counters = [self._counters(key, number) for key, _ in limits]
+
+        for index, ((_, limit), (current, previous)) in enumerate(zip(limits, counters)):
+            if previous * (1 - progress) + current >= limit:
+                return index, current, previous
+
+        for (key, _), (current, previous) in zip(limits, counters):
+            self._windows[key] = (number, current + 1, previous)
+            self._windows.move_to_end(key)
+
+        while len(self._windows) > self.max_size:
+            self._windows.popitem(last=False)
+
+        return None, 0, 0
+
+
+def build_rate_limiter(backend: str) -> AbstractRateLimiter:
+    """Создаёт ограничитель частоты по названию бэкенда: memory или redis."""
+
+    if backend == MEMORY_BACKEND:
+        return InMemoryRateLimiter()
+
+    if backend == REDIS_BACKEND:
+        return RedisRateLimiter(get_redis())
+
+    raise ValueError(f'Unknown rate limiter backend {backend}')
@@ -0,0 +1,25 @@
+from typing import Optional
+
+from redis import asyncio as aioredis
+
+from backend.config import settings
+
+_client: Optional[aioredis.Redis] = None
+
+
+def get_redis() -> aioredis.Redis:
+    """Возвращает общий для процесса асинхронный клиент Redis.
+
+    Соединения берутся из пула не больше REDIS_MAX_CONNECTIONS и открываются при первом запросе.
+    """
+
+    global _client
+
+    if _client is None:
+        _client = aioredis.Redis(
+            **settings.get_redis_host_and_port,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            decode_responses=True,
+        )
+
+    return _client
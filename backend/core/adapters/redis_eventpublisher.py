@@ -1,29 +1,152 @@
+import asyncio
+import inspect
 import json
 import logging
-import redis
+import time
+from dataclasses import asdict, is_dataclass
+from typing import Any, Callable, Optional
+
+from redis import asyncio as aioredis
 
 from backend.config import settings
-from backend.users.domain.events import Event
+from backend.core.adapters.redis_client import get_redis
+from backend.core.metrics import Histogram
 
 
 logger = logging.getLogger(__name__)
 
-r = redis.Redis(settings.get_redis_host_and_port)
 
+def serialize_event(event: Any) -> str:
+    """Сериализует событие-dataclass или готовый словарь в JSON."""
+
+    if is_dataclass(event):
+        event = asdict(event)
+
+    return json.dumps(event, default=str)
+
+
+class RedisEventPublisher:
+    """Публикует события в Redis pub/sub пачками через pipeline.
+
+    Событие ставится в буфер, буфер отправляется одним pipeline, когда в нём набралось max_batch_size
+    событий или прошло flush_interval секунд с первого события в нём. publish возвращается после отправки
+    пачки с событием, поэтому ошибка Redis доходит до вызывающего.
+    """
+
+    def __init__(self, redis: aioredis.Redis, max_batch_size: int, flush_interval: float):
+        self.redis = redis
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self._buffer: list[tuple[str, str, asyncio.Future]] = []
+        self._flush_timer: Optional[asyncio.Task] = None
+        self.published = 0
+        self.batches = 0
+        self.failures = 0
+        self.flush_time = Histogram()
+
+    async def publish(self, channel: str, event: Any):
+        future = asyncio.get_running_loop().create_future()
+        self._buffer.append((channel, serialize_event(event), future))
+
+        if len(self._buffer) >= self.max_batch_size:
+            await self.flush()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.create_task(self._flush_later())
+
+        await future
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self._flush_timer = None
+        await self.flush()
+
+    async def flush(self):
+        """Отправляет буфер одним pipeline без транзакции и сообщает результат ожидающим publish."""
+
+        batch, self._buffer = self._buffer, []
+
+        if not batch:
+            return
+
+        started = time.monotonic()
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for channel, message, _ in batch:
+                    pipe.publish(channel, message)
+
+                await pipe.execute()
+        except Exception as error:
+            self.failures += 1
+            logger.exception(f'Failed to publish {len(batch)} events to redis')
+
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+        else:
+            self.published += len(batch)
+            self.batches += 1
+
+            for *_, future in batch:
+                if not future.done():
+                    future.set_result(None)
+        finally:
+            self.flush_time.observe(time.monotonic() - started)
+
+    async def listen(self, channels: list[str], handler: Callable):
+        """Подписывается на каналы и передаёт handler канал и данные каждого сообщения, пока задачу не отменят."""
+
+        logger.info(f'Redis pubsub listening to {channels}')
+
+        async with self.redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+            await pubsub.subscribe(*channels)
+
+            async for message in pubsub.listen():
+                try:
+                    result = handler(message['channel'], json.loads(message['data']))
+
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception:
+                    logger.exception(f'Exception handling redis message {message}')
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            'published': self.published,
+            'batches': self.batches,
+            'failures': self.failures,
+            'buffered': len(self._buffer),
+            'flush_seconds': self.flush_time.snapshot(),
+        }
+
+
+_publisher: Optional[RedisEventPublisher] = None
+
+
+def get_event_publisher() -> RedisEventPublisher:
+    """Возвращает общий для процесса публикатор событий поверх общего клиента Redis."""
+
+    global _publisher
+
+    if _publisher is None:
+        _publisher = RedisEventPublisher(
+            redis=get_redis(),
+            max_batch_size=settings.REDIS_PUBLISH_BATCH_SIZE,
+            flush_interval=settings.REDIS_PUBLISH_FLUSH_INTERVAL,
+        )
+
+    return _publisher
 
-def publish(channel, event: Event):
-    logging.info(f"publishing: channel={channel}, event={channel}")
-    r.publish(channel, json.dumps(event))
 
+async def publish(channel: str, event: Any):
+    logger.debug(f'publishing: channel={channel}, event={event}')
+    await get_event_publisher().publish(channel, event)
 
-def start_redis():
-    logger.info('Redis pubsub starting')
-    pubsub = r.pubsub(ignore_subscribe_messages=True)
-    # pubsub.subscribe(settings.get_redis_channel())
 
-    for n in pubsub.listen():
-       ...
+def log_message(channel: str, data: Any):
+    logger.info(f'received: channel={channel}, data={data}')
 
 
 if __name__ == '__main__':
-    start_redis()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(get_event_publisher().listen(settings.get_redis_subscribe_channels, log_message))
@@ -0,0 +1,303 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import asdict, fields, is_dataclass
+from typing import Any, Awaitable, Callable, Optional, Type, get_args, get_origin, get_type_hints
+
+from redis import asyncio as aioredis
+from redis.exceptions import ResponseError
+
+from backend.core.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class UndecodableCommand(Exception):
+    pass
+
+
+def encode_command(command: Any) -> dict[str, str]:
+    """Поля записи потока: название класса команды и её поля в JSON."""
+
+    return {'type': type(command).__name__, 'payload': json.dumps(asdict(command), default=str)}
+
+
+def build_command(command_type: type, data: dict[str, Any]):
+    """Собирает dataclass команды из словаря. Списки вложенных dataclass собираются поэлементно.
+
+    Поля с init=False (например, client_ip) из данных не берутся.
+    """
+
+    hints = get_type_hints(command_type)
+    kwargs = {}
+
+    for command_field in fields(command_type):
+        if not command_field.init or command_field.name not in data:
+            continue
+
+        value = data[command_field.name]
+        field_type = hints[command_field.name]
+
+        if get_origin(field_type) is list and is_dataclass(item_type := get_args(field_type)[0]):
+            value = [build_command(item_type, item) for item in value]
+
+        kwargs[command_field.name] = value
+
+    return command_type(**kwargs)
+
+
+def decode_command(entry: dict[str, str], command_types: dict[str, type]):
+    """Восстанавливает команду из полей записи потока.
+
+    Raises:
+        UndecodableCommand: тип команды неизвестен или поля записи не подходят к команде.
+    """
+
+    try:
+        return build_command(command_types[entry['type']], json.loads(entry['payload']))
+    except (KeyError, TypeError, ValueError) as error:
+        raise UndecodableCommand(entry) from error
+
+
+async def enqueue_command(redis: aioredis.Redis, stream: str, command: Any, maxlen: Optional[int] = None) -> str:
+    """Добавляет команду в поток и возвращает id записи. Поток обрезается примерно до maxlen записей."""
+
+    return await redis.xadd(stream, encode_command(command), maxlen=maxlen, approximate=True)
+
+
+def entry_age(entry_id: str) -> float:
+    """Возраст записи потока в секундах: первая часть id записи - время добавления в миллисекундах."""
+
+    return max(time.time() - int(entry_id.split('-', 1)[0]) / 1000, 0.0)
+
+
+class RedisStreamConsumer:
+    """Обработчик записей потока Redis в группе потребителей.
+
+    Записи читаются XREADGROUP и обрабатываются concurrency задачами. Запись подтверждается XACK
+    после успешной обработки. Неподтверждённые записи (упавшая обработка или остановленный воркер)
+    дольше claim_idle_ms забираются XCLAIM и обрабатываются повторно, а после max_deliveries попыток
+    переносятся в поток <stream>:dead и подтверждаются.
+
+    Записи, которые потребитель ещё держит (в очереди или в обработке), он каждые claim_idle_ms / 3
+    перезабирает себе XCLAIM JUSTID: так долгая обработка не считается зависшей и не запускается повторно.
+    Запись, упавшая с ошибкой из non_retryable_errors, сразу переносится в поток мёртвых записей.
+    """
+
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        stream: str,
+        group: str,
+        consumer: str,
+        handle: Callable[[dict[str, str]], Awaitable],
+        concurrency: int,
+        batch_size: int,
+        block_ms: int,
+        claim_idle_ms: int,
+        max_deliveries: int,
+        non_retryable_errors: tuple[Type[Exception], ...] = (),
+    ):
+        self.redis = redis
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer
+        self.handle = handle
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.max_deliveries = max_deliveries
+        self.non_retryable_errors = non_retryable_errors
+        self.dead_letter_stream = f'{stream}:dead'
+        self._entries: asyncio.Queue[tuple[str, dict[str, str]]] = asyncio.Queue(maxsize=concurrency)
+        self._held_ids: set[str] = set()
+        self.processed = 0
+        self.failures = 0
+        self.reclaimed = 0
+        self.dead_lettered = 0
+        self.group_lag: Optional[int] = None
+        self.group_pending: Optional[int] = None
+        self.consumers_pending: dict[str, int] = {}
+        self.delivery_lag = Histogram(buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0))
+        self.handle_time = Histogram()
+
+    async def ensure_group(self):
+        """Создаёт поток и группу потребителей, если их ещё нет. Новая группа читает поток с начала."""
+
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except ResponseError as error:
+            if 'BUSYGROUP' not in str(error):
+                raise
+
+    async def run(self):
+        """Читает, обрабатывает и забирает зависшие записи, пока задачу не отменят."""
+
+        await self.ensure_group()
+
+        async with asyncio.TaskGroup() as task_group:
+            task_group.create_task(self._read_forever())
+            task_group.create_task(self._reclaim_forever())
+            task_group.create_task(self._keep_claimed_forever())
+
+            for _ in range(self.concurrency):
+                task_group.create_task(self._work_forever())
+
+    async def _read_forever(self):
+        while True:
+            try:
+                response = await self.redis.xreadgroup(
+                    self.group,
+                    self.consumer,
+                    {self.stream: '>'},
+                    count=self.batch_size,
+                    block=self.block_ms,
+                )
+            except Exception:
+                logger.exception(f'Failed to read stream {self.stream}')
+                await asyncio.sleep(1)
+                continue
+
+            for _, entries in response or []:
+                for entry in entries:
+                    await self._hold(entry)
+
+    async def _reclaim_forever(self):
+        while True:
+            await asyncio.sleep(self.claim_idle_ms / 1000)
+
+            try:
+                await self.reclaim()
+                await self.refresh_lag()
+            except Exception:
+                logger.exception(f'Failed to reclaim pending entries of stream {self.stream}')
+
+    async def _keep_claimed_forever(self):
+        while True:
+            await asyncio.sleep(self.claim_idle_ms / 3 / 1000)
+
+            try:
+                await self.keep_claimed()
+            except Exception:
+                logger.exception(f'Failed to keep claimed entries of stream {self.stream}')
+
+    async def _work_forever(self):
+        while True:
+            entry_id, entry = await self._entries.get()
+
+            try:
+                await self.process(entry_id, entry)
+            finally:
+                self._held_ids.discard(entry_id)
+                self._entries.task_done()
+
+    async def _hold(self, entry: tuple[str, dict[str, str]]):
+        self._held_ids.add(entry[0])
+        await self._entries.put(entry)
+
+    async def process(self, entry_id: str, entry: dict[str, str]):
+        """Обрабатывает запись и подтверждает её.
+
+        При ошибке запись остаётся в списке ожидающих, а при ошибке из non_retryable_errors
+        переносится в поток мёртвых записей.
+        """
+
+        self.delivery_lag.observe(entry_age(entry_id))
+        started = time.monotonic()
+
+        try:
+            await self.handle(entry)
+        except self.non_retryable_errors as error:
+            self.failures += 1
+            logger.exception(f'Non-retryable error handling stream entry {entry_id} {entry}')
+            await self._dead_letter(entry_id, entry, error=repr(error))
+            return
+        except Exception:
+            self.failures += 1
+            logger.exception(f'Exception handling stream entry {entry_id} {entry}')
+            return
+        finally:
+            self.handle_time.observe(time.monotonic() - started)
+
+        await self.redis.xack(self.stream, self.group, entry_id)
+        self.processed += 1
+
+    async def reclaim(self):
+        """Забирает записи, которые не подтверждены дольше claim_idle_ms, себе или в поток мёртвых записей.
+
+        Записи, которые этот потребитель ещё держит, не забираются.
+        """
+
+        pending = await self.redis.xpending_range(
+            self.stream,
+            self.group,
+            min='-',
+            max='+',
+            count=self.batch_size,
+            idle=self.claim_idle_ms,
+        )
+        pending = [item for item in pending if item['message_id'] not in self._held_ids]
+        retry_ids = [item['message_id'] for item in pending if item['times_delivered'] < self.max_deliveries]
+        dead_ids = [item['message_id'] for item in pending if item['times_delivered'] >= self.max_deliveries]
+
+        if dead_ids:
+            for entry_id, entry in await self._claim(dead_ids):
+                await self._dead_letter(entry_id, entry)
+
+        if retry_ids:
+            for entry in await self._claim(retry_ids):
+                self.reclaimed += 1
+                await self._hold(entry)
+
+    async def keep_claimed(self):
+        """Сбрасывает время простоя записей, которые потребитель ещё держит, чтобы их не забрали другие."""
+
+        if self._held_ids:
+            await self.redis.xclaim(self.stream, self.group, self.consumer, 0, list(self._held_ids), justid=True)
+
+    async def _dead_letter(self, entry_id: str, entry: dict[str, str], error: Optional[str] = None):
+        dead_entry = {**entry, 'entry_id': entry_id}
+
+        if error is not None:
+            dead_entry['error'] = error
+
+        await self.redis.xadd(self.dead_letter_stream, dead_entry)
+        await self.redis.xack(self.stream, self.group, entry_id)
+        self.dead_lettered += 1
+        logger.error(f'Stream entry {entry_id} moved to {self.dead_letter_stream}')
+
+    async def _claim(self, entry_ids: list[str]) -> list[tuple[str, dict[str, str]]]:
+        entries = await self.redis.xclaim(self.stream, self.group, self.consumer, self.claim_idle_ms, entry_ids)
+
+        # Запись могла быть удалена из потока при обрезке: тогда XCLAIM возвращает её без полей.
+        return [(entry_id, entry) for entry_id, entry in entries if entry]
+
+    async def refresh_lag(self):
+        """Обновляет отставание группы и число ожидающих записей каждого потребителя."""
+
+        for group in await self.redis.xinfo_groups(self.stream):
+            if group['name'] == self.group:
+                self.group_lag = group.get('lag')
+                self.group_pending = group['pending']
+
+        self.consumers_pending = {
+            consumer['name']: consumer['pending']
+            for consumer in await self.redis.xinfo_consumers(self.stream, self.group)
+        }
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            'consumer': self.consumer,
+            'processed': self.processed,
+            'failures': self.failures,
+            'reclaimed': self.reclaimed,
+            'dead_lettered': self.dead_lettered,
+            'queued': self._entries.qsize(),
+            'group_lag': self.group_lag,
+            'group_pending': self.group_pending,
+            'consumers_pending': dict(self.consumers_pending),
+            'delivery_lag_seconds': self.delivery_lag.snapshot(),
+            'handle_seconds': self.handle_time.snapshot(),
+        }
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import aiosmtplib
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPConnectionPool:
+    """Пул переиспользуемых соединений с SMTP-сервером.
+
+    Открыто не больше size соединений, новые открываются по требованию. Соединение, простоявшее
+    дольше max_idle секунд, перед выдачей проверяется командой NOOP: сервер мог закрыть его по тайм-ауту.
+    Соединение, на котором произошла ошибка, закрывается и в пул не возвращается.
+    """
+
+    def __init__(self, hostname: str, port: int, size: int, timeout: float, max_idle: float = 30):
+        self.hostname = hostname
+        self.port = port
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle: list[tuple[aiosmtplib.SMTP, float]] = []
+        self._semaphore = asyncio.Semaphore(size)
+        self.opened = 0
+        self.discarded = 0
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosmtplib.SMTP]:
+        async with self._semaphore:
+            smtp = await self._acquire()
+
+            try:
+                yield smtp
+            except Exception:
+                self._discard(smtp)
+                raise
+            else:
+                self._idle.append((smtp, time.monotonic()))
+
+    async def _acquire(self) -> aiosmtplib.SMTP:
+        while self._idle:
+            smtp, released_at = self._idle.pop()
+
+            if not smtp.is_connected:
+                self.discarded += 1
+                continue
+
+            if time.monotonic() - released_at <= self.max_idle:
+                return smtp
+
+            try:
+                await smtp.noop()
+            except aiosmtplib.SMTPException:
+                self._discard(smtp)
+            else:
+                return smtp
+
+        smtp = aiosmtplib.SMTP(hostname=self.hostname, port=self.port, timeout=self.timeout, start_tls=False)
+        await smtp.connect()
+        self.opened += 1
+
+        return smtp
+
+    def _discard(self, smtp: aiosmtplib.SMTP):
+        self.discarded += 1
+        smtp.close()
+
+    async def close(self):
+        """Закрывает свободные соединения командой QUIT."""
+
+        while self._idle:
+            smtp, _ = self._idle.pop()
+
+            try:
+                await smtp.quit()
+            except aiosmtplib.SMTPException:
+                smtp.close()
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            'size': self.size,
+            'idle': len(self._idle),
+            'opened': self.opened,
+            'discarded': self.discarded,
+        }
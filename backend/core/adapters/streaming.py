@@ -0,0 +1,47 @@
+from typing import Any, AsyncIterator
+
+from backend.core.adapters.json_response import dumps
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+JSON_MEDIA_TYPE = 'application/json'
+
+
+def _dumps(row: Any) -> str:
+    return dumps(row).decode()
+
+
+async def ndjson_stream(rows: AsyncIterator[Any], chunk_size: int = 100) -> AsyncIterator[str]:
+    """Кодирует строки в NDJSON (один объект на строку), отдавая их пачками по chunk_size."""
+
+    chunk = []
+
+    async for row in rows:
+        chunk.append(_dumps(row))
+
+        if len(chunk) >= chunk_size:
+            yield '\n'.join(chunk) + '\n'
+            chunk.clear()
+
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+async def json_array_stream(rows: AsyncIterator[Any], chunk_size: int = 100) -> AsyncIterator[str]:
+    """Кодирует строки в JSON-массив, отдавая его по частям, не собирая целиком в памяти."""
+
+    chunk = []
+    separator = '['
+
+    async for row in rows:
+        chunk.append(_dumps(row))
+
+        if len(chunk) >= chunk_size:
+            yield separator + ','.join(chunk)
+            separator = ','
+            chunk.clear()
+
+    if chunk:
+        yield separator + ','.join(chunk)
+        separator = ','
+
+    yield ']' if separator == ',' else '[]'
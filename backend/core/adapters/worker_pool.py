@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from backend.core.metrics import Histogram
+
+THREAD = 'thread'
+PROCESS = 'process'
+
+
+class WorkerPoolSaturated(Exception):
+    pass
+
+
+def _timed_call(submitted_at: float, fn: Callable, *args) -> tuple[Any, float, float]:
+    """Выполняет fn в воркере и возвращает результат, время ожидания в очереди и время выполнения.
+
+    time.monotonic на Linux общий для всех процессов, поэтому время ожидания корректно и для пула процессов.
+    """
+
+    started_at = time.monotonic()
+    result = fn(*args)
+
+    return result, max(started_at - submitted_at, 0.0), time.monotonic() - started_at
+
+
+class WorkerPool:
+    """Ограниченный пул потоков или процессов для CPU-ёмких синхронных функций.
+
+    Одновременно принимается не больше max_workers + max_queue задач,
+    сверх этого run сразу поднимает WorkerPoolSaturated вместо того, чтобы копить очередь.
+    Функции для пула процессов должны быть определены на уровне модуля.
+    """
+
+    def __init__(self, kind: str = THREAD, max_workers: int = 4, max_queue: int = 64):
+        if kind not in (THREAD, PROCESS):
+            raise ValueError(f'Unknown worker pool kind {kind}')
+
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait = Histogram()
+        self.run_time = Histogram()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == PROCESS:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='worker-pool')
+
+        return self._executor
+
+    def _release(self, future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Выполняет fn(*args) в пуле, не блокируя цикл событий.
+
+        Raises:
+            WorkerPoolSaturated: в пуле уже max_workers + max_queue задач.
+        """
+
+        with self._lock:
+            if self.pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise WorkerPoolSaturated
+
+            self.pending += 1
+
+        try:
+            future = self._get_executor().submit(_timed_call, time.monotonic(), fn, *args)
+        except BaseException:
+            with self._lock:
+                self.pending -= 1
+            raise
+
+        # Счётчик освобождается по завершении задачи в пуле, даже если ожидающая корутина была отменена.
+        future.add_done_callback(self._release)
+        result, queue_wait, run_time = await asyncio.wrap_future(future)
+        self.queue_wait.observe(queue_wait)
+        self.run_time.observe(run_time)
+
+        return result
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            'kind': self.kind,
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'in_flight': self.pending,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'queue_wait_seconds': self.queue_wait.snapshot(),
+            'run_seconds': self.run_time.snapshot(),
+        }
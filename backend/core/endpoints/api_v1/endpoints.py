@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from backend.config import settings
+from backend.core.metrics import metrics_registry
+
+router = APIRouter(
+    tags=[settings.METRICS_TAG],
+    prefix=settings.METRICS_PREFIX,
+)
+
+
+@router.get('')
+async def get_metrics():
+    """Возвращает снимок метрик текущего процесса (воркера)."""
+
+    return JSONResponse(content=metrics_registry.collect())
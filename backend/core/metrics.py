@@ -0,0 +1,50 @@
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Гистограмма длительностей (в секундах) с фиксированными границами корзин."""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        """Возвращает накопительные значения корзин в формате, близком к Prometheus."""
+
+        cumulative = 0
+        buckets = {}
+
+        for bound, count in zip((*self.buckets, float('inf')), self.counts):
+            cumulative += count
+            buckets['+Inf' if bound == float('inf') else str(bound)] = cumulative
+
+        return {'buckets': buckets, 'count': self.count, 'sum': self.sum}
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса. Каждая метрика отдаёт свой снимок через функцию-коллектор."""
+
+    def __init__(self):
+        self._collectors: dict[str, Callable[[], dict]] = {}
+
+    def register(self, name: str, collector: Callable[[], dict]):
+        self._collectors[name] = collector
+
+    def unregister(self, name: str):
+        self._collectors.pop(name, None)
+
+    def collect(self) -> dict[str, dict]:
+        return {name: collector() for name, collector in self._collectors.items()}
+
+
+metrics_registry = MetricsRegistry()
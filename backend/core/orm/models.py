@@ -1,5 +1,9 @@
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Any
+
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy.types import Integer
+from sqlalchemy.types import JSON, DateTime, Integer, String
 
 
 class BaseModel(DeclarativeBase):
@@ -17,7 +21,63 @@ class BaseModel(DeclarativeBase):
     def get_columns(cls):
         return cls.__table__.columns
 
+    @property
+    def events(self) -> list:
+        """События сущности, ожидающие публикации через шину сообщений."""
+
+        return self.__dict__.setdefault('_events', [])
+
     def to_dict(self):
         return {column.name: getattr(self, column.name) for column in self.get_columns()}
 
-    
\ No newline at end of file
+
+class OutboxMessages(BaseModel):
+    """Событие, ожидающее публикации в брокер сообщений.
+
+    Записывается в той же транзакции, что и изменение сущности, и удаляется после публикации.
+    """
+
+    __tablename__ = 'core.outbox'
+
+    channel: Mapped[str] = mapped_column(
+        type_=String,
+        nullable=False,
+    )
+
+    payload: Mapped[dict[str, Any]] = mapped_column(
+        type_=JSON,
+        nullable=False,
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        type_=DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+    )
+
+    @classmethod
+    def from_event(cls, event) -> 'OutboxMessages':
+        """Канал сообщения - название класса события, данные - поля dataclass события."""
+
+        return cls(channel=type(event).__name__, payload=asdict(event))
+
+
+class TableVersions(BaseModel):
+    """Счётчик изменений таблицы.
+
+    Увеличивается в транзакции, изменившей таблицу, из него строится ETag списочных ответов.
+    """
+
+    __tablename__ = 'core.table_versions'
+
+    name: Mapped[str] = mapped_column(
+        type_=String,
+        unique=True,
+        nullable=False,
+    )
+
+    version: Mapped[int] = mapped_column(
+        type_=Integer,
+        nullable=False,
+        default=0,
+    )
@@ -1,5 +1,11 @@
-from typing import Dict, Callable, Union
+import asyncio
+import inspect
+from collections import Counter, deque
+from functools import partial
+from typing import Collection, Deque, Dict, Callable, List, Optional, Sequence, Type, Union
 import logging
+from backend.core.service_layer.middleware import Middleware
+from backend.core.service_layer.routing import ReplicaRouter, read_only_scope
 from backend.core.service_layer.unit_of_work import AbstractUnitOfWork
 from backend.users.domain.commands import Command
 from backend.users.domain.events import Event
@@ -10,67 +16,218 @@ logger = logging.getLogger(__name__)
 Message = Union[Command, Event, Query]
 
 
+class QueryFlight:
+    """Идущее выполнение запроса и число ожидающих его результат."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
 class MessageBus:
+    """Диспетчер команд, запросов и событий.
+
+    Очередь сообщений своя у каждого вызова handle, а UoW создаётся через uow_factory на каждую
+    команду, запрос и вызов обработчика события и передаётся обработчику вторым аргументом.
+    Поэтому одна шина безопасно обслуживает конкурентные запросы в одном цикле событий.
+
+    Подряд идущие события обрабатываются пачкой: все их обработчики запускаются параллельно,
+    не больше max_concurrent_handlers одновременно, каждый ограничен handler_timeout секундами.
+    Ошибка или тайм-аут обработчика события логируется и не влияет на остальные обработчики и на результат команды.
+
+    Обработка каждой команды и запроса и каждый вызов обработчика события проходят через цепочку
+    middlewares, первое звено списка - внешнее.
+
+    События, опубликованные из outbox любым процессом, передаются в handle_worker_event: их обработчики
+    (worker_event_handlers) обновляют состояние в памяти этого процесса, например локальные кэши.
+
+    Одинаковые (тот же тип и те же поля) конкурентные запросы типов из coalesced_queries выполняются
+    один раз, результат получают все ожидающие. Поэтому результат таких запросов нельзя изменять.
+    Клиент в окне чтения своих записей (replica_router) к идущему выполнению не присоединяется:
+    оно могло начаться до его записи или на реплике, поэтому его запрос выполняется отдельно на основной БД.
+    """
+
     def __init__(
         self,
-        uow: AbstractUnitOfWork,
-        event_handlers: Dict[str, Callable],
+        uow_factory: Callable[[], AbstractUnitOfWork],
+        event_handlers: Dict[str, List[Callable]],
         command_handlers: Dict[str, Callable],
         query_handlers: Dict[str, Callable],
+        handler_timeout: Optional[float] = None,
+        max_concurrent_handlers: int = 10,
+        middlewares: Sequence[Middleware] = (),
+        coalesced_queries: Collection[Type[Query]] = (),
+        worker_event_handlers: Optional[Dict[str, List[Callable]]] = None,
+        replica_router: Optional[ReplicaRouter] = None,
     ):
-        self._uow = uow
+        self._uow_factory = uow_factory
         self._event_handlers = event_handlers
         self._command_handlers = command_handlers
         self._query_handlers = query_handlers
-        self.queue = []
+        self._worker_event_handlers = worker_event_handlers or {}
+        self.handler_timeout = handler_timeout
+        self.max_concurrent_handlers = max_concurrent_handlers
+        self.middlewares = list(middlewares)
+        self.coalesced_queries = frozenset(coalesced_queries)
+        self.replica_router = replica_router
+        self._query_flights: Dict[tuple, QueryFlight] = {}
+        self.event_handler_failures = 0
+        self.event_handler_timeouts = 0
+        self.query_executions: Counter[str] = Counter()
+        self.query_executions_saved: Counter[str] = Counter()
+        self.query_executions_sticky: Counter[str] = Counter()
 
     async def handle(self, message: Message):
-        self.queue = [message]
+        queue: Deque[Message] = deque([message])
         result = None
 
-        while self.queue:
-            message = self.queue.pop(0)
+        while queue:
+            message = queue.popleft()
 
             if isinstance(message, Command):
-                await self.handle_command(message)
+                uow = self._uow_factory()
+                result = await self.handle_command(message, uow)
+                queue.extend(uow.collect_new_events())
             elif isinstance(message, Event):
-                await self.handle_event(message)
+                events = [message]
+
+                while queue and isinstance(queue[0], Event):
+                    events.append(queue.popleft())
+
+                await self.handle_events(events, queue)
             elif isinstance(message, Query):
-                result = await self.handle_query(message)
+                result = await self.handle_coalesced_query(message)
             else:
                 raise Exception(f'{message} was not Event or Command')
 
         return result
 
-    async def handle_event(self, event: Event):
-        for handler in self._event_handlers.values():
+    async def handle_events(self, events: List[Event], queue: Deque[Message]):
+        semaphore = asyncio.Semaphore(self.max_concurrent_handlers)
+
+        async with asyncio.TaskGroup() as task_group:
+            for event in events:
+                for handler in self._event_handlers.get(type(event), []):
+                    task_group.create_task(self._run_event_handler(event, handler, semaphore, queue))
+
+    async def handle_worker_event(self, event: Event):
+        """Обрабатывает опубликованное событие обработчиками состояния процесса. Их новые события не обрабатываются."""
+
+        semaphore = asyncio.Semaphore(self.max_concurrent_handlers)
+
+        async with asyncio.TaskGroup() as task_group:
+            for handler in self._worker_event_handlers.get(type(event), []):
+                task_group.create_task(self._run_event_handler(event, handler, semaphore, deque()))
+
+    async def _run_event_handler(
+        self,
+        event: Event,
+        handler: Callable,
+        semaphore: asyncio.Semaphore,
+        queue: Deque[Message],
+    ):
+        async with semaphore:
+            logger.debug("handling event %s with handler %s", event, handler)
+            uow = self._uow_factory()
+
             try:
-                logger.debug("handling event %s with handler %s", event, handler)
-                handler(event)
-                self.queue.extend(await self._uow.collect_new_events())
+                async with asyncio.timeout(self.handler_timeout):
+                    name = f'{type(event).__name__}:{getattr(handler, "__name__", type(handler).__name__)}'
+                    await self._dispatch(name, event, handler, uow)
+            except TimeoutError:
+                self.event_handler_timeouts += 1
+                logger.error(f"Timeout handling event {event} after {self.handler_timeout}s")
             except Exception:
+                self.event_handler_failures += 1
                 logger.exception(f"Exception handling event {event}")
-                continue
+            else:
+                queue.extend(uow.collect_new_events())
 
-    async def handle_command(self, command: Command):
+    async def handle_command(self, command: Command, uow: AbstractUnitOfWork):
         logger.debug(f'handling command {command}')
 
         try:
             handler = self._command_handlers[type(command)]
-            await handler(command)
-            self.queue.extend(self._uow.collect_new_events())
+            result = await self._dispatch(type(command).__name__, command, handler, uow)
         except Exception:
             logger.exception(f"Exception handling command {command}")
             raise
+        else:
+            return result
 
-    async def handle_query(self, query: Query):
+    async def handle_coalesced_query(self, query: Query):
+        """Выполняет запрос или присоединяется к уже идущему выполнению такого же запроса.
+
+        Выполнение идёт в отдельной задаче: отмена одного ожидающего не отменяет его для остальных,
+        а когда отменены все ожидающие, отменяется и выполнение.
+        """
+
+        if type(query) not in self.coalesced_queries:
+            return await self.handle_query(query, self._uow_factory())
+
+        if self.replica_router is not None and self.replica_router.is_sticky():
+            self.query_executions_sticky[type(query).__name__] += 1
+            return await self.handle_query(query, self._uow_factory())
+
+        key = (type(query), repr(query))
+        flight = self._query_flights.get(key)
+
+        if flight is None:
+            flight = self._query_flights[key] = QueryFlight(
+                asyncio.create_task(self.handle_query(query, self._uow_factory()))
+            )
+            flight.task.add_done_callback(lambda _: self._query_flights.pop(key, None))
+            self.query_executions[type(query).__name__] += 1
+        else:
+            self.query_executions_saved[type(query).__name__] += 1
+
+        flight.waiters += 1
+
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+
+            raise
+        finally:
+            flight.waiters -= 1
+
+    async def handle_query(self, query: Query, uow: AbstractUnitOfWork):
         logger.debug(f'handling query {query}')
 
         try:
             handler = self._query_handlers[type(query)]
-            result = await handler(query)
+
+            with read_only_scope():
+                result = await self._dispatch(type(query).__name__, query, handler, uow)
         except Exception:
             logger.exception(f"Exception handling query {query}")
             raise
         else:
             return result
+
+    async def _dispatch(self, name: str, message: Message, handler: Callable, uow: AbstractUnitOfWork):
+        async def call_handler():
+            result = handler(message, uow)
+
+            if inspect.isawaitable(result):
+                result = await result
+
+            return result
+
+        call_next = call_handler
+
+        for middleware in reversed(self.middlewares):
+            call_next = partial(middleware, name, message, call_next)
+
+        return await call_next()
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            'event_handler_failures': self.event_handler_failures,
+            'event_handler_timeouts': self.event_handler_timeouts,
+            'query_executions': dict(self.query_executions),
+            'query_executions_saved': dict(self.query_executions_saved),
+            'query_executions_sticky': dict(self.query_executions_sticky),
+        }
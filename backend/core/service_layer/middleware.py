@@ -0,0 +1,120 @@
+import logging
+import random
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Optional
+
+from backend.core.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+CallNext = Callable[[], Awaitable[Any]]
+
+
+class Middleware:
+    """Звено цепочки вокруг обработки сообщения шиной.
+
+    name - тип сообщения, а для событий ещё и имя обработчика ("CreatedUser:invalidate_user_cache").
+    Звено обязано вызвать call_next и вернуть его результат.
+    """
+
+    async def __call__(self, name: str, message: Any, call_next: CallNext):
+        return await call_next()
+
+
+class TimingMiddleware(Middleware):
+    """Гистограммы длительности обработки и число ошибок по каждому name."""
+
+    def __init__(self):
+        self.histograms: defaultdict[str, Histogram] = defaultdict(Histogram)
+        self.errors: defaultdict[str, int] = defaultdict(int)
+
+    async def __call__(self, name: str, message: Any, call_next: CallNext):
+        started = time.perf_counter()
+
+        try:
+            return await call_next()
+        except Exception:
+            self.errors[name] += 1
+            raise
+        finally:
+            self.histograms[name].observe(time.perf_counter() - started)
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            name: {**histogram.snapshot(), 'errors': self.errors[name]}
+            for name, histogram in self.histograms.items()
+        }
+
+
+class InFlightMiddleware(Middleware):
+    """Число сообщений в обработке прямо сейчас: всего, по каждому name и максимум за время работы."""
+
+    def __init__(self):
+        self.in_flight: defaultdict[str, int] = defaultdict(int)
+        self.total = 0
+        self.peak = 0
+
+    async def __call__(self, name: str, message: Any, call_next: CallNext):
+        self.in_flight[name] += 1
+        self.total += 1
+        self.peak = max(self.peak, self.total)
+
+        try:
+            return await call_next()
+        finally:
+            self.in_flight[name] -= 1
+            self.total -= 1
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            'total': self.total,
+            'peak': self.peak,
+            'by_name': {name: count for name, count in self.in_flight.items() if count},
+        }
+
+
+class SlowMessageMiddleware(Middleware):
+    """Пишет в лог сообщения, обработка которых заняла дольше порога.
+
+    Порог берётся из thresholds по name, затем по типу сообщения, иначе default_threshold.
+    """
+
+    def __init__(self, default_threshold: float, thresholds: Optional[dict[str, float]] = None):
+        self.default_threshold = default_threshold
+        self.thresholds = thresholds or {}
+        self.slow = 0
+
+    def threshold(self, name: str, message: Any) -> float:
+        return self.thresholds.get(name, self.thresholds.get(type(message).__name__, self.default_threshold))
+
+    async def __call__(self, name: str, message: Any, call_next: CallNext):
+        started = time.perf_counter()
+
+        try:
+            return await call_next()
+        finally:
+            elapsed = time.perf_counter() - started
+            threshold = self.threshold(name, message)
+
+            if elapsed > threshold:
+                self.slow += 1
+                logger.warning(f'Slow message {name} took {elapsed:.3f}s (threshold {threshold}s)')
+
+    def metrics_snapshot(self) -> dict:
+        return {'slow': self.slow}
+
+
+class SampledMiddleware(Middleware):
+    """Пропускает через middleware только долю rate сообщений, остальные сразу идут дальше по цепочке."""
+
+    def __init__(self, middleware: Middleware, rate: float, sample: Callable[[], float] = random.random):
+        self.middleware = middleware
+        self.rate = rate
+        self.sample = sample
+
+    async def __call__(self, name: str, message: Any, call_next: CallNext):
+        if self.rate >= 1 or self.sample() < self.rate:
+            return await self.middleware(name, message, call_next)
+
+        return await call_next()
@@ -0,0 +1,98 @@
+import asyncio
+import inspect
+import logging
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import delete, select
+
+from backend.core.metrics import Histogram
+from backend.core.orm.models import OutboxMessages
+
+logger = logging.getLogger(__name__)
+
+
+def dispatch_lag(created_at: datetime) -> float:
+    """Время в секундах от записи события в outbox до его публикации."""
+
+    # sqlite не хранит часовой пояс, время в outbox всегда пишется в UTC.
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+
+    return (datetime.now(timezone.utc) - created_at).total_seconds()
+
+
+class OutboxRelay:
+    """Фоновая публикация событий из outbox в брокер сообщений.
+
+    Пачка до batch_size событий выбирается в порядке записи через SELECT ... FOR UPDATE SKIP LOCKED,
+    поэтому несколько воркеров разбирают outbox параллельно, не публикуя одно событие дважды.
+    События пачки публикуются одновременно, так что публикатор может отправить их одним pipeline.
+    Опубликованные события удаляются в той же транзакции. Если публикация упала, транзакция
+    откатывается и пачка будет опубликована повторно: доставка "хотя бы один раз".
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        publish: Callable,
+        batch_size: int,
+        poll_interval: float,
+    ):
+        self.session_factory = session_factory
+        self.publish = publish
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.published = 0
+        self.failures = 0
+        self.dispatch_lag = Histogram(buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0))
+
+    async def relay_once(self) -> int:
+        """Публикует одну пачку событий и возвращает число опубликованных."""
+
+        query = (
+            select(OutboxMessages)
+            .order_by(OutboxMessages.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+
+        async with self.session_factory() as session:
+            async with session.begin():
+                messages = (await session.execute(query)).scalars().all()
+
+                results = [self.publish(message.channel, message.payload) for message in messages]
+                await asyncio.gather(*(result for result in results if inspect.isawaitable(result)))
+
+                if messages:
+                    await session.execute(
+                        delete(OutboxMessages).where(OutboxMessages.id.in_([message.id for message in messages]))
+                    )
+
+        for message in messages:
+            self.dispatch_lag.observe(dispatch_lag(message.created_at))
+
+        self.published += len(messages)
+
+        return len(messages)
+
+    async def run(self):
+        """Разбирает outbox, пока задачу не отменят. Пока outbox не пуст, пачки идут без пауз."""
+
+        while True:
+            try:
+                relayed = await self.relay_once()
+            except Exception:
+                self.failures += 1
+                relayed = 0
+                logger.exception('Failed to relay outbox messages')
+
+            if relayed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            'published': self.published,
+            'failures': self.failures,
+            'dispatch_lag_seconds': self.dispatch_lag.snapshot(),
+        }
@@ -0,0 +1,202 @@
+import itertools
+import logging
+import math
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from backend.core.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+ROUND_ROBIN = 'round_robin'
+LEAST_LOADED = 'least_loaded'
+
+_read_only: ContextVar[bool] = ContextVar('read_only', default=False)
+_caller: ContextVar[Optional[str]] = ContextVar('caller', default=None)
+
+POSTGRES_LAG_QUERY = text(
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+)
+
+
+@contextmanager
+def read_only_scope():
+    """Помечает текущий контекст выполнения как только читающий: UoW может уйти на реплику."""
+
+    token = _read_only.set(True)
+
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+def is_read_only() -> bool:
+    return _read_only.get()
+
+
+@contextmanager
+def caller_scope(caller: str):
+    """Помечает текущий контекст выполнения ключом клиента: чтение после записи привязывается к нему."""
+
+    token = _caller.set(caller)
+
+    try:
+        yield
+    finally:
+        _caller.reset(token)
+
+
+async def probe_replication_lag(engine: AsyncEngine) -> float:
+    """Возвращает отставание реплики в секундах. Для не-postgresql движков отставание считается нулевым."""
+
+    if engine.dialect.name != 'postgresql':
+        return 0.0
+
+    async with engine.connect() as connection:
+        lag = await connection.scalar(POSTGRES_LAG_QUERY)
+
+    return float(lag or 0)
+
+
+class Replica:
+    """Реплика БД для чтения: движок, фабрика сессий, последнее измеренное отставание и число открытых сессий."""
+
+    def __init__(self, name: str, engine: AsyncEngine, session_factory: Callable):
+        self.name = name
+        self.engine = engine
+        self.session_factory = session_factory
+        self.lag = 0.0
+        self.lag_checked_at: Optional[float] = None
+        self.in_flight = 0
+
+
+class ReplicaRouter:
+    """Выбирает реплику для запросов на чтение.
+
+    Реплика пропускается, если её отставание больше max_lag. Если подходящих реплик нет, чтение идёт
+    на основную БД. Туда же в течение read_your_writes_window секунд после записи идёт чтение того же
+    клиента (caller_scope); без ключа клиента запись не делает чтение липким. Время записи хранится
+    не больше чем для max_sticky_callers клиентов.
+    """
+
+    def __init__(
+        self,
+        replicas: list[Replica],
+        strategy: str = ROUND_ROBIN,
+        max_lag: float = 5.0,
+        lag_check_interval: float = 1.0,
+        read_your_writes_window: float = 2.0,
+        max_sticky_callers: int = 10000,
+        lag_probe: Callable[[AsyncEngine], Awaitable[float]] = probe_replication_lag,
+    ):
+        if strategy not in (ROUND_ROBIN, LEAST_LOADED):
+            raise ValueError(f'Unknown replica routing strategy {strategy}')
+
+        self.replicas = replicas
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self.read_your_writes_window = read_your_writes_window
+        self.max_sticky_callers = max_sticky_callers
+        self._lag_probe = lag_probe
+        self._round_robin = itertools.cycle(replicas) if replicas else None
+        self._last_write_at: OrderedDict[str, float] = OrderedDict()
+        self.routed = {replica.name: 0 for replica in replicas}
+        self.sticky_reads = 0
+        self.fallbacks = 0
+
+    def mark_write(self):
+        caller = _caller.get()
+
+        if caller is None:
+            return
+
+        self._last_write_at[caller] = time.monotonic()
+        self._last_write_at.move_to_end(caller)
+
+        while len(self._last_write_at) > self.max_sticky_callers:
+            self._last_write_at.popitem(last=False)
+
+    def is_sticky(self) -> bool:
+        """Идёт ли для текущего клиента окно чтения своих записей: тогда он читает с основной БД."""
+
+        caller = _caller.get()
+        last_write_at = self._last_write_at.get(caller) if caller is not None else None
+
+        return last_write_at is not None and time.monotonic() - last_write_at < self.read_your_writes_window
+
+    async def _refresh_lag(self, replica: Replica):
+        now = time.monotonic()
+
+        if replica.lag_checked_at is not None and now - replica.lag_checked_at < self.lag_check_interval:
+            return
+
+        replica.lag_checked_at = now
+
+        try:
+            replica.lag = await self._lag_probe(replica.engine)
+        except Exception:
+            logger.exception(f'Failed to probe replication lag of {replica.name}')
+            replica.lag = math.inf
+
+    async def acquire(self) -> Optional[Replica]:
+        """Возвращает реплику для чтения или None, если читать нужно с основной БД.
+
+        Выданную реплику нужно вернуть через release, по этому счётчику работает стратегия least_loaded.
+        """
+
+        if not self.replicas:
+            return None
+
+        if self.is_sticky():
+            self.sticky_reads += 1
+            return None
+
+        for replica in self.replicas:
+            await self._refresh_lag(replica)
+
+        candidates = [replica for replica in self.replicas if replica.lag <= self.max_lag]
+
+        if not candidates:
+            self.fallbacks += 1
+            return None
+
+        if self.strategy == LEAST_LOADED:
+            replica = min(candidates, key=lambda candidate: candidate.in_flight)
+        else:
+            replica = next(self._round_robin)
+
+            while replica not in candidates:
+                replica = next(self._round_robin)
+
+        self.routed[replica.name] += 1
+        replica.in_flight += 1
+
+        return replica
+
+    @staticmethod
+    def release(replica: Replica):
+        replica.in_flight -= 1
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            'strategy': self.strategy,
+            'routed': dict(self.routed),
+            'lag_seconds': {
+                replica.name: replica.lag if math.isfinite(replica.lag) else None for replica in self.replicas
+            },
+            'in_flight': {replica.name: replica.in_flight for replica in self.replicas},
+            'sticky_reads': self.sticky_reads,
+            'fallbacks': self.fallbacks,
+        }
+
+    def register_metrics(self, name: str = 'db_routing'):
+        metrics_registry.register(name, self.metrics_snapshot)
@@ -1,11 +1,17 @@
 import logging
 from abc import ABC, abstractmethod
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from backend.core.adapters.cache import AbstractCache
+from backend.core.adapters.db_pool import create_engine
+from backend.core.orm.models import OutboxMessages
+from backend.core.service_layer.routing import Replica, ReplicaRouter, is_read_only
 from backend.users.adapters.repository import (
     AbstractRepository,
+    AbstractUserReadRepository,
+    CachedUserReadRepository,
+    UserSqlAlchemyReadRepository,
     UserSqlAlchemyRepository,
 )
 from backend.config import settings
@@ -38,25 +44,77 @@ class AbstractUnitOfWork(ABC):
         raise NotImplementedError
 
 
-engine = create_async_engine(url=settings.get_database_url, echo=False, poolclass=NullPool)
-DEFAULT_SESSION_FACTORY = sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+def make_session_factory(bind) -> sessionmaker:
+    return sessionmaker(
+        bind=bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+
+
+engine = create_engine(url=settings.get_database_url)
+DEFAULT_SESSION_FACTORY = make_session_factory(engine)
 logger.debug(f'Engine started to database: {settings.get_database_url}')
 
+replicas = []
+
+for number, replica_url in enumerate(settings.get_replica_database_urls):
+    replica_engine = create_engine(url=replica_url, name=f'replica_{number}')
+    replicas.append(Replica(f'replica_{number}', replica_engine, make_session_factory(replica_engine)))
+
+DEFAULT_REPLICA_ROUTER = ReplicaRouter(
+    replicas=replicas,
+    strategy=settings.POSTGR_REPLICA_STRATEGY,
+    max_lag=settings.POSTGR_REPLICA_MAX_LAG,
+    lag_check_interval=settings.POSTGR_REPLICA_LAG_CHECK_INTERVAL,
+    read_your_writes_window=settings.POSTGR_READ_YOUR_WRITES_WINDOW,
+)
+DEFAULT_REPLICA_ROUTER.register_metrics()
+
 
 class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
-    """Реализует интерфейс управления сессиями для модели пользователя."""
+    """Реализует интерфейс управления сессиями для модели пользователя.
 
-    users: AbstractRepository
+    При commit новые события сущностей записываются в outbox в той же транзакции, публикует их OutboxRelay.
+    Там же, если пользователи менялись, увеличивается версия таблицы (строка счётчика блокируется только на commit).
+    Внутри read_only_scope (обработка Query) сессия открывается на реплике, выбранной replica_router.
+    После успешного commit следующие чтения того же клиента (caller_scope) какое-то время идут на основную БД.
+    Если передан cache, поиск пользователя по id, почте и тегу в users_view идёт через него.
+    """
 
-    def __init__(self, session_factory=DEFAULT_SESSION_FACTORY):
+    users: AbstractRepository
+    users_view: AbstractUserReadRepository
+
+    def __init__(
+        self,
+        session_factory=DEFAULT_SESSION_FACTORY,
+        replica_router: ReplicaRouter = DEFAULT_REPLICA_ROUTER,
+        cache: AbstractCache = None,
+    ):
         self.session_factory = session_factory
+        self.replica_router = replica_router
+        self.cache = cache
+        # До входа в UoW репозиторий без сессии: обработчик мог не открывать UoW, и событий у него нет.
+        self.read_only = False
+        self.replica = None
+        self.committed = False
+        self.session: Optional[AsyncSession] = None
+        self.users = UserSqlAlchemyRepository(session=self.session)
+        self._outboxed_events = {}
 
     async def __aenter__(self) -> 'AbstractUnitOfWork':
-        self.session: AsyncSession = self.session_factory()
+        self.read_only = is_read_only()
+        self.replica = None
+        self.committed = False
+
+        if self.read_only and self.replica_router is not None:
+            self.replica = await self.replica_router.acquire()
+
+        session_factory = self.replica.session_factory if self.replica else self.session_factory
+        self.session = session_factory()
+        self.users = UserSqlAlchemyRepository(session=self.session)
+        # События уже записанные в outbox по id(); ссылки держатся, чтобы id не переиспользовались.
+        self._outboxed_events = {}
 
         return await super().__aenter__()
 
@@ -65,17 +123,48 @@ class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
 
         await self.session.close()
 
+        if self.replica is not None:
+            self.replica_router.release(self.replica)
+        elif self.committed and self.replica_router is not None:
+            self.replica_router.mark_write()
+
     async def _commit(self):
+        for event in self._pending_events():
+            if id(event) not in self._outboxed_events:
+                self._outboxed_events[id(event)] = event
+                self.session.add(OutboxMessages.from_event(event))
+
+        await self.users.bump_version()
         await self.session.commit()
+        self.committed = True
 
     async def rollback(self):
         await self.session.rollback()
 
     @property
-    def users(self):
-        return UserSqlAlchemyRepository(session=self.session)
+    def users_view(self):
+        users_view = UserSqlAlchemyReadRepository(session=self.session)
+
+        if self.cache is None:
+            return users_view
+
+        return CachedUserReadRepository(
+            repository=users_view,
+            cache=self.cache,
+            ttl=settings.USERS_CACHE_TTL,
+            negative_ttl=settings.USERS_CACHE_NEGATIVE_TTL,
+        )
+
+    def _pending_events(self):
+        for user in self.users.seen:
+            yield from user.events
+
+        yield from self.users.events
 
     def collect_new_events(self):
         for user in self.users.seen:
             while user.events:
                 yield user.events.pop(0)
+
+        while self.users.events:
+            yield self.users.events.pop(0)
@@ -5,6 +5,9 @@ from fastapi import (
 from backend.config import (
     settings,
 )
+from backend.core.endpoints.api_v1.endpoints import (
+    router as metrics_router,
+)
 from backend.users.endpoints.api_v1.endpoints import (
     router as users_router,
 )
@@ -18,3 +21,7 @@ router = APIRouter(
 router.include_router(
     router=users_router,
 )
+
+router.include_router(
+    router=metrics_router,
+)
@@ -0,0 +1,101 @@
+"""Подбор стоимости хэширования паролей под целевую задержку на текущей машине.
+
+Для bcrypt подбирается число раундов, для argon2id — time_cost при заданных memory_cost и parallelism.
+Выбирается самая дорогая настройка, которая укладывается в целевую задержку. Результат печатается
+строками для .env. После смены параметров старые хэши пересчитываются при следующем входе пользователя.
+
+Запуск: python -m backend.scripts.calibrate_password_hashing --scheme argon2 [--target-ms 250] [--repeat 3]
+"""
+
+import argparse
+import statistics
+import time
+
+from passlib.context import CryptContext
+
+from backend.config import settings
+
+BCRYPT_MIN_ROUNDS = 4
+BCRYPT_MAX_ROUNDS = 20
+ARGON2_MAX_TIME_COST = 50
+
+
+def measure(context: CryptContext, repeat: int) -> float:
+    timings = []
+
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        context.hash('calibration-password')
+        timings.append(time.perf_counter() - started_at)
+
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(target: float, repeat: int) -> dict[str, int]:
+    chosen = BCRYPT_MIN_ROUNDS
+
+    for rounds in range(BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS + 1):
+        elapsed = measure(CryptContext(schemes=['bcrypt'], bcrypt__rounds=rounds), repeat)
+        print(f'bcrypt rounds={rounds}: {elapsed * 1000:.1f} ms')
+
+        if elapsed > target:
+            break
+
+        chosen = rounds
+
+    return {'PASSWORD_BCRYPT_ROUNDS': chosen}
+
+
+def calibrate_argon2(target: float, repeat: int, memory_cost: int, parallelism: int) -> dict[str, int]:
+    chosen = 1
+
+    for time_cost in range(1, ARGON2_MAX_TIME_COST + 1):
+        context = CryptContext(
+            schemes=['argon2'],
+            argon2__type='ID',
+            argon2__time_cost=time_cost,
+            argon2__memory_cost=memory_cost,
+            argon2__parallelism=parallelism,
+        )
+        elapsed = measure(context, repeat)
+        print(f'argon2id time_cost={time_cost} memory_cost={memory_cost}: {elapsed * 1000:.1f} ms')
+
+        if elapsed > target:
+            if time_cost == 1:
+                print('Even time_cost=1 exceeds the target, consider lowering --memory-cost')
+            break
+
+        chosen = time_cost
+
+    return {
+        'PASSWORD_ARGON2_TIME_COST': chosen,
+        'PASSWORD_ARGON2_MEMORY_COST': memory_cost,
+        'PASSWORD_ARGON2_PARALLELISM': parallelism,
+    }
+
+
+def main(scheme: str, target_ms: float, repeat: int, memory_cost: int, parallelism: int):
+    target = target_ms / 1000
+
+    if scheme == 'bcrypt':
+        parameters = calibrate_bcrypt(target, repeat)
+    else:
+        parameters = calibrate_argon2(target, repeat, memory_cost, parallelism)
+
+    print()
+    print(f'PASSWORD_SCHEMES = {scheme}' + ('' if scheme == 'bcrypt' else ', bcrypt'))
+
+    for name, value in parameters.items():
+        print(f'{name} = {value}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scheme', choices=('bcrypt', 'argon2'), default='argon2')
+    parser.add_argument('--target-ms', type=float, default=250)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--memory-cost', type=int, default=settings.PASSWORD_ARGON2_MEMORY_COST)
+    parser.add_argument('--parallelism', type=int, default=settings.PASSWORD_ARGON2_PARALLELISM)
+    arguments = parser.parse_args()
+
+    main(arguments.scheme, arguments.target_ms, arguments.repeat, arguments.memory_cost, arguments.parallelism)
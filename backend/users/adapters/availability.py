@@ -0,0 +1,260 @@
+import logging
+import math
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Optional
+
+from pydantic import EmailStr
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from backend.config import settings
+from backend.core.adapters.bloom import CountingBloomFilter, bloom_parameters, bloom_positions
+from backend.core.adapters.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+MEMORY_BACKEND = 'memory'
+REDIS_BACKEND = 'redis'
+
+# KEYS: фильтр и перестраиваемый фильтр; ARGV: позиции битов.
+# Биты ставятся только в существующие ключи, иначе недостроенный фильтр выглядел бы готовым.
+ADD_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        for i = 1, #ARGV do
+            redis.call('SETBIT', key, ARGV[i], 1)
+        end
+    end
+end
+
+return 1
+"""
+
+
+class UserAvailabilityFilter(ABC):
+    """Bloom filter занятых почт и тегов пользователей.
+
+    Пока фильтр не построен (ready=False), он не даёт ответов и проверка идёт в БД.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.filter_answers = 0
+        self.database_checks = 0
+        self.false_positives = 0
+
+    async def add(self, email: Optional[EmailStr], tag: Optional[str]):
+        await self._add(self._items(email, tag))
+
+    async def remove(self, email: Optional[EmailStr], tag: Optional[str]):
+        await self._remove(self._items(email, tag))
+
+    async def might_be_taken(self, email: Optional[EmailStr] = None, tag: Optional[str] = None) -> bool:
+        """Возвращает False, только если почта и тег точно свободны."""
+
+        return await self._might_contain(self._items(email, tag))
+
+    @abstractmethod
+    async def rebuild(self, users_data: AsyncIterator[dict]):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _add(self, items: list[str]):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _remove(self, items: list[str]):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _might_contain(self, items: list[str]) -> bool:
+        raise NotImplementedError
+
+    @staticmethod
+    def _items(email: Optional[EmailStr], tag: Optional[str]) -> list[str]:
+        items = []
+
+        if email is not None:
+            items.append(f'email:{email}')
+        if tag is not None:
+            items.append(f'tag:{tag}')
+
+        return items
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            'ready': self.ready,
+            'filter_answers': self.filter_answers,
+            'database_checks': self.database_checks,
+            'false_positives': self.false_positives,
+        }
+
+
+class InMemoryUserAvailabilityFilter(UserAvailabilityFilter):
+    """Counting Bloom filter в памяти процесса для одного воркера и тестов.
+
+    Фильтр узнаёт только о пользователях, созданных в этом процессе, поэтому при нескольких воркерах
+    его отрицательный ответ неверен до перестроения - там нужен redis.
+    Во время перестроения новые пользователи добавляются в оба фильтра, а удаления применяются только
+    к текущему: лишний элемент даёт лишь ложноположительный ответ, который проверяется в БД.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        super().__init__()
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter = self._new_filter()
+        self._building: Optional[CountingBloomFilter] = None
+
+    def _new_filter(self) -> CountingBloomFilter:
+        return CountingBloomFilter(capacity=self.capacity * 2, error_rate=self.error_rate)
+
+    async def rebuild(self, users_data: AsyncIterator[dict]):
+        self._building = self._new_filter()
+
+        try:
+            async for user_data in users_data:
+                self._building.add(f'email:{user_data["email"]}')
+                self._building.add(f'tag:{user_data["tag"]}')
+
+            self._filter = self._building
+            self.ready = True
+        finally:
+            self._building = None
+
+    async def _add(self, items: list[str]):
+        for item in items:
+            self._filter.add(item)
+
+            if self._building is not None:
+                self._building.add(item)
+
+    async def _remove(self, items: list[str]):
+        if not self.ready:
+            return
+
+        for item in items:
+            self._filter.remove(item)
+
+    async def _might_contain(self, items: list[str]) -> bool:
+        return not self.ready or any(item in self._filter for item in items)
+
+
+class RedisUserAvailabilityFilter(UserAvailabilityFilter):
+    """Bloom filter в битовой строке Redis (SETBIT/GETBIT), общий для всех воркеров и воркера потока команд.
+
+    Созданный пользователь виден всем воркерам сразу после обработки CreatedUser. Из битового фильтра
+    нельзя удалять, поэтому удалённые почты и теги дают ложноположительный ответ до перестроения.
+    Перестраивает фильтр один воркер за rebuild_interval: остальные видят метку и пропускают перестроение.
+    При ошибке Redis проверка идёт в БД, а если не удалось добавить пользователя, фильтр удаляется
+    до следующего перестроения, чтобы не давать ложноотрицательных ответов.
+    """
+
+    key = 'users:availability'
+    building_key = 'users:availability:building'
+    rebuilt_key = 'users:availability:rebuilt'
+    rebuild_batch_size = 1000
+
+    def __init__(self, redis: aioredis.Redis, capacity: int, error_rate: float, rebuild_interval: float):
+        super().__init__()
+
+        self.redis = redis
+        self.size, self.hash_count = bloom_parameters(capacity * 2, error_rate)
+        self.rebuild_interval = rebuild_interval
+        self._add_script = redis.register_script(ADD_SCRIPT)
+        self.redis_errors = 0
+
+    def _positions(self, items: list[str]) -> list[int]:
+        return [position for item in items for position in bloom_positions(item, self.size, self.hash_count)]
+
+    async def _set_bits(self, key: str, positions: list[int]):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for position in positions:
+                pipe.setbit(key, position, 1)
+
+            await pipe.execute()
+
+    async def rebuild(self, users_data: AsyncIterator[dict]):
+        if not await self.redis.set(self.rebuilt_key, 1, nx=True, ex=math.ceil(self.rebuild_interval)):
+            return
+
+        try:
+            # Ключ создаётся до чтения пользователей: созданные после этого попадут в него через add.
+            await self.redis.delete(self.building_key)
+            await self.redis.setbit(self.building_key, self.size - 1, 0)
+            positions = []
+
+            async for user_data in users_data:
+                positions.extend(self._positions([f'email:{user_data["email"]}', f'tag:{user_data["tag"]}']))
+
+                if len(positions) >= self.rebuild_batch_size * 2 * self.hash_count:
+                    await self._set_bits(self.building_key, positions)
+                    positions = []
+
+            await self._set_bits(self.building_key, positions)
+            await self.redis.rename(self.building_key, self.key)
+            self.ready = True
+        except BaseException:
+            await self.redis.delete(self.rebuilt_key)
+            raise
+
+    async def _add(self, items: list[str]):
+        try:
+            await self._add_script(keys=[self.key, self.building_key], args=self._positions(items))
+        except RedisError:
+            self.redis_errors += 1
+            logger.exception('Failed to add user to availability filter, dropping the filter until rebuild')
+
+            try:
+                await self.redis.delete(self.key, self.rebuilt_key)
+            except RedisError:
+                logger.exception('Failed to drop user availability filter')
+
+    async def _remove(self, items: list[str]):
+        pass
+
+    async def _might_contain(self, items: list[str]) -> bool:
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.exists(self.key)
+
+                for position in self._positions(items):
+                    pipe.getbit(self.key, position)
+
+                exists, *bits = await pipe.execute()
+        except RedisError:
+            self.redis_errors += 1
+            logger.exception('Failed to check user availability filter')
+
+            return True
+
+        self.ready = bool(exists)
+
+        if not self.ready:
+            return True
+
+        return any(all(bits[start:start + self.hash_count]) for start in range(0, len(bits), self.hash_count))
+
+    def metrics_snapshot(self) -> dict:
+        return {**super().metrics_snapshot(), 'redis_errors': self.redis_errors}
+
+
+def build_user_availability_filter(backend: str) -> UserAvailabilityFilter:
+    """Создаёт фильтр занятых почт и тегов по названию бэкенда (memory или redis) и настройкам USERS_AVAILABILITY_*."""
+
+    if backend == MEMORY_BACKEND:
+        return InMemoryUserAvailabilityFilter(
+            capacity=settings.USERS_AVAILABILITY_FILTER_CAPACITY,
+            error_rate=settings.USERS_AVAILABILITY_FILTER_ERROR_RATE,
+        )
+
+    if backend == REDIS_BACKEND:
+        return RedisUserAvailabilityFilter(
+            redis=get_redis(),
+            capacity=settings.USERS_AVAILABILITY_FILTER_CAPACITY,
+            error_rate=settings.USERS_AVAILABILITY_FILTER_ERROR_RATE,
+            rebuild_interval=settings.USERS_AVAILABILITY_FILTER_REBUILD_INTERVAL,
+        )
+
+    raise ValueError(f'Unknown user availability filter backend {backend}')
@@ -1,16 +1,116 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import (
     FastAPI,
+    Request,
 )
 
+from backend.config import settings
+from backend.core.adapters import redis_eventpublisher
+from backend.core.metrics import metrics_registry
+from backend.core.service_layer.outbox import OutboxRelay
+from backend.core.service_layer.routing import caller_scope
+from backend.core.service_layer.unit_of_work import DEFAULT_SESSION_FACTORY
 from backend.endpoints.api_v1.api_v1_router import (
     router as api_v1_router,
 )
+from backend.users.adapters.notifications import get_email_notifications
+from backend.users.domain.commands import RebuildUserAvailabilityFilter
+from backend.users.endpoints.api_v1.endpoints import bus
+from backend.users.service_layer.handlers import WORKER_EVENT_HANDLERS
+
+logger = logging.getLogger(__name__)
+
+WORKER_EVENT_TYPES = {event_type.__name__: event_type for event_type in WORKER_EVENT_HANDLERS}
+RESUBSCRIBE_DELAY = 1.0
+
+event_publisher = redis_eventpublisher.get_event_publisher()
+metrics_registry.register('redis_event_publisher', event_publisher.metrics_snapshot)
+
+outbox_relay = OutboxRelay(
+    session_factory=DEFAULT_SESSION_FACTORY,
+    publish=event_publisher.publish,
+    batch_size=settings.OUTBOX_RELAY_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_RELAY_POLL_INTERVAL,
+)
+metrics_registry.register('outbox_relay', outbox_relay.metrics_snapshot)
+
+
+async def rebuild_user_availability_filter_periodically():
+    """Строит Bloom filter занятых почт и тегов при старте и перестраивает его раз в интервал."""
+
+    while True:
+        try:
+            await bus.handle(RebuildUserAvailabilityFilter())
+        except Exception:
+            logger.exception('Failed to rebuild user availability filter')
+
+        await asyncio.sleep(settings.USERS_AVAILABILITY_FILTER_REBUILD_INTERVAL)
+
+
+async def handle_published_event(channel: str, data: dict):
+    await bus.handle_worker_event(WORKER_EVENT_TYPES[channel](**data))
+
+
+async def listen_worker_events():
+    """Передаёт опубликованные из outbox события обработчикам состояния этого воркера.
+
+    После обрыва подписки переподписывается. События, опубликованные без подписки, теряются:
+    устаревшие записи локальных кэшей живут до истечения их TTL.
+    """
+
+    while True:
+        try:
+            await event_publisher.listen(list(WORKER_EVENT_TYPES), handle_published_event)
+        except Exception:
+            logger.exception('Worker events subscription failed, resubscribing')
+            await asyncio.sleep(RESUBSCRIBE_DELAY)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    background_tasks = [
+        asyncio.create_task(rebuild_user_availability_filter_periodically()),
+        asyncio.create_task(outbox_relay.run()),
+        asyncio.create_task(listen_worker_events()),
+    ]
+
+    if settings.get_redis_subscribe_channels:
+        background_tasks.append(asyncio.create_task(
+            event_publisher.listen(settings.get_redis_subscribe_channels, redis_eventpublisher.log_message)
+        ))
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await event_publisher.flush()
+    await get_email_notifications().close()
+
 
 backend = FastAPI(
     title='Mini-Chat',
+    lifespan=lifespan,
 )
 
 
+@backend.middleware('http')
+async def scope_reads_to_client(request: Request, call_next):
+    """Чтение после записи привязывается к клиенту: к токену доступа, а без него - к адресу клиента."""
+
+    caller = request.cookies.get('users_access_token') or (request.client.host if request.client else None)
+
+    if caller is None:
+        return await call_next(request)
+
+    with caller_scope(caller):
+        return await call_next(request)
+
+
 backend.include_router(
     router=api_v1_router,
 )
@@ -0,0 +1,51 @@
+from typing import Optional
+
+from backend.core.adapters.rate_limit import AbstractRateLimiter, RateLimitExceeded
+
+
+class LoginThrottle:
+    """Ограничивает частоту попыток входа по IP клиента и по почте.
+
+    Проверяется до поиска пользователя и хэширования пароля, чтобы перебор паролей не занимал CPU воркеров.
+    Оба лимита проверяются до увеличения счётчиков: отклонённая попытка не расходует ни один из них.
+    За обратным прокси IP клиента берётся из X-Forwarded-For, только если uvicorn запущен с --proxy-headers
+    и адресом прокси в --forwarded-allow-ips, иначе все клиенты делят лимит адреса прокси.
+    """
+
+    def __init__(self, limiter: AbstractRateLimiter, per_email: int, per_ip: int, window: int):
+        self.limiter = limiter
+        self.per_email = per_email
+        self.per_ip = per_ip
+        self.window = window
+        self.allowed = 0
+        self.rejected = {'ip': 0, 'email': 0}
+
+    async def check(self, email: str, ip: Optional[str]):
+        """Учитывает попытку входа.
+
+        Raises:
+            RateLimitExceeded: превышен лимит попыток для IP или почты.
+        """
+
+        limits = {f'login:email:{email.lower()}': ('email', self.per_email)}
+
+        if ip is not None:
+            limits = {f'login:ip:{ip}': ('ip', self.per_ip), **limits}
+
+        rejected = await self.limiter.hit_all([(key, limit) for key, (_, limit) in limits.items()], self.window)
+
+        if rejected is not None:
+            key, retry_after = rejected
+            self.rejected[limits[key][0]] += 1
+            raise RateLimitExceeded(retry_after)
+
+        self.allowed += 1
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            'allowed': self.allowed,
+            'rejected': dict(self.rejected),
+            'per_email': self.per_email,
+            'per_ip': self.per_ip,
+            'window_seconds': self.window,
+        }
@@ -1,24 +1,185 @@
+import asyncio
 import logging
-import smtplib
+import time
+from email.message import EmailMessage
+from typing import Optional
+
+import aiosmtplib
 
 from backend.config import settings
 from backend.core.adapters.notifications import AbstractNotifications
+from backend.core.adapters.smtp_pool import SMTPConnectionPool
+from backend.core.metrics import Histogram
 
 logger = logging.getLogger(__name__)
 
+SUBJECT = 'Уведомление сервиса'
+
 
 class EmailNotifications(AbstractNotifications):
-    def __init__(self, smpt_host=settings.EMAIL_HOST, smpt_port=settings.EMAIL_PORT):
-        if smpt_host and smpt_port:
-            self.server = smtplib.SMTP(smpt_host, smpt_port)
-            self.server.noop()
-        else:
-            logger.debug('Email notification service is not configured')
-
-    def send(self, destination, message):
-        msg = f'Тема: уведомление сервиса\n{message}'
-        self.server.sendmail(
-            from_addr=settings.EMAIL_HOST_EMAIL,
-            to_addrs=[destination],
-            msg=msg,
+    """Отправка уведомлений по почте в фоне.
+
+    send только ставит письмо в ограниченную очередь в памяти процесса и не ждёт SMTP. Очередь разбирают
+    workers фоновых задач, запущенных при первом письме, письма отправляются через пул соединений.
+    Неудачная отправка повторяется до max_retries раз с паузой retry_backoff * 2 ** попытка.
+    Если очередь заполнена, письмо отбрасывается. Если pool не передан, уведомления не отправляются.
+    При закрытии очередь дорабатывается не дольше drain_timeout секунд, неотправленные письма считаются в dropped.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[SMTPConnectionPool],
+        sender: str,
+        queue_size: int,
+        workers: int,
+        max_retries: int,
+        retry_backoff: float,
+        drain_timeout: float = 10.0,
+    ):
+        self.pool = pool
+        self.sender = sender
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.drain_timeout = drain_timeout
+        self._queue: asyncio.Queue[tuple[EmailMessage, float]] = asyncio.Queue(maxsize=queue_size)
+        self._worker_tasks: list[asyncio.Task] = []
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.latency = Histogram(buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+
+    async def send(self, destination, message):
+        if self.pool is None:
+            logger.debug(f'Email notification to {destination} skipped: service is not configured')
+            return
+
+        email = EmailMessage()
+        email['From'] = self.sender
+        email['To'] = destination
+        email['Subject'] = SUBJECT
+        email.set_content(message)
+
+        try:
+            self._queue.put_nowait((email, time.monotonic()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f'Email notification to {destination} dropped: send queue is full')
+            return
+
+        self._ensure_workers()
+
+    def _ensure_workers(self):
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(asyncio.create_task(self._work_forever()))
+
+    async def _work_forever(self):
+        while True:
+            email, queued_at = await self._queue.get()
+
+            try:
+                await self._deliver(email)
+            except asyncio.CancelledError:
+                self.dropped += 1
+                raise
+            except Exception:
+                self.failed += 1
+                logger.exception(f'Failed to send email notification to {email["To"]}')
+            else:
+                self.sent += 1
+            finally:
+                self.latency.observe(time.monotonic() - queued_at)
+                self._queue.task_done()
+
+    async def _deliver(self, email: EmailMessage):
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.pool.connection() as smtp:
+                    await smtp.send_message(email)
+
+                return
+            except (aiosmtplib.SMTPException, OSError):
+                if attempt == self.max_retries:
+                    raise
+
+                self.retried += 1
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+
+    async def close(self):
+        """Дожидается отправки писем из очереди (не дольше drain_timeout), останавливает фоновые задачи
+        и закрывает соединения. Неотправленные письма отбрасываются.
+        """
+
+        if self._worker_tasks:
+            try:
+                async with asyncio.timeout(self.drain_timeout):
+                    await self._queue.join()
+            except TimeoutError:
+                logger.warning(f'Email queue was not drained in {self.drain_timeout}s, dropping undelivered messages')
+
+        for task in self._worker_tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self._queue.task_done()
+            self.dropped += 1
+
+        if self.pool is not None:
+            await self.pool.close()
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            'queued': self._queue.qsize(),
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'dropped': self.dropped,
+            'latency_seconds': self.latency.snapshot(),
+            'pool': self.pool.metrics_snapshot() if self.pool is not None else None,
+        }
+
+
+_notifications: Optional[EmailNotifications] = None
+
+
+def get_email_notifications() -> EmailNotifications:
+    """Возвращает общую для процесса отправку уведомлений по настройкам EMAIL_*.
+
+    Без EMAIL_HOST и EMAIL_PORT письма не отправляются.
+    """
+
+    global _notifications
+
+    if _notifications is not None:
+        return _notifications
+
+    pool = None
+
+    if settings.EMAIL_HOST and settings.EMAIL_PORT:
+        pool = SMTPConnectionPool(
+            hostname=settings.EMAIL_HOST,
+            port=int(settings.EMAIL_PORT),
+            size=settings.EMAIL_POOL_SIZE,
+            timeout=settings.EMAIL_TIMEOUT,
         )
+    else:
+        logger.debug('Email notification service is not configured')
+
+    _notifications = EmailNotifications(
+        pool=pool,
+        sender=settings.EMAIL_HOST_EMAIL,
+        queue_size=settings.EMAIL_QUEUE_MAX_SIZE,
+        workers=settings.EMAIL_WORKERS,
+        max_retries=settings.EMAIL_MAX_RETRIES,
+        retry_backoff=settings.EMAIL_RETRY_BACKOFF,
+        drain_timeout=settings.EMAIL_DRAIN_TIMEOUT,
+    )
+
+    return _notifications
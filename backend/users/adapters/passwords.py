@@ -0,0 +1,26 @@
+from typing import Optional
+
+from backend.core.adapters.worker_pool import WorkerPool
+from backend.users.service_layer.auth import get_password_hash, verify_and_update_password, verify_password
+
+
+class PasswordHasher:
+    """Хэширует и проверяет пароли в пуле воркеров, чтобы bcrypt не блокировал цикл событий.
+
+    При переполненном пуле методы поднимают WorkerPoolSaturated.
+    """
+
+    def __init__(self, pool: WorkerPool):
+        self.pool = pool
+
+    async def hash(self, password: str) -> str:
+        return await self.pool.run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.pool.run(verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        return await self.pool.run(verify_and_update_password, plain_password, hashed_password)
+
+    def metrics_snapshot(self) -> dict:
+        return self.pool.metrics_snapshot()
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import os
+import socket
+
+from backend.bootstrap import bootstrap
+from backend.config import settings
+from backend.core.adapters.metrics_server import start_metrics_server
+from backend.core.adapters.redis_client import get_redis
+from backend.core.adapters.redis_streams import RedisStreamConsumer, UndecodableCommand, decode_command
+from backend.core.metrics import metrics_registry
+from backend.users.adapters.notifications import get_email_notifications
+from backend.users.exceptions import BadRequest, NotFoundUser, UserHasAlreadyBeenCreated
+from backend.users.service_layer.handlers import COMMAND_HANDLERS
+
+logger = logging.getLogger(__name__)
+
+COMMAND_TYPES = {command_type.__name__: command_type for command_type in COMMAND_HANDLERS}
+# Повтор этих ошибок не исправит: запись сразу переносится в поток мёртвых записей.
+NON_RETRYABLE_ERRORS = (UndecodableCommand, BadRequest, NotFoundUser, UserHasAlreadyBeenCreated)
+
+
+def build_command_consumer(bus) -> RedisStreamConsumer:
+    """Потребитель потока команд, который передаёт команды в шину сообщений.
+
+    Имя потребителя по умолчанию - хост и pid процесса, чтобы воркеры в группе не пересекались.
+    """
+
+    async def handle(entry: dict[str, str]):
+        await bus.handle(decode_command(entry, COMMAND_TYPES))
+
+    return RedisStreamConsumer(
+        redis=get_redis(),
+        stream=settings.COMMAND_STREAM_NAME,
+        group=settings.COMMAND_STREAM_GROUP,
+        consumer=settings.COMMAND_STREAM_CONSUMER or f'{socket.gethostname()}-{os.getpid()}',
+        handle=handle,
+        concurrency=settings.COMMAND_STREAM_CONCURRENCY,
+        batch_size=settings.COMMAND_STREAM_BATCH_SIZE,
+        block_ms=settings.COMMAND_STREAM_BLOCK_MS,
+        claim_idle_ms=settings.COMMAND_STREAM_CLAIM_IDLE_MS,
+        max_deliveries=settings.COMMAND_STREAM_MAX_DELIVERIES,
+        non_retryable_errors=NON_RETRYABLE_ERRORS,
+    )
+
+
+async def main():
+    consumer = build_command_consumer(bootstrap())
+    metrics_registry.register('command_stream_consumer', consumer.metrics_snapshot)
+    logger.info(f'Command worker {consumer.consumer} reading {consumer.stream} in group {consumer.group}')
+    metrics_server = None
+
+    if settings.COMMAND_STREAM_METRICS_PORT:
+        metrics_server = await start_metrics_server(
+            metrics_registry,
+            host=settings.COMMAND_STREAM_METRICS_HOST,
+            port=settings.COMMAND_STREAM_METRICS_PORT,
+            path=settings.METRICS_PREFIX,
+        )
+
+    try:
+        await consumer.run()
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+
+        await get_email_notifications().close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
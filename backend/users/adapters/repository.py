@@ -1,31 +1,103 @@
+import json
 from abc import ABC, abstractmethod
-from typing import Any, Iterable, Optional
+from typing import Any, AsyncIterator, Iterable, Optional, Sequence
 
 from pydantic import EmailStr
+from sqlalchemy import ARRAY, Column, any_, bindparam, delete, insert, or_, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from backend.users.domain.events import CreatedUser
+from backend.core.adapters.cache import AbstractCache
+from backend.core.orm.models import TableVersions
+from backend.users.domain.events import CreatedUser, DeletedUser, Event
 from backend.users.domain.models import User
+from backend.users.exceptions import UserHasAlreadyBeenCreated
 from backend.users.orm.models import Users
 
 
 class AbstractRepository(ABC):
-    """Абстракция, реализующая паттерн "Репозиторий". Реализует интерфейс хранения данных и операций с ними."""
+    """Абстракция, реализующая паттерн "Репозиторий". Реализует интерфейс хранения данных и операций с ними.
+
+    Создание и удаление пользователей складывается в events: у пакетных операций нет загруженных сущностей.
+    Любое изменение отмечается в changed, UoW перед фиксацией увеличивает версию таблицы (bump_version).
+    """
 
     def __init__(self):
         self.seen: set[User] = set()
+        self.events: list[Event] = []
+        self.changed = False
 
     async def add(self, user: User):
+        """Добавляет пользователя и сразу отправляет INSERT.
+
+        Raises:
+            UserHasAlreadyBeenCreated: почта или тег пользователя уже заняты.
+        """
+
         await self._add(user)
-        # user.events.append(CreatedUser(user.email)) # TODO пристроить оповещение на почту
+        self.changed = True
+        self.events.append(CreatedUser(email=user.email, id=user.id, tag=user.tag))
         self.seen.add(user)
+
+    async def add_many(self, users_data: list[dict[str, Any]]) -> dict[str, int]:
+        """Создаёт пользователей одним пакетным INSERT и возвращает идентификаторы по почте.
+
+        Raises:
+            UserHasAlreadyBeenCreated: почта или тег одного из пользователей уже заняты, ничего не создано.
+        """
+
+        created = await self._add_many(users_data)
+        self.changed = True
+        self.events.extend(
+            CreatedUser(email=user_data['email'], id=created[user_data['email']], tag=user_data['tag'])
+            for user_data in users_data
+        )
+
+        return created
+
+    async def find_taken(self, emails: Iterable[EmailStr], tags: Iterable[str]) -> tuple[set[str], set[str]]:
+        """Одним запросом находит, какие из почт и тегов уже заняты."""
+
+        return await self._find_taken(list(emails), list(tags))
     
     async def delete(self, user: User):
         if user in self.seen:
             self.seen.remove(user)
 
+        event = DeletedUser(id=user.id, email=user.email, tag=user.tag)
         await self._delete(user)
+        self.changed = True
+        self.events.append(event)
+
+    async def update_password(self, user: User, password_hash: str):
+        await self._update_password(user, password_hash)
+        self.changed = True
+
+    async def bump_version(self):
+        """Увеличивает версию таблицы, если в репозитории были изменения."""
+
+        if self.changed:
+            await self._bump_version()
+            self.changed = False
+
+    async def delete_by_ids(self, ids: list[int]) -> list[dict[str, Any]]:
+        """Удаляет пользователей одним запросом и возвращает id, почту и тег удалённых."""
+
+        deleted_users = await self._delete_by_ids(ids)
+        self.changed = self.changed or bool(deleted_users)
+        self.events.extend(DeletedUser(**user_data) for user_data in deleted_users)
+
+        return deleted_users
+
+    async def delete_by_emails(self, emails: list[EmailStr]) -> list[dict[str, Any]]:
+        """Удаляет пользователей одним запросом и возвращает id, почту и тег удалённых."""
+
+        deleted_users = await self._delete_by_emails(emails)
+        self.changed = self.changed or bool(deleted_users)
+        self.events.extend(DeletedUser(**user_data) for user_data in deleted_users)
+
+        return deleted_users
 
     async def get_all(self) -> Iterable[User]:
         users = await self._get_all()
@@ -34,7 +106,7 @@ class AbstractRepository(ABC):
             self.seen.update(users)
     
         return users
-        
+
     async def get_by_filter(self, filters) -> Iterable[User]:
         users = await self._get_by_filter(filters)
 
@@ -71,6 +143,14 @@ class AbstractRepository(ABC):
     async def _add(self, user: User):
         raise NotImplementedError
 
+    @abstractmethod
+    async def _add_many(self, users_data: list[dict[str, Any]]) -> dict[str, int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _find_taken(self, emails: list[EmailStr], tags: list[str]) -> tuple[set[str], set[str]]:
+        raise NotImplementedError
+
     @abstractmethod
     async def _get_all(self) -> Iterable[User]:
         raise NotImplementedError
@@ -95,9 +175,28 @@ class AbstractRepository(ABC):
     async def _delete(self, user: User):
         raise NotImplementedError
 
+    @abstractmethod
+    async def _update_password(self, user: User, password_hash: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _delete_by_ids(self, ids: list[int]) -> list[dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _delete_by_emails(self, emails: list[EmailStr]) -> list[dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _bump_version(self):
+        raise NotImplementedError
+
 
 class UserSqlAlchemyRepository(AbstractRepository):
-    """Реализует интерфейс хранения данных и операций с ними с помощью ORM SQLAlchemy."""
+    """Реализует интерфейс хранения данных и операций с ними с помощью ORM SQLAlchemy.
+
+    Изменения только отправляются в сессию (flush), фиксирует транзакцию UoW.
+    """
 
     def __init__(self, session: AsyncSession):
         super().__init__()
@@ -106,7 +205,31 @@ class UserSqlAlchemyRepository(AbstractRepository):
 
     async def _add(self, user: User):
         self.session.add(user)
-        await self.session.commit()
+
+        try:
+            await self.session.flush()
+        except IntegrityError:
+            raise UserHasAlreadyBeenCreated
+
+    async def _add_many(self, users_data: list[dict[str, Any]]) -> dict[str, int]:
+        try:
+            result = await self.session.execute(insert(Users).returning(Users.id, Users.email), users_data)
+            created = {email: id for id, email in result}
+        except IntegrityError:
+            raise UserHasAlreadyBeenCreated
+
+        return created
+
+    async def _find_taken(self, emails: list[EmailStr], tags: list[str]) -> tuple[set[str], set[str]]:
+        query = select(Users.email, Users.tag).where(or_(Users.email.in_(emails), Users.tag.in_(tags)))
+        result = await self.session.execute(query)
+        taken_emails, taken_tags = set(), set()
+
+        for email, tag in result:
+            taken_emails.add(email)
+            taken_tags.add(tag)
+
+        return taken_emails, taken_tags
 
     async def _get_all(self) -> Iterable[User]:
         result = await self.session.execute(select(Users).order_by('id'))
@@ -136,4 +259,285 @@ class UserSqlAlchemyRepository(AbstractRepository):
 
     async def _delete(self, user: User):
         await self.session.delete(user)
-        await self.session.commit()
+        await self.session.flush()
+
+    async def _update_password(self, user: User, password_hash: str):
+        user.password = password_hash
+        user.version = Users.version + 1
+        await self.session.flush()
+
+    def _match_any(self, column: Column, values: list[Any]):
+        """На postgresql передаёт список одним параметром-массивом (= ANY), иначе разворачивает в IN."""
+
+        if self.session.bind.dialect.name == 'postgresql':
+            return column == any_(bindparam(None, values, type_=ARRAY(column.type)))
+
+        return column.in_(values)
+
+    async def _delete_where(self, condition) -> list[dict[str, Any]]:
+        query = delete(Users).where(condition).returning(Users.id, Users.email, Users.tag)
+        result = await self.session.execute(query)
+        deleted = [{'id': id, 'email': email, 'tag': tag} for id, email, tag in result]
+
+        return deleted
+
+    async def _delete_by_ids(self, ids: list[int]) -> list[dict[str, Any]]:
+        return await self._delete_where(self._match_any(Users.id, ids))
+
+    async def _delete_by_emails(self, emails: list[EmailStr]) -> list[dict[str, Any]]:
+        return await self._delete_where(self._match_any(Users.email, emails))
+
+    async def _bump_version(self):
+        query = (
+            update(TableVersions)
+            .where(TableVersions.name == Users.__tablename__)
+            .values(version=TableVersions.version + 1)
+        )
+        result = await self.session.execute(query)
+
+        if result.rowcount == 0:
+            self.session.add(TableVersions(name=Users.__tablename__, version=1))
+            await self.session.flush()
+
+
+PUBLIC_USER_COLUMNS = (Users.id, Users.tag, Users.email, Users.role_id)
+
+
+class AbstractUserReadRepository(ABC):
+    """Абстракция репозитория чтения. Возвращает данные пользователей в виде словарей, без загрузки сущностей.
+
+    Репозиторий не ведёт seen: полученные данные не участвуют в сборе событий и не меняются.
+    """
+
+    @abstractmethod
+    async def get_all(self) -> list[dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def stream_all(self, yield_per: int) -> AsyncIterator[dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_by_filter(self, filters: dict[str, Any]) -> list[dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_page(
+        self,
+        filters: dict[str, Any],
+        sort: str,
+        after: Optional[list[Any]],
+        limit: int,
+    ) -> tuple[list[dict[str, Any]], Optional[list[Any]]]:
+        """Возвращает страницу пользователей, отсортированных по sort ("-" в начале - по убыванию).
+
+        Страница начинается после записи с ключом after. Вместе со страницей возвращается ключ
+        её последней записи, если дальше есть ещё записи, иначе None.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_by_id(self, id: int) -> Optional[dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_by_email(self, email: EmailStr) -> Optional[dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_by_tag(self, tag: str) -> Optional[dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_version_by_id(self, id: int) -> Optional[int]:
+        """Версия строки пользователя, None - если пользователя нет."""
+
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_table_version(self) -> int:
+        """Счётчик изменений таблицы пользователей."""
+
+        raise NotImplementedError
+
+
+class UserSqlAlchemyReadRepository(AbstractUserReadRepository):
+    """Реализует репозиторий чтения через выборку отдельных колонок, минуя ORM-сущности.
+
+    По умолчанию хэш пароля не выбирается (PUBLIC_USER_COLUMNS).
+    """
+
+    def __init__(self, session: AsyncSession, columns: Sequence[Column] = PUBLIC_USER_COLUMNS):
+        self.session = session
+        self.columns = columns
+
+    async def _fetch_all(self, query) -> list[dict[str, Any]]:
+        result = await self.session.execute(query)
+        keys = tuple(result.keys())
+
+        return [dict(zip(keys, row)) for row in result]
+
+    async def _fetch_one(self, query) -> Optional[dict[str, Any]]:
+        result = await self.session.execute(query.limit(1))
+        keys = tuple(result.keys())
+        row = result.first()
+
+        return dict(zip(keys, row)) if row is not None else None
+
+    async def get_all(self) -> list[dict[str, Any]]:
+        return await self._fetch_all(select(*self.columns).order_by(Users.id))
+
+    async def stream_all(self, yield_per: int) -> AsyncIterator[dict[str, Any]]:
+        query = select(*self.columns).order_by(Users.id).execution_options(yield_per=yield_per)
+
+        result = await self.session.stream(query)
+        keys = tuple(result.keys())
+
+        async for row in result:
+            yield dict(zip(keys, row))
+
+    async def get_by_filter(self, filters: dict[str, Any]) -> list[dict[str, Any]]:
+        return await self._fetch_all(select(*self.columns).filter_by(**filters))
+
+    async def get_page(
+        self,
+        filters: dict[str, Any],
+        sort: str,
+        after: Optional[list[Any]],
+        limit: int,
+    ) -> tuple[list[dict[str, Any]], Optional[list[Any]]]:
+        descending = sort.startswith('-')
+        key_columns = page_key_columns(sort)
+        sort_column = key_columns[0]
+        query = select(*self.columns).filter_by(**filters)
+
+        if after is not None:
+            key, after_key = (tuple_(*key_columns), tuple_(*after)) if len(key_columns) > 1 else (sort_column, after[0])
+            query = query.where(key < after_key if descending else key > after_key)
+
+        query = query.order_by(*(column.desc() if descending else column.asc() for column in key_columns))
+        users_data = await self._fetch_all(query.limit(limit + 1))
+
+        if len(users_data) <= limit:
+            return users_data, None
+
+        users_data = users_data[:limit]
+
+        return users_data, [users_data[-1][column.name] for column in key_columns]
+
+    async def get_by_id(self, id: int) -> Optional[dict[str, Any]]:
+        return await self._fetch_one(select(*self.columns).where(Users.id == id))
+
+    async def get_by_email(self, email: EmailStr) -> Optional[dict[str, Any]]:
+        return await self._fetch_one(select(*self.columns).where(Users.email == email))
+
+    async def get_by_tag(self, tag: str) -> Optional[dict[str, Any]]:
+        return await self._fetch_one(select(*self.columns).where(Users.tag == tag))
+
+    async def get_version_by_id(self, id: int) -> Optional[int]:
+        result = await self.session.execute(select(Users.version).where(Users.id == id))
+
+        return result.scalar()
+
+    async def get_table_version(self) -> int:
+        query = select(TableVersions.version).where(TableVersions.name == Users.__tablename__)
+        result = await self.session.execute(query)
+
+        return result.scalar() or 0
+
+
+def user_cache_keys(id: int = None, email: EmailStr = None, tag: str = None) -> list[str]:
+    """Возвращает ключи кэша, под которыми могут лежать данные пользователя."""
+
+    keys = []
+
+    if id is not None:
+        keys.append(f'users:id:{id}')
+    if email is not None:
+        keys.append(f'users:email:{email}')
+    if tag is not None:
+        keys.append(f'users:tag:{tag}')
+
+    return keys
+
+
+class CachedUserReadRepository(AbstractUserReadRepository):
+    """Кэширует поиск пользователя по id, почте и тегу поверх другого репозитория чтения (cache-aside).
+
+    Отсутствующий пользователь тоже кэшируется (на negative_ttl секунд), чтобы повторные промахи не шли в БД.
+    Списочные запросы и версии кэш не используют.
+    """
+
+    def __init__(self, repository: AbstractUserReadRepository, cache: AbstractCache, ttl: int, negative_ttl: int):
+        self.repository = repository
+        self.cache = cache
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+    async def _cached(self, key: str, load) -> Optional[dict[str, Any]]:
+        cached = await self.cache.get(key)
+
+        if cached is not None:
+            user_data = json.loads(cached)
+
+            if user_data is None:
+                self.cache.stats.negative_hits += 1
+
+            return user_data
+
+        user_data = await load()
+        await self.cache.set(key, json.dumps(user_data), self.ttl if user_data is not None else self.negative_ttl)
+
+        return user_data
+
+    async def get_all(self) -> list[dict[str, Any]]:
+        return await self.repository.get_all()
+
+    def stream_all(self, yield_per: int) -> AsyncIterator[dict[str, Any]]:
+        return self.repository.stream_all(yield_per)
+
+    async def get_by_filter(self, filters: dict[str, Any]) -> list[dict[str, Any]]:
+        return await self.repository.get_by_filter(filters)
+
+    async def get_page(
+        self,
+        filters: dict[str, Any],
+        sort: str,
+        after: Optional[list[Any]],
+        limit: int,
+    ) -> tuple[list[dict[str, Any]], Optional[list[Any]]]:
+        return await self.repository.get_page(filters, sort, after, limit)
+
+    async def get_by_id(self, id: int) -> Optional[dict[str, Any]]:
+        return await self._cached(user_cache_keys(id=id)[0], lambda: self.repository.get_by_id(id))
+
+    async def get_by_email(self, email: EmailStr) -> Optional[dict[str, Any]]:
+        return await self._cached(user_cache_keys(email=email)[0], lambda: self.repository.get_by_email(email))
+
+    async def get_by_tag(self, tag: str) -> Optional[dict[str, Any]]:
+        return await self._cached(user_cache_keys(tag=tag)[0], lambda: self.repository.get_by_tag(tag))
+
+    async def get_version_by_id(self, id: int) -> Optional[int]:
+        return await self.repository.get_version_by_id(id)
+
+    async def get_table_version(self) -> int:
+        return await self.repository.get_table_version()
+
+
+def page_key_columns(sort: str) -> list[Column]:
+    """Колонки ключа страницы для сортировки: колонка сортировки и id, если её значения не уникальны."""
+
+    sort_column = Users.__table__.c[sort.lstrip('-')]
+
+    return [sort_column] if sort_column.unique or sort_column.primary_key else [sort_column, Users.id]
+
+
+def is_valid_page_key(sort: str, after: list[Any]) -> bool:
+    """Подходит ли ключ из курсора к сортировке: по значению на каждую колонку ключа и нужного типа."""
+
+    key_columns = page_key_columns(sort)
+
+    return len(after) == len(key_columns) and all(
+        type(value) is column.type.python_type for column, value in zip(key_columns, after)
+    )
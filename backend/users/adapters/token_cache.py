@@ -0,0 +1,75 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class VerifiedTokenCache:
+    """Ограниченный LRU-кэш проверенных токенов доступа в памяти воркера.
+
+    Ключ — sha256 токена, сам токен не хранится. Значение — расшифрованные claims,
+    которые живут до exp токена. Все записи пользователя можно сбросить по его id.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: OrderedDict[bytes, dict[str, Any]] = OrderedDict()
+        self._by_user: dict[str, set[bytes]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict[str, Any]]:
+        digest = self._digest(token)
+        claims = self._data.get(digest)
+
+        if claims is None:
+            self.misses += 1
+            return None
+
+        if claims['exp'] <= time.time():
+            self._drop(digest)
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(digest)
+        self.hits += 1
+
+        return claims
+
+    def set(self, token: str, claims: dict[str, Any]):
+        digest = self._digest(token)
+        self._data[digest] = claims
+        self._data.move_to_end(digest)
+        self._by_user.setdefault(claims['sub'], set()).add(digest)
+
+        while len(self._data) > self.max_size:
+            self._drop(next(iter(self._data)))
+            self.evictions += 1
+
+    def evict_user(self, user_id: int):
+        for digest in self._by_user.pop(str(user_id), set()):
+            if self._data.pop(digest, None) is not None:
+                self.evictions += 1
+
+    def _drop(self, digest: bytes):
+        claims = self._data.pop(digest)
+        digests = self._by_user.get(claims['sub'])
+
+        if digests is not None:
+            digests.discard(digest)
+
+            if not digests:
+                del self._by_user[claims['sub']]
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,117 @@
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from redis import asyncio as aioredis
+
+from backend.core.adapters.redis_client import get_redis
+
+MEMORY_BACKEND = 'memory'
+REDIS_BACKEND = 'redis'
+
+
+def refresh_token_key(refresh_token: str) -> str:
+    """Ключ refresh-токена: хранится только его sha256, сам токен знает лишь клиент."""
+
+    return f'auth:refresh:{hashlib.sha256(refresh_token.encode()).hexdigest()}'
+
+
+def revoked_jti_key(jti: str) -> str:
+    return f'auth:revoked:{jti}'
+
+
+class AbstractTokenStore(ABC):
+    """Хранилище refresh-токенов и списка отозванных jti токенов доступа.
+
+    Записи хранятся не дольше срока действия соответствующего токена.
+    """
+
+    async def save_refresh_token(self, refresh_token: str, user_id: int, ttl: int):
+        await self._set(refresh_token_key(refresh_token), str(user_id), ttl)
+
+    async def pop_refresh_token(self, refresh_token: str) -> Optional[int]:
+        """Атомарно забирает refresh-токен: повторно тот же токен использовать нельзя."""
+
+        user_id = await self._pop(refresh_token_key(refresh_token))
+
+        return int(user_id) if user_id is not None else None
+
+    async def revoke(self, jti: str, ttl: int):
+        await self._set(revoked_jti_key(jti), '1', ttl)
+
+    async def is_revoked(self, jti: str) -> bool:
+        return await self._exists(revoked_jti_key(jti))
+
+    @abstractmethod
+    async def _set(self, key: str, value: str, ttl: int):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _pop(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+
+class RedisTokenStore(AbstractTokenStore):
+    """Хранилище токенов в Redis, общее для всех воркеров. Каждая проверка — одна команда O(1)."""
+
+    def __init__(self, redis: aioredis.Redis):
+        self.redis = redis
+
+    async def _set(self, key: str, value: str, ttl: int):
+        await self.redis.set(key, value, ex=ttl)
+
+    async def _pop(self, key: str) -> Optional[str]:
+        return await self.redis.getdel(key)
+
+    async def _exists(self, key: str) -> bool:
+        return bool(await self.redis.exists(key))
+
+
+class InMemoryTokenStore(AbstractTokenStore):
+    """Хранилище токенов в памяти процесса. Для тестов и одного воркера."""
+
+    def __init__(self):
+        self._data: dict[str, tuple[str, float]] = {}
+
+    def _get(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+
+        if item is None:
+            return None
+
+        value, expires_at = item
+
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+
+        return value
+
+    async def _set(self, key: str, value: str, ttl: int):
+        self._data[key] = (value, time.monotonic() + ttl)
+
+    async def _pop(self, key: str) -> Optional[str]:
+        value = self._get(key)
+        self._data.pop(key, None)
+
+        return value
+
+    async def _exists(self, key: str) -> bool:
+        return self._get(key) is not None
+
+
+def build_token_store(backend: str) -> AbstractTokenStore:
+    """Создаёт хранилище токенов по названию бэкенда: memory или redis."""
+
+    if backend == MEMORY_BACKEND:
+        return InMemoryTokenStore()
+
+    if backend == REDIS_BACKEND:
+        return RedisTokenStore(get_redis())
+
+    raise ValueError(f'Unknown token store backend {backend}')
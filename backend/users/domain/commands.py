@@ -1,4 +1,5 @@
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
 
 from pydantic import EmailStr
 
@@ -16,6 +17,34 @@ class RegisterUser(Command):
     role_id: int = 1  #  Enum
 
 
+@dataclass
+class AuthenticateUser(Command):
+    """Команда, а не запрос: при входе может пересчитываться и сохраняться хэш пароля.
+
+    client_ip не принимается из тела запроса, его заполняет эндпоинт.
+    """
+
+    email: EmailStr
+    password: str
+    client_ip: Optional[str] = field(default=None, init=False)
+
+
+@dataclass
+class RefreshTokens(Command):
+    refresh_token: str
+
+
+@dataclass
+class RevokeTokens(Command):
+    access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
+
+
+@dataclass
+class RegisterUsers(Command):
+    users: List[RegisterUser]
+
+
 @dataclass
 class DeleteUserById(Command):
     id: int
@@ -26,6 +55,21 @@ class DeleteUserByEmail(Command):
     email: EmailStr
 
 
+@dataclass
+class DeleteUsersByIds(Command):
+    ids: List[int]
+
+
+@dataclass
+class DeleteUsersByEmails(Command):
+    emails: List[EmailStr]
+
+
+@dataclass
+class RebuildUserAvailabilityFilter(Command):
+    pass
+
+
 @dataclass
 class EditUser(Command):
     id: int
@@ -10,3 +10,12 @@ class Event:
 @dataclass
 class CreatedUser(Event):
     email: EmailStr
+    id: int = None
+    tag: str = None
+
+
+@dataclass
+class DeletedUser(Event):
+    id: int
+    email: EmailStr
+    tag: str
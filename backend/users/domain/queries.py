@@ -1,19 +1,18 @@
 from dataclasses import dataclass, asdict
+from typing import Optional
 
 from pydantic import EmailStr
 
 
+USER_FILTER_FIELDS = ('id', 'tag', 'email', 'role_id')
+USER_SORT_OPTIONS = ('id', '-id', 'tag', '-tag', 'email', '-email', 'role_id', '-role_id')
+
+
 class Query:
     def get_is_not_none_attribute(self):
         return {k: v for k, v in asdict(self).items() if v is not None}
 
 
-@dataclass
-class AuthenticateUser(Query):
-    email: EmailStr
-    password: str
-
-
 @dataclass
 class GetCurrentUser(Query):
     token: str
@@ -24,6 +23,18 @@ class GetAllUsers(Query):
     pass
 
 
+@dataclass
+class GetAllUsersIfChanged(Query):
+    """Все пользователи вместе с ETag списка. Если ETag совпал с if_none_match, данные не выбираются."""
+
+    if_none_match: Optional[str] = None
+
+
+@dataclass
+class StreamAllUsers(Query):
+    pass
+
+
 @dataclass
 class GetUserByEmail(Query):
     email: EmailStr
@@ -39,9 +50,29 @@ class GetUserById(Query):
     id: int
 
 
+@dataclass
+class GetUserByIdIfChanged(Query):
+    """Пользователь вместе с ETag строки. Если ETag совпал с if_none_match, данные не выбираются."""
+
+    id: int
+    if_none_match: Optional[str] = None
+
+
+@dataclass
+class CheckUserAvailability(Query):
+    email: Optional[EmailStr] = None
+    tag: Optional[str] = None
+
+
 @dataclass
 class GetUsersByFilter(Query):
     id: int
     tag: str
     email: EmailStr
     role_id: int
+    limit: Optional[int] = None
+    cursor: Optional[str] = None
+    sort: str = 'id'
+
+    def get_filters(self):
+        return {key: value for key, value in self.get_is_not_none_attribute().items() if key in USER_FILTER_FIELDS}
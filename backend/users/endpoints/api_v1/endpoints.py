@@ -1,43 +1,88 @@
+from typing import Literal, Optional
 
-from fastapi import APIRouter, HTTPException, status, Request
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Header, HTTPException, Query, status, Request
+from fastapi.responses import StreamingResponse
 from pydantic import EmailStr
 from fastapi import Response
 from backend.bootstrap import bootstrap
 from backend.config import settings
+from backend.core.adapters.etag import body_etag, etag_matches
+from backend.core.adapters.json_response import FastJSONResponse, dumps
+from backend.core.adapters.rate_limit import RateLimitExceeded
+from backend.core.adapters.worker_pool import WorkerPoolSaturated
+from backend.core.adapters.streaming import JSON_MEDIA_TYPE, NDJSON_MEDIA_TYPE, json_array_stream, ndjson_stream
 from backend.users.domain.commands import (
+    AuthenticateUser,
+    RefreshTokens,
+    RevokeTokens,
     RegisterUser,
+    RegisterUsers,
     DeleteUserByEmail,
     DeleteUserById,
+    DeleteUsersByIds,
+    DeleteUsersByEmails,
 )
 from backend.users.domain.queries import (
-    GetAllUsers,
+    GetAllUsersIfChanged,
+    StreamAllUsers,
     GetUserByEmail,
-    GetUserById,
+    GetUserByIdIfChanged,
     GetUsersByFilter,
-    AuthenticateUser, GetCurrentUser,
+    GetCurrentUser,
+    CheckUserAvailability,
+    USER_SORT_OPTIONS,
 )
 from backend.users.exceptions import NotFoundUser, UserHasAlreadyBeenCreated, TokenIsInvalid, TokenExpired, \
-    TokenNotHaveUserId, IncorrectInfoForAuthenticateUser
-from backend.users.service_layer.auth import create_access_token
+    TokenNotHaveUserId, IncorrectInfoForAuthenticateUser, BadRequest, TokenRevoked, RefreshTokenIsInvalid
+
+
+def password_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail='Сервис перегружен, повторите запрос позже',
+        headers={'Retry-After': '1'},
+    )
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
 
 router = APIRouter(
     tags=[settings.USERS_TAG],
     prefix=settings.USERS_PREFIX,
+    default_response_class=FastJSONResponse,
 )
 
 bus = bootstrap()
 
 
 @router.get('/get_all')
-async def get_all_users():
-    """Возвращает данные всех пользователей в системе."""
+async def get_all_users(
+    stream: Optional[Literal['ndjson', 'json']] = None,
+    if_none_match: Optional[str] = Header(default=None),
+):
+    """Возвращает данные всех пользователей в системе.
+
+    Ответ содержит ETag, при совпадении If-None-Match возвращается 304 без выборки пользователей.
+    При stream=ndjson или stream=json ответ отдаётся потоком по мере чтения из БД
+    (NDJSON или JSON-массив соответственно), не собирая всех пользователей в памяти.
+    """
+
+    if stream is not None:
+        users_data = await bus.handle(StreamAllUsers())
 
-    query = GetAllUsers()
-    users_data = await bus.handle(query)
+        if stream == 'ndjson':
+            return StreamingResponse(ndjson_stream(users_data), media_type=NDJSON_MEDIA_TYPE)
 
-    return JSONResponse(content=jsonable_encoder(users_data))
+        return StreamingResponse(json_array_stream(users_data), media_type=JSON_MEDIA_TYPE)
+
+    etag, users_data = await bus.handle(GetAllUsersIfChanged(if_none_match=if_none_match))
+
+    if users_data is None:
+        return not_modified(etag)
+
+    return FastJSONResponse(content=users_data, headers={'ETag': etag})
 
 
 @router.get('/get_by_filter/')
@@ -46,13 +91,42 @@ async def get_user_by_filter(
     email: EmailStr = None,
     tag: str = None,
     role_id: int = None,
+    limit: int = Query(default=None, ge=1, le=settings.USERS_PAGE_MAX_LIMIT),
+    cursor: str = None,
+    sort: Literal[USER_SORT_OPTIONS] = 'id',
 ):
-    """Возвращает данные пользователей подходящих по фильтру."""
+    """Возвращает страницу данных пользователей подходящих по фильтру.
+
+    Для следующей страницы передайте полученный next_cursor с той же сортировкой.
+
+    Raises:
+        HTTPException(400): Курсор повреждён или получен для другой сортировки.
+    """
+
+    query = GetUsersByFilter(id, tag, email, role_id, limit=limit, cursor=cursor, sort=sort)
+
+    try:
+        users_page = await bus.handle(query)
+    except BadRequest:
+        raise HTTPException(status_code=400, detail=f'Failed: Invalid cursor for sort {sort}')
 
-    query = GetUsersByFilter(id, tag, email, role_id)
-    users_data = await bus.handle(query)
+    return FastJSONResponse(content=users_page)
 
-    return JSONResponse(content=jsonable_encoder(users_data))
+
+@router.get('/available')
+async def check_user_availability(email: EmailStr = None, tag: str = None):
+    """Проверяет, свободны ли почта и тег для регистрации.
+
+    Raises:
+        HTTPException(400): Не переданы ни почта, ни тег.
+    """
+
+    try:
+        availability = await bus.handle(CheckUserAvailability(email=email, tag=tag))
+    except BadRequest:
+        raise HTTPException(status_code=400, detail='Failed: Pass email or tag to check')
+
+    return FastJSONResponse(content=availability)
 
 
 @router.get('/get_by_email/{email}')
@@ -69,24 +143,29 @@ async def get_user_by_email(email: EmailStr):
     except NotFoundUser:
         raise HTTPException(status_code=404, detail=f'Failed: Not found user with email {query.email}')
 
-    return JSONResponse(content=jsonable_encoder(user_data))
+    return FastJSONResponse(content=user_data)
 
 
 @router.get('/get_by_id/{id}')
-async def get_user_by_id(id: int):
+async def get_user_by_id(id: int, if_none_match: Optional[str] = Header(default=None)):
     """Возвращает данные пользователя, найденного по идентификатору.
 
+    Ответ содержит ETag, при совпадении If-None-Match возвращается 304 без выборки данных пользователя.
+
     Raises:
         HTTPException(404): не удалось найти нужного пользователя по указанному идентификатору.
     """
 
     try:
-        query = GetUserById(id=id)
-        user_data = await bus.handle(query)
+        query = GetUserByIdIfChanged(id=id, if_none_match=if_none_match)
+        etag, user_data = await bus.handle(query)
     except NotFoundUser:
         raise HTTPException(status_code=404, detail=f'Failed: Not found user with id {query.id}')
 
-    return JSONResponse(content=jsonable_encoder(user_data))
+    if user_data is None:
+        return not_modified(etag)
+
+    return FastJSONResponse(content=user_data, headers={'ETag': etag})
 
 
 @router.post('/register', status_code=status.HTTP_201_CREATED)
@@ -95,38 +174,131 @@ async def register_user(cmd: RegisterUser):
 
     Raises:
         HTTPException(400): Пользователь с такой почтой уже зарегистрирован.
+        HTTPException(503): Пул хэширования паролей переполнен.
     """
 
     try:
         await bus.handle(cmd)
     except UserHasAlreadyBeenCreated:
         raise HTTPException(status_code=400, detail=f'Failed: User has already been created with email {cmd.email}')
+    except WorkerPoolSaturated:
+        raise password_pool_busy()
     else:
         return f'Success: User create with email {cmd.email}'
 
 
+@router.post('/register_batch')
+async def register_users(cmd: RegisterUsers):
+    """Создаёт пользователей пачкой и возвращает результат по каждому из них.
+
+    Пользователи с уже занятой почтой или тегом пропускаются со статусом duplicate_email или duplicate_tag.
+
+    Raises:
+        HTTPException(400): В пачке слишком много пользователей.
+        HTTPException(400): Часть пользователей была создана параллельно, пачка не сохранена.
+        HTTPException(503): Пул хэширования паролей переполнен.
+    """
+
+    try:
+        results = await bus.handle(cmd)
+    except BadRequest:
+        raise HTTPException(
+            status_code=400,
+            detail=f'Failed: Batch is limited to {settings.USERS_REGISTER_BATCH_MAX_SIZE} users',
+        )
+    except UserHasAlreadyBeenCreated:
+        raise HTTPException(status_code=400, detail='Failed: Some users have been created concurrently, retry batch')
+    except WorkerPoolSaturated:
+        raise password_pool_busy()
+
+    return FastJSONResponse(content=results)
+
+
+def set_token_cookies(response: Response, tokens: dict[str, str]):
+    response.set_cookie(key="users_access_token", value=tokens['access_token'], httponly=True)
+    response.set_cookie(
+        key="users_refresh_token",
+        value=tokens['refresh_token'],
+        httponly=True,
+        max_age=settings.JWT_REFRESH_EXPIRES_IN * 60,
+    )
+
+
 @router.post("/login/")
-async def auth_user(response: Response, query: AuthenticateUser):
+async def auth_user(request: Request, response: Response, cmd: AuthenticateUser):
+    """Выдаёт токены по почте и паролю.
+
+    Raises:
+        HTTPException(401): Неверная почта или пароль.
+        HTTPException(429): Слишком много попыток входа с этого IP или для этой почты.
+        HTTPException(503): Пул хэширования паролей переполнен.
+    """
+
+    cmd.client_ip = request.client.host if request.client else None
+
     try:
-        user_id = await bus.handle(query)
+        tokens = await bus.handle(cmd)
     except IncorrectInfoForAuthenticateUser:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Неверная почта или пароль')
+    except RateLimitExceeded as error:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail='Слишком много попыток входа, повторите позже',
+            headers={'Retry-After': str(error.retry_after)},
+        )
+    except WorkerPoolSaturated:
+        raise password_pool_busy()
+
+    set_token_cookies(response, tokens)
+
+    return tokens
 
-    access_token = create_access_token({"sub": str(user_id)})
-    response.set_cookie(key="users_access_token", value=access_token, httponly=True)
 
-    return {'access_token': access_token, 'refresh_token': None}
+@router.post("/refresh/")
+async def refresh_tokens(request: Request, response: Response, cmd: Optional[RefreshTokens] = None):
+    """Выдаёт новую пару токенов по refresh-токену из тела запроса или cookie, без проверки пароля.
+
+    Raises:
+        HTTPException(401): refresh-токен не передан, уже использован, истёк или пользователь удалён.
+    """
+
+    refresh_token = cmd.refresh_token if cmd is not None else request.cookies.get('users_refresh_token')
+
+    if not refresh_token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Refresh token not found')
+
+    try:
+        tokens = await bus.handle(RefreshTokens(refresh_token=refresh_token))
+    except RefreshTokenIsInvalid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Refresh токен не валидный')
+
+    set_token_cookies(response, tokens)
+
+    return tokens
 
 
 @router.post("/logout/", status_code=status.HTTP_200_OK)
-async def logout_user(response: Response):
+async def logout_user(request: Request, response: Response):
+    """Отзывает токен доступа и refresh-токен из cookie и удаляет cookie."""
+
+    await bus.handle(RevokeTokens(
+        access_token=request.cookies.get('users_access_token'),
+        refresh_token=request.cookies.get('users_refresh_token'),
+    ))
     response.delete_cookie(key="users_access_token")
+    response.delete_cookie(key="users_refresh_token")
 
     return {'message': 'Пользователь успешно вышел из системы'}
 
 
 @router.get("/me/")
-async def get_me(request: Request):
+async def get_me(request: Request, if_none_match: Optional[str] = Header(default=None)):
+    """Возвращает данные текущего пользователя.
+
+    Данные собираются из токена и кэша без БД, поэтому ETag строится по закодированному ответу:
+    при совпадении If-None-Match возвращается 304 без тела.
+    """
+
     token = request.cookies.get('users_access_token')
 
     if not token:
@@ -142,10 +314,18 @@ async def get_me(request: Request):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Токен истек')
     except TokenNotHaveUserId:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Не найден ID пользователя')
+    except TokenRevoked:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Токен отозван')
     except NotFoundUser:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Пользователь не найден')
 
-    return user_data
+    body = dumps(user_data)
+    etag = body_etag(body)
+
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    return Response(content=body, media_type=FastJSONResponse.media_type, headers={'ETag': etag})
 
 
 @router.delete('/delete_by_id/{id}')
@@ -180,3 +360,21 @@ async def delete_user_by_email(email: EmailStr):
         raise HTTPException(status_code=404, detail=f'Failed: Not found user with email {cmd.email}')
     else:
         return f'Success: User delete with email {cmd.email}'
+
+
+@router.post('/delete_by_ids')
+async def delete_users_by_ids(cmd: DeleteUsersByIds):
+    """Удаляет пользователей по списку идентификаторов и возвращает, какие из них не были найдены."""
+
+    result = await bus.handle(cmd)
+
+    return FastJSONResponse(content=result)
+
+
+@router.post('/delete_by_emails')
+async def delete_users_by_emails(cmd: DeleteUsersByEmails):
+    """Удаляет пользователей по списку почт и возвращает, какие из них не были найдены."""
+
+    result = await bus.handle(cmd)
+
+    return FastJSONResponse(content=result)
@@ -24,3 +24,11 @@ class TokenExpired(Exception):
 
 class TokenNotHaveUserId(Exception):
     pass
+
+
+class TokenRevoked(Exception):
+    pass
+
+
+class RefreshTokenIsInvalid(Exception):
+    pass
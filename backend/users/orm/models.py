@@ -1,5 +1,5 @@
 from pydantic import EmailStr
-from sqlalchemy import Integer, String
+from sqlalchemy import Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.orm.properties import MappedColumn
 
@@ -8,6 +8,9 @@ from backend.core.orm.models import BaseModel
 
 class Users(BaseModel):
     __tablename__ = 'user.users'
+    __table_args__ = (
+        Index('ix_user_users_role_id_id', 'role_id', 'id'),  # keyset-пагинация с сортировкой по role_id
+    )
 
     tag: Mapped[str] = MappedColumn(
         type_=String,
@@ -37,5 +40,12 @@ class Users(BaseModel):
         default=1,  # TODO Присобачить энам сюда
     )
 
+    version: Mapped[int] = mapped_column(
+        type_=Integer,  # увеличивается при каждом изменении строки, из него строится ETag
+        nullable=False,
+        default=1,
+        server_default='1',
+    )
+
     def __repr__(self):
         return f'User({self.id!r}, {self.email!r})'
@@ -1,11 +1,17 @@
+import secrets
 from datetime import datetime, timezone, timedelta
+from typing import Any, Optional
+from uuid import uuid4
 
 from authlib.jose import jwt
+from authlib.jose.errors import JoseError
 from passlib.context import CryptContext
 from backend.config import settings
+from backend.users.exceptions import TokenExpired, TokenIsInvalid, TokenNotHaveUserId
 
+PROFILE_CLAIMS = ('tag', 'email', 'role_id')
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(**settings.get_password_context_options)
 
 
 def get_password_hash(password: str) -> str:
@@ -16,10 +22,18 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """Проверяет пароль и, если хэш устарел (другая схема или параметры), возвращает новый хэш."""
+
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def create_access_token(data: dict) -> str:
+    """Создаёт токен доступа на JWT_EXPIRES_IN минут с уникальным jti для отзыва."""
+
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(days=30)
-    to_encode.update({"exp": expire})
+    expire = datetime.now(timezone.utc) + timedelta(minutes=settings.JWT_EXPIRES_IN)
+    to_encode.update({"exp": expire, "jti": uuid4().hex})
     auth_data = settings.get_auth_data
 
     encode_jwt = jwt.encode(**{
@@ -28,10 +42,58 @@ def create_access_token(data: dict) -> str:
         'key': auth_data['secret_key'],
     })
 
-    return encode_jwt
+    return encode_jwt.decode()
+
+
+def create_user_access_token(user_data: dict[str, Any]) -> str:
+    """Создаёт токен доступа пользователя.
+
+    При USERS_TOKEN_PROFILE_CLAIMS=True в токен кладутся несекретные поля профиля (claim profile),
+    и /users/me/ может отвечать по ним без обращения к БД.
+    """
+
+    claims = {'sub': str(user_data['id'])}
+
+    if settings.USERS_TOKEN_PROFILE_CLAIMS:
+        claims['profile'] = {field: user_data[field] for field in PROFILE_CLAIMS}
+
+    return create_access_token(claims)
+
+
+def create_refresh_token() -> str:
+    """Создаёт непрозрачный refresh-токен. На сервере хранится только его хэш."""
+
+    return secrets.token_urlsafe(32)
+
+
+def decode_access_token(token: str) -> dict[str, Any]:
+    """Проверяет подпись и срок действия токена доступа и возвращает его claims.
+
+    Raises:
+        TokenIsInvalid: токен повреждён или подписан другим ключом.
+        TokenExpired: срок действия токена истёк.
+        TokenNotHaveUserId: в токене нет id пользователя.
+        TokenIsInvalid: в токене нет jti, такой токен нельзя отозвать.
+    """
+
+    # Раньше токен попадал в cookie как строковое представление bytes: b'...'
+    if token.startswith("b'") and token.endswith("'"):
+        token = token[2:-1]
 
+    try:
+        claims = jwt.decode(token, settings.get_auth_data['secret_key'])
+    except (JoseError, ValueError):
+        raise TokenIsInvalid
 
+    expire = claims.get('exp')
 
+    if not expire or datetime.fromtimestamp(int(expire), tz=timezone.utc) < datetime.now(timezone.utc):
+        raise TokenExpired
 
+    if not claims.get('sub'):
+        raise TokenNotHaveUserId
 
+    if not claims.get('jti'):
+        raise TokenIsInvalid
 
+    return dict(claims)
@@ -1,76 +1,284 @@
-from datetime import datetime, timezone
+import asyncio
+import time
 from http.client import HTTPException
-from typing import Type, Dict, Callable, List
+from typing import Type, Dict, Callable, List, Optional, Union
 
-from authlib.jose import jwt
-from jose import JWTError
 from starlette import status
 
 from backend.config import settings
+from backend.core.adapters.cache import AbstractCache
+from backend.core.adapters.etag import etag_matches, make_etag
+from backend.core.adapters.local_cache import StaleWhileRevalidateCache
 from backend.core.adapters.notifications import AbstractNotifications
+from backend.core.service_layer.routing import read_only_scope
 from backend.core.service_layer.unit_of_work import AbstractUnitOfWork
 from backend.users.domain.commands import (
+    AuthenticateUser,
+    RefreshTokens,
+    RevokeTokens,
     RegisterUser,
+    RegisterUsers,
     DeleteUserByEmail,
     DeleteUserById,
+    DeleteUsersByIds,
+    DeleteUsersByEmails,
+    RebuildUserAvailabilityFilter,
     Command,
 )
 from backend.users.domain.queries import (
     GetAllUsers,
+    GetAllUsersIfChanged,
+    StreamAllUsers,
     GetUserByEmail,
     GetUserById,
+    GetUserByIdIfChanged,
     GetUsersByFilter,
     Query,
     GetUserByTag,
-    AuthenticateUser, GetCurrentUser,
+    GetCurrentUser,
+    CheckUserAvailability,
 )
-from backend.users.domain.events import CreatedUser, Event
+from backend.users.adapters.availability import UserAvailabilityFilter
+from backend.users.adapters.repository import is_valid_page_key, user_cache_keys
+from backend.users.domain.events import CreatedUser, DeletedUser, Event
 from backend.users.exceptions import NotFoundUser, UserHasAlreadyBeenCreated, TokenIsInvalid, TokenExpired, \
-    TokenNotHaveUserId, IncorrectInfoForAuthenticateUser
+    TokenNotHaveUserId, IncorrectInfoForAuthenticateUser, BadRequest, TokenRevoked, RefreshTokenIsInvalid
 from backend.users.orm.models import Users
-from backend.users.service_layer.auth import get_password_hash, verify_password
+from backend.users.adapters.login_throttle import LoginThrottle
+from backend.users.adapters.passwords import PasswordHasher
+from backend.users.adapters.token_cache import VerifiedTokenCache
+from backend.users.adapters.token_store import AbstractTokenStore
+from backend.users.service_layer.auth import (
+    PROFILE_CLAIMS,
+    create_refresh_token,
+    create_user_access_token,
+    decode_access_token,
+)
+from backend.users.service_layer.helpers import chunked, decode_cursor, encode_cursor
 
 
 async def register_user(
     cmd: RegisterUser,
     uow: AbstractUnitOfWork,
+    password_hasher: PasswordHasher,
 ):
     """Создаёт пользователя.
 
+    Пароль хэшируется между двумя короткими транзакциями, чтобы соединение с БД не простаивало
+    в очереди пула хэширования. Если почту или тег заняли параллельно, INSERT падает на уникальном индексе.
+
     Raises:
         UserHasAlreadyBeenCreated: пользователь не найден.
+        WorkerPoolSaturated: пул хэширования паролей переполнен.
     """
 
     async with uow:
         user = await uow.users.get_by_email(email=cmd.email) or await uow.users.get_by_tag(tag=cmd.tag)
 
-        if user is None:
-            cmd.password = get_password_hash(cmd.password)
-            user = Users(**cmd.__dict__)
-            await uow.users.add(user)
+    if user is not None:
+        raise UserHasAlreadyBeenCreated
+
+    password_hash = await password_hasher.hash(cmd.password)
+
+    async with uow:
+        await uow.users.add(Users(**{**cmd.__dict__, 'password': password_hash}))
+        await uow.commit()
+
+
+async def register_users(
+    cmd: RegisterUsers,
+    uow: AbstractUnitOfWork,
+    password_hasher: PasswordHasher,
+):
+    """Создаёт пользователей пачкой.
+
+    Занятость почт и тегов всей пачки проверяется одним запросом, пароли свободных хэшируются вне транзакции
+    параллельно порциями по числу воркеров пула, чтобы пачка не переполняла его очередь.
+    Затем в одной короткой транзакции занятость перепроверяется и новые пользователи сохраняются одним
+    пакетным INSERT: соединение с БД и блокировки уникальных индексов не держатся, пока идёт хэширование.
+
+    Returns:
+        Результат по каждому пользователю в порядке запроса со статусом created, duplicate_email или duplicate_tag.
+
+    Raises:
+        BadRequest: в пачке больше USERS_REGISTER_BATCH_MAX_SIZE пользователей.
+        UserHasAlreadyBeenCreated: пользователь из пачки был создан параллельно, пачка не сохранена.
+        WorkerPoolSaturated: пул хэширования паролей переполнен.
+    """
+
+    if len(cmd.users) > settings.USERS_REGISTER_BATCH_MAX_SIZE:
+        raise BadRequest
+
+    async with uow:
+        results, new_users = split_new_users(cmd.users, *await find_taken(uow, cmd.users))
+
+    if not new_users:
+        return results
+
+    password_hashes = {}
+
+    for users_chunk in chunked(new_users, password_hasher.pool.max_workers):
+        chunk_hashes = await asyncio.gather(*(password_hasher.hash(user.password) for user in users_chunk))
+        password_hashes.update((user.email, password_hash) for user, password_hash in zip(users_chunk, chunk_hashes))
+
+    async with uow:
+        # Пока шло хэширование, почту или тег могли занять: такие пользователи получают статус дубликата.
+        new_results, new_users = split_new_users(new_users, *await find_taken(uow, new_users))
+        created = {}
+
+        if new_users:
+            created = await uow.users.add_many([
+                {**user.__dict__, 'password': password_hashes[user.email]}
+                for user in new_users
+            ])
+            await uow.commit()
+
+    new_results = {result['email']: result for result in new_results}
+
+    for result in results:
+        if result['status'] == 'created':
+            result.update(new_results[result['email']])
+
+            if result['status'] == 'created':
+                result['id'] = created[result['email']]
+
+    return results
+
+
+async def find_taken(uow: AbstractUnitOfWork, users: List[RegisterUser]) -> tuple[set[str], set[str]]:
+    return await uow.users.find_taken(emails=[user.email for user in users], tags=[user.tag for user in users])
+
+
+def split_new_users(
+    users: List[RegisterUser],
+    taken_emails: set[str],
+    taken_tags: set[str],
+) -> tuple[list[dict], List[RegisterUser]]:
+    """Возвращает статус по каждому пользователю и тех, кого можно создать: свободных и не повторяющихся в пачке."""
+
+    results, new_users = [], []
+
+    for user in users:
+        if user.email in taken_emails:
+            user_status = 'duplicate_email'
+        elif user.tag in taken_tags:
+            user_status = 'duplicate_tag'
         else:
-            raise UserHasAlreadyBeenCreated
+            user_status = 'created'
+            taken_emails.add(user.email)
+            taken_tags.add(user.tag)
+            new_users.append(user)
+
+        results.append({'email': user.email, 'tag': user.tag, 'status': user_status})
+
+    return results, new_users
 
 
 async def authenticate_user(
     cmd: AuthenticateUser,
     uow: AbstractUnitOfWork,
+    password_hasher: PasswordHasher,
+    token_store: AbstractTokenStore,
+    login_throttle: LoginThrottle,
 ):
     """Создаёт пользователя.
 
+    Пароль проверяется вне транзакции: пользователь читается в короткой UoW, а соединение с БД
+    не держится, пока проверка ждёт пул хэширования.
+    Если хэш пароля получен устаревшей схемой или с другими параметрами стоимости,
+    он прозрачно пересчитывается и сохраняется в отдельной транзакции, если пароль за это время не сменили.
+
+    Returns:
+        Токен доступа и refresh-токен.
+
     Raises:
         UserHasAlreadyBeenCreated: пользователь не найден.
+        WorkerPoolSaturated: пул хэширования паролей переполнен.
+        RateLimitExceeded: слишком много попыток входа с этого IP или для этой почты.
     """
 
+    await login_throttle.check(email=cmd.email, ip=cmd.client_ip)
+
     async with uow:
         user = await uow.users.get_by_email(email=cmd.email)
 
-        if user is None or verify_password(plain_password=cmd.password, hashed_password=user.password) is False:
+        if user is None:
             raise IncorrectInfoForAuthenticateUser
 
-        user_id = user.to_dict()['id']
+        password_hash = user.password
+        user_data = {field: getattr(user, field) for field in ('id', *PROFILE_CLAIMS)}
+
+    is_valid, new_password_hash = await password_hasher.verify_and_update(cmd.password, password_hash)
+
+    if is_valid is False:
+        raise IncorrectInfoForAuthenticateUser
+
+    if new_password_hash is not None:
+        async with uow:
+            user = await uow.users.get_by_id(user_data['id'])
+
+            if user is not None and user.password == password_hash:
+                await uow.users.update_password(user, new_password_hash)
+                await uow.commit()
 
-    return user_id
+    return await issue_tokens(user_data, token_store)
+
+
+async def refresh_tokens(
+    cmd: RefreshTokens,
+    uow: AbstractUnitOfWork,
+    token_store: AbstractTokenStore,
+):
+    """Обменивает refresh-токен на новую пару токенов без проверки пароля.
+
+    Refresh-токен одноразовый: при обмене он удаляется, и клиент получает новый.
+
+    Raises:
+        RefreshTokenIsInvalid: токен неизвестен, уже использован, истёк или пользователь удалён.
+    """
+
+    user_id = await token_store.pop_refresh_token(cmd.refresh_token)
+
+    if user_id is None:
+        raise RefreshTokenIsInvalid
+
+    async with uow:
+        user_data = await uow.users_view.get_by_id(id=user_id)
+
+    if user_data is None:
+        raise RefreshTokenIsInvalid
+
+    return await issue_tokens(user_data, token_store)
+
+
+async def revoke_tokens(
+    cmd: RevokeTokens,
+    token_store: AbstractTokenStore,
+):
+    """Отзывает токены при выходе: удаляет refresh-токен и заносит jti токена доступа в список отозванных.
+
+    Просроченный или невалидный токен доступа не отзывается, он и так не принимается.
+    """
+
+    if cmd.refresh_token:
+        await token_store.pop_refresh_token(cmd.refresh_token)
+
+    if cmd.access_token:
+        try:
+            claims = decode_access_token(cmd.access_token)
+        except (TokenIsInvalid, TokenExpired, TokenNotHaveUserId):
+            return
+
+        await token_store.revoke(claims['jti'], ttl=int(claims['exp'] - time.time()) + 1)
+
+
+async def issue_tokens(user_data: dict, token_store: AbstractTokenStore) -> dict[str, str]:
+    """Выпускает короткоживущий токен доступа и refresh-токен, который сохраняется в хранилище."""
+
+    refresh_token = create_refresh_token()
+    await token_store.save_refresh_token(refresh_token, user_data['id'], ttl=settings.JWT_REFRESH_EXPIRES_IN * 60)
+
+    return {'access_token': create_user_access_token(user_data), 'refresh_token': refresh_token}
 
 
 async def get_all_users(
@@ -80,12 +288,49 @@ async def get_all_users(
     """Возвращает всех пользователь."""
 
     async with uow:
-        users = await uow.users.get_all()
-        users_data = [user.to_dict() for user in users]
+        users_data = await uow.users_view.get_all()
 
     return users_data
 
 
+async def get_all_users_if_changed(
+    query: GetAllUsersIfChanged,
+    uow: AbstractUnitOfWork,
+):
+    """Возвращает ETag списка пользователей и их данные или None, если ETag совпал с query.if_none_match.
+
+    ETag строится из счётчика изменений таблицы. Счётчик читается раньше строк в той же сессии, поэтому
+    ETag никогда не новее данных: при гонке с записью клиент лишь ещё раз получит полный ответ.
+    """
+
+    async with uow:
+        etag = make_etag('users', await uow.users_view.get_table_version())
+
+        if etag_matches(query.if_none_match, etag):
+            return etag, None
+
+        return etag, await uow.users_view.get_all()
+
+
+async def stream_all_users(
+    query: StreamAllUsers,
+    uow: AbstractUnitOfWork,
+):
+    """Возвращает асинхронный генератор данных всех пользователей.
+
+    Сессия открывается при первом чтении генератора и держится, пока он не будет дочитан:
+    строки выбираются из курсора пачками по USERS_STREAM_YIELD_PER, поэтому память не растёт с числом пользователей.
+    """
+
+    async def users_data():
+        with read_only_scope():
+            async with uow:
+                async for user_data in uow.users_view.stream_all(yield_per=settings.USERS_STREAM_YIELD_PER):
+                    yield user_data
+
+    return users_data()
+
+
 async def get_user_by_email(
     query: GetUserByEmail,
     uow: AbstractUnitOfWork,
@@ -93,12 +338,10 @@ async def get_user_by_email(
     """Находит данные пользователя по почте."""
 
     async with uow:
-        user = await uow.users.get_by_email(email=query.email)
+        user_data = await uow.users_view.get_by_email(email=query.email)
 
-        if user is None:
+        if user_data is None:
             raise NotFoundUser
-        else:
-            user_data = user.to_dict
 
     return user_data
 
@@ -110,12 +353,10 @@ async def get_user_by_tag(
     """Находит данные пользователя по тегу."""
 
     async with uow:
-        user = await uow.users.get_by_tag(email=query.tag)
+        user_data = await uow.users_view.get_by_tag(tag=query.tag)
 
-        if user is None:
+        if user_data is None:
             raise NotFoundUser
-        else:
-            user_data = user.to_dict
 
     return user_data
 
@@ -127,63 +368,189 @@ async def get_user_by_id(
     """Находит данные пользователя по идентификатору."""
 
     async with uow:
-        user = await uow.users.get_by_id(id=query.id)
+        user_data = await uow.users_view.get_by_id(id=query.id)
 
-        if user is None:
+        if user_data is None:
             raise NotFoundUser
-        else:
-            user_data = user.to_dict()
 
         return user_data
 
 
+async def get_user_by_id_if_changed(
+    query: GetUserByIdIfChanged,
+    uow: AbstractUnitOfWork,
+):
+    """Возвращает ETag пользователя и его данные или None, если ETag совпал с query.if_none_match.
+
+    ETag строится из версии строки, которая выбирается по первичному ключу отдельно от данных.
+
+    Raises:
+        NotFoundUser: пользователь не найден.
+    """
+
+    async with uow:
+        version = await uow.users_view.get_version_by_id(id=query.id)
+
+        if version is None:
+            raise NotFoundUser
+
+        etag = make_etag('user', query.id, version)
+
+        if etag_matches(query.if_none_match, etag):
+            return etag, None
+
+        user_data = await uow.users_view.get_by_id(id=query.id)
+
+        if user_data is None:
+            raise NotFoundUser
+
+        return etag, user_data
+
+
+async def check_user_availability(
+    query: CheckUserAvailability,
+    uow: AbstractUnitOfWork,
+    availability_filter: UserAvailabilityFilter,
+):
+    """Проверяет, свободны ли почта и тег.
+
+    Сначала спрашивает Bloom filter: если он отвечает, что значение точно свободно, БД не используется.
+    Возможно занятые значения проверяются в БД.
+
+    Raises:
+        BadRequest: не переданы ни почта, ни тег.
+    """
+
+    if query.email is None and query.tag is None:
+        raise BadRequest
+
+    availability = {}
+    to_check = {}
+
+    for field, value in query.get_is_not_none_attribute().items():
+        if await availability_filter.might_be_taken(**{field: value}):
+            to_check[field] = value
+        else:
+            availability[field] = True
+            availability_filter.filter_answers += 1
+
+    if to_check:
+        availability_filter.database_checks += 1
+
+        async with uow:
+            if 'email' in to_check:
+                availability['email'] = await uow.users_view.get_by_email(email=to_check['email']) is None
+            if 'tag' in to_check:
+                availability['tag'] = await uow.users_view.get_by_tag(tag=to_check['tag']) is None
+
+        if availability_filter.ready:
+            availability_filter.false_positives += sum(availability[field] for field in to_check)
+
+    return availability
+
+
 async def get_users_by_filter(
     query: GetUsersByFilter,
     uow: AbstractUnitOfWork,
 ):
-    """Находит пользотелей соответствующим указанным фильтрам."""
+    """Находит пользотелей соответствующим указанным фильтрам.
+
+    Возвращает страницу не длиннее limit, отсортированную по sort, и курсор следующей страницы.
+    Страницы выбираются по ключу последней записи (keyset), а не через OFFSET.
+
+    Raises:
+        BadRequest: курсор повреждён, получен для другой сортировки или его ключ не подходит к колонкам сортировки.
+    """
+
+    limit = min(query.limit or settings.USERS_PAGE_DEFAULT_LIMIT, settings.USERS_PAGE_MAX_LIMIT)
+    after = None
+
+    if query.cursor is not None:
+        try:
+            sort, *after = decode_cursor(query.cursor)
+        except ValueError:
+            raise BadRequest
+
+        if sort != query.sort or not is_valid_page_key(sort, after):
+            raise BadRequest
 
     async with uow:
-        user_filter_params = query.get_is_not_none_attribute()
-        users = await uow.users.get_by_filter(user_filter_params)
-        users_data = [user.to_dict() for user in users]
+        users_data, last_key = await uow.users_view.get_page(
+            filters=query.get_filters(),
+            sort=query.sort,
+            after=after,
+            limit=limit,
+        )
 
-        return users_data
+        return {
+            'items': users_data,
+            'next_cursor': encode_cursor(query.sort, *last_key) if last_key is not None else None,
+        }
 
 
 async def get_current_user(
     query: GetCurrentUser,
     uow: AbstractUnitOfWork,
+    current_user_cache: StaleWhileRevalidateCache,
+    token_cache: VerifiedTokenCache,
+    token_store: AbstractTokenStore,
 ):
-    try:
-        auth_data = settings.get_auth_data
-        # payload = jwt.decode(query.token, auth_data['secret_key'], algorithms=[auth_data['algorithm']])
-        payload = jwt.decode(query.token[2:-1], auth_data['secret_key'])
-    except JWTError:
-        # raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Токен не валидный!')
-        raise TokenIsInvalid
+    """Возвращает данные пользователя по токену доступа.
+
+    Проверенные токены кэшируются до exp, повторная проверка подписи не нужна. Если токен уже был
+    проверен и содержит профиль (USERS_TOKEN_PROFILE_CLAIMS), ответ собирается из claims без БД.
+    Данные пользователя берутся из кэша воркера; устаревшая запись отдаётся сразу и обновляется в фоне.
 
-    expire: str = payload.get('exp')
-    expire_time = datetime.fromtimestamp(int(expire), tz=timezone.utc)
-    if (not expire) or (expire_time < datetime.now(timezone.utc)):
-        # raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Токен истек')
-        raise TokenExpired
+    Raises:
+        TokenIsInvalid: токен повреждён или подписан другим ключом.
+        TokenExpired: срок действия токена истёк.
+        TokenNotHaveUserId: в токене нет id пользователя.
+        TokenRevoked: токен отозван при выходе.
+        NotFoundUser: пользователь удалён.
+    """
 
-    user_id = payload.get('sub')
-    if not user_id:
-        raise TokenNotHaveUserId
+    claims = token_cache.get(query.token)
+    is_verified = claims is not None
 
-    async with uow:
-        user = await uow.users.get_by_id(id=int(user_id))
+    if not is_verified:
+        claims = decode_access_token(query.token)
+
+    if await token_store.is_revoked(claims['jti']):
+        raise TokenRevoked
+
+    if is_verified and settings.USERS_TOKEN_PROFILE_CLAIMS and 'profile' in claims:
+        return {'id': int(claims['sub']), **claims['profile']}
+
+    user_id = int(claims['sub'])
+    cached = current_user_cache.get(user_id)
 
-        if not user:
+    if cached is not None:
+        user_data, is_stale = cached
+
+        if is_stale:
+            current_user_cache.refresh(user_id, lambda: load_current_user(user_id, uow))
+    else:
+        user_data = await load_current_user(user_id, uow)
+
+        if not user_data:
             raise NotFoundUser
 
-        user_data = user.to_dict()
+        current_user_cache.set(user_id, user_data)
+
+    if not is_verified:
+        # Токен кэшируется только после проверки, что пользователь существует.
+        token_cache.set(query.token, claims)
 
     return user_data
 
 
+async def load_current_user(user_id: int, uow: AbstractUnitOfWork) -> Optional[dict]:
+    """Загружает данные пользователя для /users/me/ в обход кэша воркера."""
+
+    async with uow:
+        return await uow.users_view.get_by_id(id=user_id)
+
+
 async def delete_user_by_email(
     cmd: DeleteUserByEmail,
     uow: AbstractUnitOfWork,
@@ -197,6 +564,7 @@ async def delete_user_by_email(
             raise NotFoundUser
         else:
             delete_user = await uow.users.delete(user)
+            await uow.commit()
 
     return delete_user
 
@@ -214,10 +582,78 @@ async def delete_user_by_id(
             raise NotFoundUser
         else:
             delete_user = await uow.users.delete(user)
+            await uow.commit()
 
     return delete_user
 
 
+async def delete_users_by_ids(
+    cmd: DeleteUsersByIds,
+    uow: AbstractUnitOfWork,
+):
+    """Удаляет пользователей по списку идентификаторов.
+
+    Удаление идёт пачками по USERS_BULK_DELETE_CHUNK_SIZE: каждая пачка удаляется одним DELETE ... RETURNING
+    в своей транзакции.
+
+    Returns:
+        Идентификаторы удалённых пользователей и идентификаторы, по которым пользователи не найдены.
+    """
+
+    ids = list(dict.fromkeys(cmd.ids))
+    deleted_ids = set()
+
+    async with uow:
+        for ids_chunk in chunked(ids, settings.USERS_BULK_DELETE_CHUNK_SIZE):
+            deleted_users = await uow.users.delete_by_ids(ids_chunk)
+            await uow.commit()
+            deleted_ids.update(user['id'] for user in deleted_users)
+
+    return {
+        'deleted': [id for id in ids if id in deleted_ids],
+        'missing': [id for id in ids if id not in deleted_ids],
+    }
+
+
+async def delete_users_by_emails(
+    cmd: DeleteUsersByEmails,
+    uow: AbstractUnitOfWork,
+):
+    """Удаляет пользователей по списку почт.
+
+    Удаление идёт пачками по USERS_BULK_DELETE_CHUNK_SIZE: каждая пачка удаляется одним DELETE ... RETURNING
+    в своей транзакции.
+
+    Returns:
+        Почты удалённых пользователей и почты, по которым пользователи не найдены.
+    """
+
+    emails = list(dict.fromkeys(cmd.emails))
+    deleted_emails = set()
+
+    async with uow:
+        for emails_chunk in chunked(emails, settings.USERS_BULK_DELETE_CHUNK_SIZE):
+            deleted_users = await uow.users.delete_by_emails(emails_chunk)
+            await uow.commit()
+            deleted_emails.update(user['email'] for user in deleted_users)
+
+    return {
+        'deleted': [email for email in emails if email in deleted_emails],
+        'missing': [email for email in emails if email not in deleted_emails],
+    }
+
+
+async def rebuild_user_availability_filter(
+    cmd: RebuildUserAvailabilityFilter,
+    uow: AbstractUnitOfWork,
+    availability_filter: UserAvailabilityFilter,
+):
+    """Перестраивает Bloom filter занятых почт и тегов по таблице пользователей."""
+
+    async with uow:
+        await availability_filter.rebuild(uow.users_view.stream_all(yield_per=settings.USERS_STREAM_YIELD_PER))
+
+
 async def send_notification_about_created_user(
     event: CreatedUser,
     notifications: AbstractNotifications,
@@ -228,22 +664,80 @@ async def send_notification_about_created_user(
     )
 
 
+async def invalidate_user_cache(
+    event: Union[CreatedUser, DeletedUser],
+    cache: Optional[AbstractCache],
+):
+    """Удаляет из общего кэша данные пользователя, в том числе закэшированное отсутствие после создания."""
+
+    if cache is not None:
+        await cache.delete(*user_cache_keys(id=event.id, email=event.email, tag=event.tag))
+
+
+async def evict_current_user(
+    event: DeletedUser,
+    current_user_cache: StaleWhileRevalidateCache,
+):
+    """Удаляет удалённого пользователя из кэша /users/me/ этого воркера. Повторный вызов ничего не меняет."""
+
+    current_user_cache.evict(event.id)
+
+
+async def evict_user_tokens(
+    event: DeletedUser,
+    token_cache: VerifiedTokenCache,
+):
+    """Удаляет проверенные токены удалённого пользователя из кэша этого воркера. Повторный вызов ничего не меняет."""
+
+    token_cache.evict_user(event.id)
+
+
+async def update_availability_filter(
+    event: Union[CreatedUser, DeletedUser],
+    availability_filter: UserAvailabilityFilter,
+):
+    """Добавляет почту и тег созданного пользователя в Bloom filter или убирает их после удаления."""
+
+    if isinstance(event, CreatedUser):
+        await availability_filter.add(email=event.email, tag=event.tag)
+    else:
+        await availability_filter.remove(email=event.email, tag=event.tag)
+
+
 COMMAND_HANDLERS: Dict[Type[Command], Callable] = {
     RegisterUser: register_user,
+    RegisterUsers: register_users,
+    AuthenticateUser: authenticate_user,
+    RefreshTokens: refresh_tokens,
+    RevokeTokens: revoke_tokens,
 
     DeleteUserById: delete_user_by_id,
     DeleteUserByEmail: delete_user_by_email,
+    DeleteUsersByIds: delete_users_by_ids,
+    DeleteUsersByEmails: delete_users_by_emails,
+    RebuildUserAvailabilityFilter: rebuild_user_availability_filter,
 }
 
 EVENT_HANDLERS: Dict[Type[Event], List[Callable]] = {
-    CreatedUser: [send_notification_about_created_user],
+    CreatedUser: [send_notification_about_created_user, invalidate_user_cache, update_availability_filter],
+    DeletedUser: [invalidate_user_cache, evict_current_user, evict_user_tokens, update_availability_filter],
+}
+
+# Обработчики состояния в памяти воркера. Выполняются на каждом HTTP-воркере по событиям, опубликованным
+# из outbox, поэтому до воркера доходят и изменения, сделанные другими процессами. Должны быть идемпотентны:
+# в процессе, где событие произошло, они уже выполнены через EVENT_HANDLERS.
+WORKER_EVENT_HANDLERS: Dict[Type[Event], List[Callable]] = {
+    DeletedUser: [evict_current_user, evict_user_tokens],
 }
 
 QUERY_HANDLERS: Dict[Type[Query], Callable] = {
-    AuthenticateUser: authenticate_user,
     GetCurrentUser: get_current_user,
     GetAllUsers: get_all_users,
+    GetAllUsersIfChanged: get_all_users_if_changed,
+    StreamAllUsers: stream_all_users,
     GetUsersByFilter: get_users_by_filter,
     GetUserById: get_user_by_id,
+    GetUserByIdIfChanged: get_user_by_id_if_changed,
     GetUserByEmail: get_user_by_email,
+    CheckUserAvailability: check_user_availability,
 }
@@ -1,3 +1,10 @@
+import base64
+import json
+from typing import Any, Iterable, Iterator, TypeVar
+
+T = TypeVar('T')
+
+
 async def compare_matching_keys(first_dict, second_dict):
     """Сравнивает значения совпадающих ключей между двумя словарям и возвращает True, если совпадают."""
 
@@ -6,3 +13,43 @@ async def compare_matching_keys(first_dict, second_dict):
             return False
 
     return True
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Разбивает последовательность на списки длиной не больше size."""
+
+    chunk = []
+
+    for item in items:
+        chunk.append(item)
+
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def encode_cursor(*values: Any) -> str:
+    """Кодирует значения ключа последней записи страницы в непрозрачный курсор."""
+
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    """Декодирует курсор страницы.
+
+    Raises:
+        ValueError: курсор повреждён.
+    """
+
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, UnicodeDecodeError) as error:
+        raise ValueError(f'Invalid cursor {cursor}') from error
+
+    if not isinstance(values, list):
+        raise ValueError(f'Invalid cursor {cursor}')
+
+    return values
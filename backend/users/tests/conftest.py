@@ -7,7 +7,14 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
 
 from backend.config import settings
+from backend.core.adapters.rate_limit import InMemoryRateLimiter
+from backend.core.adapters.worker_pool import WorkerPool
+from backend.core.service_layer.unit_of_work import SqlAlchemyUnitOfWork, make_session_factory
 from backend.main import backend
+from backend.users.adapters.login_throttle import LoginThrottle
+from backend.users.adapters.passwords import PasswordHasher
+from backend.users.adapters.token_store import InMemoryTokenStore
+from backend.users.orm.models import Users
 
 pytest.register_assert_rewrite('tests.e2e.api_client')
 os.environ['TESTING'] = 'True'
@@ -50,3 +57,52 @@ async def postgres_session_factory(postgres_db):
 @pytest.fixture
 async def session(postgres_session_factory):
     return postgres_session_factory
+
+
+@pytest.fixture
+async def sqlite_engine(tmp_path):
+    # SQLite пропускает одного писателя за раз: остальные ждут блокировку дольше стандартных 5 секунд.
+    engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "users.db"}', connect_args={'timeout': 30})
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Users.metadata.create_all)
+
+    yield engine
+
+    await engine.dispose()
+
+
+@pytest.fixture
+async def sqlite_uow(sqlite_engine):
+    return SqlAlchemyUnitOfWork(session_factory=make_session_factory(sqlite_engine), replica_router=None)
+
+
+async def add_users(uow, count, roles=1):
+    """Добавляет count пользователей @0, @1, ... с ролями по кругу из первых roles."""
+
+    async with uow:
+        for number in range(count):
+            uow.session.add(
+                Users(tag=f'@{number}', email=f'{number}@mail.ru', password='hash', role_id=number % roles + 1)
+            )
+
+        await uow.session.commit()
+
+
+@pytest.fixture
+def password_hasher():
+    pool = WorkerPool(max_workers=2, max_queue=4)
+
+    yield PasswordHasher(pool)
+
+    pool.shutdown()
+
+
+@pytest.fixture
+def token_store():
+    return InMemoryTokenStore()
+
+
+@pytest.fixture
+def login_throttle():
+    return LoginThrottle(InMemoryRateLimiter(), per_email=3, per_ip=5, window=60)
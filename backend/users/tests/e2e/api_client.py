@@ -17,6 +17,15 @@ async def post_to_register_user(client: AsyncClient, user_data: EmailStr):
     return response
 
 
+async def post_to_register_users(client: AsyncClient, users_data: list[dict[str, Any]]):
+    response = await client.post(
+        '/users/register_batch',
+        json={'users': users_data},
+    )
+
+    return response
+
+
 async def get_users_by_filter(client: AsyncClient, params: dict[str, Any]):
     request_params = '&'.join([
         f'{key}={value}'
@@ -39,6 +48,15 @@ async def get_all_users(client: AsyncClient):
     return response
 
 
+async def stream_all_users(client: AsyncClient, stream: str):
+    response = await client.get(
+        'users/get_all',
+        params={'stream': stream},
+    )
+
+    return response
+
+
 async def get_to_user_by_email(client: AsyncClient, user_email: EmailStr):
     response = await client.get(
         f'users/get_by_email/{user_email}',
@@ -69,3 +87,12 @@ async def delete_user_by_email(client: AsyncClient, user_email: EmailStr):
     )
 
     return response
+
+
+async def delete_users_by_ids(client: AsyncClient, user_ids: list[int]):
+    response = await client.post(
+        'users/delete_by_ids',
+        json={'ids': user_ids},
+    )
+
+    return response
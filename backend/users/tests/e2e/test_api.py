@@ -9,11 +9,14 @@ from backend.users.service_layer.helpers import compare_matching_keys
 from backend.users.tests.e2e.api_client import (
     delete_user_by_email,
     delete_user_by_id,
+    delete_users_by_ids,
     get_all_users,
     get_to_user_by_email,
     get_to_user_by_id,
     get_users_by_filter,
     post_to_register_user,
+    post_to_register_users,
+    stream_all_users,
 )
 from backend.users.tests.random_refs import generate_test_user_data
 
@@ -27,7 +30,7 @@ async def test_get_users_by_filter(session, async_client_api):
     response = await get_users_by_filter(async_client_api, test_user_data)
 
     assert response.status_code == status.HTTP_200_OK
-    assert await compare_matching_keys(json.loads(response.content).pop(), test_user_data)
+    assert await compare_matching_keys(json.loads(response.content)['items'].pop(), test_user_data)
 
 
 async def test_get_all_users(session, async_client_api):
@@ -43,6 +46,40 @@ async def test_get_all_users(session, async_client_api):
     assert await compare_matching_keys(json.loads(response.content).pop(), test_user_data)
 
 
+async def test_stream_all_users_as_ndjson(session, async_client_api):
+    test_user_data = await generate_test_user_data()
+    user = Users(**test_user_data)
+
+    session.add(user)
+    await session.commit()
+
+    response = await stream_all_users(async_client_api, 'ndjson')
+    users_data = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert await compare_matching_keys(users_data.pop(), test_user_data)
+
+    await session.delete(user)
+    await session.commit()
+
+
+async def test_stream_all_users_as_json_array(session, async_client_api):
+    test_user_data = await generate_test_user_data()
+    user = Users(**test_user_data)
+
+    session.add(user)
+    await session.commit()
+
+    response = await stream_all_users(async_client_api, 'json')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert await compare_matching_keys(json.loads(response.content).pop(), test_user_data)
+
+    await session.delete(user)
+    await session.commit()
+
+
 async def test_get_user_by_email(session, async_client_api):
     test_user_data = await generate_test_user_data()
     user = Users(**test_user_data)
@@ -106,6 +143,24 @@ async def test_register_user_if_user_has_been_created(session, async_client_api)
     assert response.status_code == status.HTTP_400_BAD_REQUEST
 
 
+async def test_register_users(session, async_client_api):
+    users_data = [await generate_test_user_data() for _ in range(3)]
+    users_data.append({**users_data[0], 'tag': (await generate_test_user_data())['tag']})
+
+    response = await post_to_register_users(async_client_api, users_data)
+    results = json.loads(response.content)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [result['status'] for result in results] == ['created', 'created', 'created', 'duplicate_email']
+
+    users = await session.execute(select(Users).where(Users.id.in_([result['id'] for result in results[:3]])))
+
+    for created_user in users.scalars():
+        await session.delete(created_user)
+
+    await session.commit()
+
+
 async def test_delete_user_by_email(session, async_client_api):
     test_user_data = await generate_test_user_data()
     user = Users(**test_user_data)
@@ -136,3 +191,17 @@ async def test_delete_user_by_id(session, async_client_api):
         await session.commit()
 
     assert response.status_code == status.HTTP_200_OK
+
+
+async def test_delete_users_by_ids(session, async_client_api):
+    users = [Users(**await generate_test_user_data()) for _ in range(3)]
+
+    session.add_all(users)
+    await session.commit()
+
+    user_ids = [user.id for user in users]
+    missing_id = max(user_ids) + 1000
+    response = await delete_users_by_ids(async_client_api, [*user_ids, missing_id])
+
+    assert response.status_code == status.HTTP_200_OK
+    assert json.loads(response.content) == {'deleted': user_ids, 'missing': [missing_id]}
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from backend.core.adapters.metrics_server import start_metrics_server
+from backend.core.adapters.redis_streams import (
+    RedisStreamConsumer,
+    UndecodableCommand,
+    decode_command,
+    encode_command,
+)
+from backend.core.metrics import MetricsRegistry
+from backend.users.adapters.redis_command_worker import COMMAND_TYPES, NON_RETRYABLE_ERRORS
+from backend.users.domain.commands import AuthenticateUser, RegisterUser, RegisterUsers
+from backend.users.exceptions import UserHasAlreadyBeenCreated
+
+
+class FakeStreamRedis:
+    def __init__(self, pending=(), entries=None):
+        self.pending = list(pending)
+        self.entries = entries or {}
+        self.acked = []
+        self.added = []
+        self.kept = []
+
+    async def xack(self, stream, group, *ids):
+        self.acked.extend(ids)
+
+    async def xadd(self, stream, fields):
+        self.added.append((stream, fields))
+
+    async def xpending_range(self, stream, group, min, max, count, idle):
+        return self.pending[:count]
+
+    async def xclaim(self, stream, group, consumer, min_idle_time, message_ids, justid=False):
+        if justid:
+            self.kept.append(sorted(message_ids))
+            return message_ids
+
+        return [(entry_id, self.entries.get(entry_id, {})) for entry_id in message_ids]
+
+
+def make_consumer(redis, handle) -> RedisStreamConsumer:
+    return RedisStreamConsumer(
+        redis=redis,
+        stream='commands',
+        group='workers',
+        consumer='worker-1',
+        handle=handle,
+        concurrency=4,
+        batch_size=10,
+        block_ms=10,
+        claim_idle_ms=1000,
+        max_deliveries=3,
+        non_retryable_errors=NON_RETRYABLE_ERRORS,
+    )
+
+
+def entry_id() -> str:
+    return f'{int(time.time() * 1000)}-0'
+
+
+def test_commands_survive_stream_encoding():
+    command = RegisterUsers(users=[RegisterUser(tag='@a', email='a@mail.ru', password='pass')])
+
+    assert decode_command(encode_command(command), COMMAND_TYPES) == command
+
+
+def test_fields_not_in_init_are_not_taken_from_stream():
+    command = AuthenticateUser(email='a@mail.ru', password='pass')
+    command.client_ip = '10.0.0.1'
+
+    assert decode_command(encode_command(command), COMMAND_TYPES).client_ip is None
+
+
+@pytest.mark.parametrize('entry', [
+    {'type': 'Unknown', 'payload': '{}'},
+    {'type': 'RegisterUser', 'payload': 'not json'},
+    {'type': 'RegisterUser', 'payload': '{"tag": "@a"}'},
+])
+def test_broken_entries_are_undecodable(entry):
+    with pytest.raises(UndecodableCommand):
+        decode_command(entry, COMMAND_TYPES)
+
+
+async def test_entry_is_acked_after_successful_handling():
+    redis, handled = FakeStreamRedis(), []
+
+    async def handle(entry):
+        handled.append(decode_command(entry, COMMAND_TYPES))
+
+    consumer = make_consumer(redis, handle)
+    command = RegisterUser(tag='@a', email='a@mail.ru', password='pass')
+    command_entry_id = entry_id()
+
+    await consumer.process(command_entry_id, encode_command(command))
+
+    assert handled == [command]
+    assert redis.acked == [command_entry_id]
+    assert consumer.metrics_snapshot()['processed'] == 1
+
+
+async def test_failed_entry_stays_pending():
+    redis = FakeStreamRedis()
+
+    async def handle(entry):
+        raise ConnectionError
+
+    consumer = make_consumer(redis, handle)
+
+    await consumer.process(entry_id(), {})
+
+    assert redis.acked == []
+    assert consumer.metrics_snapshot()['failures'] == 1
+
+
+@pytest.mark.parametrize('error', [UndecodableCommand, UserHasAlreadyBeenCreated])
+async def test_non_retryable_entry_is_dead_lettered_at_once(error):
+    redis = FakeStreamRedis()
+
+    async def handle(entry):
+        raise error
+
+    consumer = make_consumer(redis, handle)
+
+    await consumer.process('1-0', {'type': 'RegisterUser', 'payload': '{}'})
+
+    assert redis.added == [
+        ('commands:dead', {'type': 'RegisterUser', 'payload': '{}', 'entry_id': '1-0', 'error': repr(error())}),
+    ]
+    assert redis.acked == ['1-0']
+    assert consumer.metrics_snapshot()['dead_lettered'] == 1
+
+
+async def test_entries_in_progress_are_kept_claimed_and_not_reclaimed():
+    release = asyncio.Event()
+    redis = FakeStreamRedis(pending=[{'message_id': '1-0', 'times_delivered': 1}], entries={'1-0': {}})
+
+    async def handle(entry):
+        await release.wait()
+
+    consumer = make_consumer(redis, handle)
+    worker = asyncio.create_task(consumer._work_forever())
+    await consumer._hold(('1-0', {'type': 'RegisterUsers', 'payload': '{}'}))
+    await asyncio.sleep(0)
+
+    await consumer.keep_claimed()
+    await consumer.reclaim()
+
+    assert redis.kept == [['1-0']]
+    assert consumer.metrics_snapshot()['reclaimed'] == 0
+
+    release.set()
+    await consumer._entries.join()
+    worker.cancel()
+    await consumer.keep_claimed()
+
+    assert redis.acked == ['1-0']
+    assert redis.kept == [['1-0']]
+
+
+async def test_stale_entries_are_reclaimed_or_dead_lettered():
+    entries = {'1-0': {'type': 'RegisterUser', 'payload': '{}'}, '2-0': {'type': 'DeleteUserById', 'payload': '{}'}}
+    redis = FakeStreamRedis(
+        pending=[
+            {'message_id': '1-0', 'times_delivered': 1},
+            {'message_id': '2-0', 'times_delivered': 3},
+        ],
+        entries=entries,
+    )
+
+    async def handle(entry):
+        pass
+
+    consumer = make_consumer(redis, handle)
+
+    await consumer.reclaim()
+
+    assert consumer._entries.get_nowait() == ('1-0', entries['1-0'])
+    assert redis.added == [('commands:dead', {**entries['2-0'], 'entry_id': '2-0'})]
+    assert redis.acked == ['2-0']
+    assert consumer.metrics_snapshot()['reclaimed'] == 1
+    assert consumer.metrics_snapshot()['dead_lettered'] == 1
+
+
+async def http_get(port: int, path: str) -> tuple[str, bytes]:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+    response = await reader.read()
+    writer.close()
+    head, body = response.split(b'\r\n\r\n', 1)
+
+    return head.decode().split('\r\n')[0], body
+
+
+async def test_worker_metrics_are_served_over_http():
+    registry = MetricsRegistry()
+    consumer = make_consumer(FakeStreamRedis(), handle=None)
+    registry.register('command_stream_consumer', consumer.metrics_snapshot)
+    server = await start_metrics_server(registry, host='127.0.0.1', port=0, path='/metrics')
+    port = server.sockets[0].getsockname()[1]
+
+    try:
+        status, body = await http_get(port, '/metrics')
+        missing_status, _ = await http_get(port, '/other')
+    finally:
+        server.close()
+
+    assert status == 'HTTP/1.1 200 OK'
+    assert json.loads(body)['command_stream_consumer']['processed'] == 0
+    assert missing_status == 'HTTP/1.1 404 Not Found'
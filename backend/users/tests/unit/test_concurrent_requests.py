@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from passlib.context import CryptContext
+
+from backend.bootstrap import bootstrap
+from backend.core.adapters.worker_pool import WorkerPool
+from backend.core.service_layer.routing import ReplicaRouter, caller_scope
+from backend.core.service_layer.unit_of_work import SqlAlchemyUnitOfWork, make_session_factory
+from backend.users.adapters.passwords import PasswordHasher
+from backend.users.domain.commands import RegisterUser
+from backend.users.domain.queries import GetUserByEmail, GetUserById
+from backend.users.exceptions import NotFoundUser
+from backend.users.orm.models import Users
+
+
+async def test_one_bus_serves_hundreds_of_concurrent_requests(sqlite_engine, monkeypatch):
+    fast_context = CryptContext(schemes=['bcrypt'], bcrypt__rounds=4)
+    monkeypatch.setattr('backend.users.service_layer.auth.pwd_context', fast_context)
+    session_factory = make_session_factory(sqlite_engine)
+    pool = WorkerPool(max_workers=4, max_queue=200)
+    bus = bootstrap(
+        uow_factory=lambda: SqlAlchemyUnitOfWork(session_factory=session_factory, replica_router=None),
+        publish=lambda *args: None,
+        password_hasher=PasswordHasher(pool),
+    )
+
+    async with session_factory() as session:
+        session.add_all([
+            Users(tag=f'@{number}', email=f'{number}@mail.ru', password='hash', role_id=1)
+            for number in range(1, 21)
+        ])
+        await session.commit()
+
+    queries = [GetUserById(id=number % 20 + 1) for number in range(200)]
+    commands = [
+        RegisterUser(tag=f'@new{number}', email=f'new{number}@mail.ru', password='pass')
+        for number in range(100)
+    ]
+
+    results = await asyncio.gather(*(bus.handle(message) for message in queries + commands))
+    pool.shutdown()
+
+    assert [user['id'] for user in results[:200]] == [query.id for query in queries]
+    assert [user['email'] for user in results[:200]] == [f'{query.id}@mail.ru' for query in queries]
+
+    created = await asyncio.gather(*(bus.handle(GetUserByEmail(email=command.email)) for command in commands))
+
+    assert [user['tag'] for user in created] == [command.tag for command in commands]
+
+
+async def test_writer_does_not_join_query_started_before_its_write(sqlite_engine, monkeypatch):
+    fast_context = CryptContext(schemes=['bcrypt'], bcrypt__rounds=4)
+    monkeypatch.setattr('backend.users.service_layer.auth.pwd_context', fast_context)
+    session_factory = make_session_factory(sqlite_engine)
+    router = ReplicaRouter(replicas=[], read_your_writes_window=60)
+    pool = WorkerPool(max_workers=1, max_queue=1)
+    release, held = asyncio.Event(), []
+
+    async def hold_first_query_result(name, message, call_next):
+        try:
+            return await call_next()
+        finally:
+            if name == 'GetUserById' and not held:
+                held.append(message)
+                await release.wait()
+
+    bus = bootstrap(
+        uow_factory=lambda: SqlAlchemyUnitOfWork(session_factory=session_factory, replica_router=router),
+        publish=lambda *args: None,
+        password_hasher=PasswordHasher(pool),
+        middlewares=[hold_first_query_result],
+        coalesced_queries=['GetUserById'],
+        replica_router=router,
+    )
+
+    with caller_scope('reader'):
+        stale_flight = asyncio.create_task(bus.handle(GetUserById(id=1)))
+
+    while not held:
+        await asyncio.sleep(0.01)
+
+    with caller_scope('writer'):
+        await bus.handle(RegisterUser(tag='@new', email='new@mail.ru', password='pass'))
+
+        async with asyncio.timeout(5):
+            user_data = await bus.handle(GetUserById(id=1))
+
+    release.set()
+    pool.shutdown()
+
+    assert user_data['email'] == 'new@mail.ru'
+    assert bus.metrics_snapshot()['query_executions_sticky'] == {'GetUserById': 1}
+
+    with pytest.raises(NotFoundUser):
+        await stale_flight
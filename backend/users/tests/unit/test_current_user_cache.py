@@ -0,0 +1,71 @@
+import asyncio
+
+from backend.core.adapters.local_cache import StaleWhileRevalidateCache
+from backend.users.adapters.token_cache import VerifiedTokenCache
+from backend.users.domain.queries import GetCurrentUser
+from backend.users.orm.models import Users
+from backend.users.service_layer.auth import create_access_token
+from backend.users.service_layer.handlers import get_current_user
+
+
+async def test_stale_value_is_returned_and_refreshed_in_background():
+    cache = StaleWhileRevalidateCache(max_size=10, ttl=0, stale_ttl=60)
+    cache.set(1, 'old')
+    refreshed = asyncio.Event()
+
+    async def load():
+        refreshed.set()
+        return 'new'
+
+    assert cache.get(1) == ('old', True)
+
+    cache.refresh(1, load)
+    cache.refresh(1, load)
+    await asyncio.wait_for(refreshed.wait(), timeout=1)
+    await asyncio.sleep(0)
+
+    assert cache.get(1) == ('new', True)
+    assert cache.refreshes == 1
+
+
+async def test_evict_cancels_running_refresh():
+    cache = StaleWhileRevalidateCache(max_size=10, ttl=0, stale_ttl=60)
+    cache.set(1, 'old')
+
+    async def load():
+        await asyncio.sleep(60)
+        return 'new'
+
+    cache.refresh(1, load)
+    await asyncio.sleep(0)
+    cache.evict(1)
+    await asyncio.sleep(0)
+
+    assert cache.get(1) is None
+
+
+async def test_current_user_is_served_from_cache(sqlite_uow, token_store):
+    async with sqlite_uow:
+        sqlite_uow.session.add(Users(tag='@me', email='me@mail.ru', password='hash', role_id=1))
+        await sqlite_uow.session.commit()
+
+    cache = StaleWhileRevalidateCache(max_size=10, ttl=60, stale_ttl=60)
+    query = GetCurrentUser(token=str(create_access_token({'sub': '1'})))
+
+    token_cache = VerifiedTokenCache(max_size=10)
+
+    first = await get_current_user(query, sqlite_uow, cache, token_cache, token_store)
+    sqlite_uow.session_factory = None
+    second = await get_current_user(query, sqlite_uow, cache, token_cache, token_store)
+
+    assert first == second
+    assert cache.hits == 1
+
+
+async def test_cache_is_bounded():
+    cache = StaleWhileRevalidateCache(max_size=1, ttl=60, stale_ttl=60)
+    cache.set(1, 'first')
+    cache.set(2, 'second')
+
+    assert cache.get(1) is None
+    assert cache.get(2) == ('second', False)
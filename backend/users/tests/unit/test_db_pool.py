@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from backend.core.adapters.db_pool import InstrumentedAsyncAdaptedQueuePool
+
+
+@pytest.fixture
+async def pooled_engine(tmp_path):
+    engine = create_async_engine(
+        f'sqlite+aiosqlite:///{tmp_path / "pool.db"}',
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+    yield engine
+    await engine.dispose()
+
+
+async def test_pool_metrics_track_checked_out_and_idle_connections(pooled_engine):
+    async with pooled_engine.connect() as connection:
+        await connection.execute(text('select 1'))
+        snapshot = pooled_engine.pool.metrics_snapshot()
+
+        assert snapshot['checked_out'] == 1
+        assert snapshot['idle'] == 0
+
+    snapshot = pooled_engine.pool.metrics_snapshot()
+
+    assert snapshot['checked_out'] == 0
+    assert snapshot['idle'] == 1
+    assert snapshot['waiting'] == 0
+    assert snapshot['acquire_wait_seconds']['count'] == 1
+
+
+async def test_pool_metrics_count_acquire_timeouts(pooled_engine):
+    async with pooled_engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            async with pooled_engine.connect():
+                pass
+
+    snapshot = pooled_engine.pool.metrics_snapshot()
+
+    assert snapshot['timeouts'] == 1
+    assert snapshot['acquire_wait_seconds']['count'] == 2
@@ -0,0 +1,23 @@
+from backend.users.domain.commands import DeleteUsersByEmails, DeleteUsersByIds
+from backend.users.service_layer.handlers import delete_users_by_emails, delete_users_by_ids
+from backend.users.tests.conftest import add_users
+
+
+async def test_delete_users_by_ids_in_chunks_reports_missing(sqlite_uow, monkeypatch):
+    monkeypatch.setattr('backend.users.service_layer.handlers.settings.USERS_BULK_DELETE_CHUNK_SIZE', 2)
+    await add_users(sqlite_uow, 5)
+
+    result = await delete_users_by_ids(DeleteUsersByIds(ids=[1, 2, 100, 4, 2, 101]), sqlite_uow)
+
+    assert result == {'deleted': [1, 2, 4], 'missing': [100, 101]}
+
+    async with sqlite_uow:
+        assert [user['id'] for user in await sqlite_uow.users_view.get_all()] == [3, 5]
+
+
+async def test_delete_users_by_emails_reports_missing(sqlite_uow):
+    await add_users(sqlite_uow, 3)
+
+    result = await delete_users_by_emails(DeleteUsersByEmails(emails=['0@mail.ru', 'nobody@mail.ru']), sqlite_uow)
+
+    assert result == {'deleted': ['0@mail.ru'], 'missing': ['nobody@mail.ru']}
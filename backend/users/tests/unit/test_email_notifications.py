@@ -0,0 +1,149 @@
+import asyncio
+import time
+
+from backend.core.adapters.smtp_pool import SMTPConnectionPool
+from backend.users.adapters.notifications import EmailNotifications
+
+
+class StandInSMTPServer:
+    """Локальный SMTP-сервер для тестов в духе aiosmtpd: принимает письма и складывает их в messages.
+
+    Первые fail_data писем отклоняются временной ошибкой 451, при close_after_message сервер
+    закрывает соединение после каждого письма, как при тайм-ауте простоя.
+    """
+
+    def __init__(self, fail_data: int = 0, close_after_message: bool = False):
+        self.fail_data = fail_data
+        self.close_after_message = close_after_message
+        self.messages: list[str] = []
+        self.connections = 0
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._serve, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+        return self
+
+    async def __aexit__(self, *args):
+        self.server.close()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        writer.write(b'220 localhost stand-in\r\n')
+
+        while line := await reader.readline():
+            command = line.decode().strip().upper()
+
+            if command.startswith('EHLO'):
+                writer.write(b'250-localhost\r\n250 8BITMIME\r\n')
+            elif command.startswith('DATA'):
+                writer.write(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+                data = (await reader.readuntil(b'\r\n.\r\n')).decode()
+
+                if self.fail_data:
+                    self.fail_data -= 1
+                    writer.write(b'451 Try again later\r\n')
+                else:
+                    self.messages.append(data)
+                    writer.write(b'250 OK\r\n')
+
+                    if self.close_after_message:
+                        await writer.drain()
+                        break
+            elif command.startswith('QUIT'):
+                writer.write(b'221 Bye\r\n')
+                await writer.drain()
+                break
+            else:
+                writer.write(b'250 OK\r\n')
+
+            await writer.drain()
+
+        writer.close()
+
+
+def make_notifications(
+    port: int,
+    pool_size: int = 2,
+    queue_size: int = 100,
+    max_idle: float = 30,
+    retry_backoff: float = 0.01,
+    drain_timeout: float = 10,
+):
+    return EmailNotifications(
+        pool=SMTPConnectionPool('127.0.0.1', port, size=pool_size, timeout=5, max_idle=max_idle),
+        sender='service@mail.ru',
+        queue_size=queue_size,
+        workers=4,
+        max_retries=2,
+        retry_backoff=retry_backoff,
+        drain_timeout=drain_timeout,
+    )
+
+
+async def test_messages_are_sent_over_pooled_connections():
+    async with StandInSMTPServer() as server:
+        notifications = make_notifications(server.port)
+
+        for number in range(20):
+            await notifications.send(f'{number}@mail.ru', 'Пользователь успешно создан')
+
+        await notifications.close()
+
+    assert len(server.messages) == 20
+    assert server.connections <= 2
+    assert notifications.metrics_snapshot()['sent'] == 20
+    assert notifications.metrics_snapshot()['latency_seconds']['count'] == 20
+
+
+async def test_temporary_failure_is_retried():
+    async with StandInSMTPServer(fail_data=1) as server:
+        notifications = make_notifications(server.port)
+
+        await notifications.send('new@mail.ru', 'Пользователь успешно создан')
+        await notifications.close()
+
+    assert len(server.messages) == 1
+    assert notifications.metrics_snapshot()['retried'] == 1
+    assert notifications.metrics_snapshot()['failed'] == 0
+
+
+async def test_connection_closed_by_server_is_replaced():
+    async with StandInSMTPServer(close_after_message=True) as server:
+        notifications = make_notifications(server.port, pool_size=1, max_idle=0)
+
+        for number in range(3):
+            await notifications.send(f'{number}@mail.ru', 'Пользователь успешно создан')
+            await notifications._queue.join()
+
+        await notifications.close()
+
+    assert len(server.messages) == 3
+    assert server.connections == 3
+    assert notifications.metrics_snapshot()['failed'] == 0
+
+
+async def test_message_is_dropped_when_queue_is_full():
+    notifications = make_notifications(port=1, queue_size=1)
+
+    await notifications.send('a@mail.ru', 'message')
+    await notifications.send('b@mail.ru', 'message')
+
+    assert notifications.metrics_snapshot()['queued'] == 1
+    assert notifications.metrics_snapshot()['dropped'] == 1
+
+    await notifications.close()
+
+
+async def test_close_gives_up_on_undelivered_messages_after_drain_timeout():
+    notifications = make_notifications(port=1, retry_backoff=60, drain_timeout=0.05)
+
+    for number in range(6):
+        await notifications.send(f'{number}@mail.ru', 'message')
+
+    started_at = time.monotonic()
+    await notifications.close()
+
+    assert time.monotonic() - started_at < 1
+    assert notifications.metrics_snapshot()['dropped'] == 6
+    assert notifications.metrics_snapshot()['queued'] == 0
@@ -0,0 +1,70 @@
+import pytest
+
+from backend.core.adapters.etag import etag_matches, make_etag
+from backend.users.domain.commands import DeleteUsersByIds, RegisterUser
+from backend.users.domain.queries import GetAllUsersIfChanged, GetUserByIdIfChanged
+from backend.users.exceptions import NotFoundUser
+from backend.users.service_layer.handlers import (
+    delete_users_by_ids,
+    get_all_users_if_changed,
+    get_user_by_id_if_changed,
+    register_user,
+)
+
+
+def test_if_none_match_uses_weak_comparison_and_lists():
+    etag = make_etag('user', 1, 2)
+
+    assert etag == '"user-1-2"'
+    assert etag_matches('"user-1-2"', etag)
+    assert etag_matches('W/"user-1-2"', etag)
+    assert etag_matches('"user-1-1", "user-1-2"', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('"user-1-1"', etag)
+    assert not etag_matches(None, etag)
+
+
+async def test_users_list_etag_changes_only_with_the_table(sqlite_uow, password_hasher):
+    await register_user(RegisterUser(tag='@first', email='first@mail.ru', password='pass'), sqlite_uow, password_hasher)
+
+    etag, users_data = await get_all_users_if_changed(GetAllUsersIfChanged(), sqlite_uow)
+
+    assert [user_data['email'] for user_data in users_data] == ['first@mail.ru']
+    assert await get_all_users_if_changed(GetAllUsersIfChanged(if_none_match=etag), sqlite_uow) == (etag, None)
+
+    cmd = RegisterUser(tag='@second', email='second@mail.ru', password='pass')
+    await register_user(cmd, sqlite_uow, password_hasher)
+    changed_etag, users_data = await get_all_users_if_changed(GetAllUsersIfChanged(if_none_match=etag), sqlite_uow)
+
+    assert changed_etag != etag
+    assert len(users_data) == 2
+
+    await delete_users_by_ids(DeleteUsersByIds(ids=[100]), sqlite_uow)
+
+    assert await get_all_users_if_changed(GetAllUsersIfChanged(if_none_match=changed_etag), sqlite_uow) == (
+        changed_etag,
+        None,
+    )
+
+
+async def test_user_etag_follows_row_version(sqlite_uow, password_hasher):
+    await register_user(RegisterUser(tag='@new', email='new@mail.ru', password='pass'), sqlite_uow, password_hasher)
+
+    etag, user_data = await get_user_by_id_if_changed(GetUserByIdIfChanged(id=1), sqlite_uow)
+
+    assert etag == '"user-1-1"'
+    assert user_data['email'] == 'new@mail.ru'
+    assert await get_user_by_id_if_changed(GetUserByIdIfChanged(id=1, if_none_match=etag), sqlite_uow) == (etag, None)
+
+    async with sqlite_uow:
+        user = await sqlite_uow.users.get_by_id(1)
+        await sqlite_uow.users.update_password(user, 'new-hash')
+        await sqlite_uow.commit()
+
+    etag, user_data = await get_user_by_id_if_changed(GetUserByIdIfChanged(id=1, if_none_match=etag), sqlite_uow)
+
+    assert etag == '"user-1-2"'
+    assert user_data is not None
+
+    with pytest.raises(NotFoundUser):
+        await get_user_by_id_if_changed(GetUserByIdIfChanged(id=2, if_none_match=etag), sqlite_uow)
@@ -0,0 +1,24 @@
+import json
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from backend.core.adapters.json_response import FastJSONResponse
+
+
+def test_fast_response_matches_jsonable_encoder_response():
+    content = {
+        'items': [{'id': 1, 'tag': '@юзер', 'email': 'user@mail.ru', 'role_id': 1, 'roles': None}],
+        'next_cursor': None,
+    }
+
+    assert FastJSONResponse(content=content).body == JSONResponse(content=jsonable_encoder(content)).body
+
+
+def test_fast_response_encodes_datetime_non_str_keys_and_unknown_types():
+    created_at = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+    body = json.loads(FastJSONResponse(content={1: created_at, 'value': frozenset([1])}).body)
+
+    assert body == {'1': '2026-01-02T03:04:05+00:00', 'value': 'frozenset({1})'}
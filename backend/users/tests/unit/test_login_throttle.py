@@ -0,0 +1,82 @@
+import pytest
+
+from backend.core.adapters.rate_limit import InMemoryRateLimiter, RateLimitExceeded, retry_after_seconds
+from backend.users.adapters.login_throttle import LoginThrottle
+from backend.users.domain.commands import AuthenticateUser
+from backend.users.service_layer.handlers import authenticate_user
+
+
+async def test_limiter_rejects_over_limit_without_counting_rejections():
+    limiter = InMemoryRateLimiter()
+
+    assert [await limiter.hit('key', limit=2, window=60) for _ in range(2)] == [None, None]
+
+    retry_after = await limiter.hit('key', limit=2, window=60)
+
+    assert 1 <= retry_after <= 60
+    assert await limiter.hit('other', limit=2, window=60) is None
+
+
+async def test_limiter_weights_previous_window(monkeypatch):
+    limiter = InMemoryRateLimiter()
+    monkeypatch.setattr('backend.core.adapters.rate_limit.time.time', lambda: 59.0)
+
+    for _ in range(4):
+        await limiter.hit('key', limit=4, window=60)
+
+    monkeypatch.setattr('backend.core.adapters.rate_limit.time.time', lambda: 90.0)
+
+    # Половина прошлого окна ещё учитывается: 4 * 0.5 + 2 = 4.
+    assert await limiter.hit('key', limit=4, window=60) is None
+    assert await limiter.hit('key', limit=4, window=60) is None
+    assert await limiter.hit('key', limit=4, window=60) is not None
+
+
+def test_retry_after_waits_until_previous_window_decays():
+    assert retry_after_seconds(limit=4, window=60, elapsed=30, current=2, previous=4) == 1
+    assert retry_after_seconds(limit=4, window=60, elapsed=10, current=4, previous=0) == 50
+
+
+async def test_login_is_rejected_before_database_and_hashing(sqlite_uow, password_hasher, token_store):
+    login_throttle = LoginThrottle(InMemoryRateLimiter(), per_email=2, per_ip=10, window=60)
+    cmd = AuthenticateUser(email='User@mail.ru', password='password')
+    cmd.client_ip = '10.0.0.1'
+    await login_throttle.check(email='user@mail.ru', ip='10.0.0.2')
+    await login_throttle.check(email='user@mail.ru', ip='10.0.0.3')
+    sqlite_uow.session_factory = None
+
+    with pytest.raises(RateLimitExceeded):
+        await authenticate_user(cmd, sqlite_uow, password_hasher, token_store, login_throttle)
+
+    assert login_throttle.metrics_snapshot()['rejected'] == {'ip': 0, 'email': 1}
+    assert password_hasher.metrics_snapshot()['completed'] == 0
+
+
+async def test_login_is_limited_per_ip():
+    login_throttle = LoginThrottle(InMemoryRateLimiter(), per_email=10, per_ip=2, window=60)
+
+    await login_throttle.check(email='first@mail.ru', ip='10.0.0.1')
+    await login_throttle.check(email='second@mail.ru', ip='10.0.0.1')
+
+    with pytest.raises(RateLimitExceeded):
+        await login_throttle.check(email='third@mail.ru', ip='10.0.0.1')
+
+    await login_throttle.check(email='third@mail.ru', ip='10.0.0.2')
+
+    assert login_throttle.metrics_snapshot()['rejected'] == {'ip': 1, 'email': 0}
+
+
+async def test_attempt_rejected_by_email_does_not_use_up_ip_limit():
+    login_throttle = LoginThrottle(InMemoryRateLimiter(), per_email=1, per_ip=2, window=60)
+
+    await login_throttle.check(email='first@mail.ru', ip='10.0.0.1')
+
+    with pytest.raises(RateLimitExceeded):
+        await login_throttle.check(email='first@mail.ru', ip='10.0.0.1')
+
+    await login_throttle.check(email='second@mail.ru', ip='10.0.0.1')
+
+    with pytest.raises(RateLimitExceeded):
+        await login_throttle.check(email='third@mail.ru', ip='10.0.0.1')
+
+    assert login_throttle.metrics_snapshot()['rejected'] == {'ip': 1, 'email': 1}
@@ -0,0 +1,304 @@
+import asyncio
+import time
+
+from backend.core.service_layer.messagebus import MessageBus
+from backend.core.service_layer.middleware import (
+    InFlightMiddleware,
+    Middleware,
+    SampledMiddleware,
+    SlowMessageMiddleware,
+    TimingMiddleware,
+)
+from backend.users.domain.commands import DeleteUserById
+from backend.users.domain.events import CreatedUser, DeletedUser
+from backend.users.domain.queries import GetUserById
+
+
+class FakeUnitOfWork:
+    def __init__(self, events=()):
+        self.events = list(events)
+
+    def collect_new_events(self):
+        while self.events:
+            yield self.events.pop(0)
+
+
+def make_bus(event_handlers, uow_factory=FakeUnitOfWork, command_handlers=None, query_handlers=None, **options):
+    return MessageBus(
+        uow_factory=uow_factory,
+        event_handlers=event_handlers,
+        command_handlers=command_handlers or {},
+        query_handlers=query_handlers or {},
+        **options,
+    )
+
+
+async def test_event_handlers_run_concurrently():
+    async def slow(event, uow):
+        await asyncio.sleep(0.2)
+
+    bus = make_bus({CreatedUser: [slow, slow, slow]})
+    started_at = time.perf_counter()
+
+    await bus.handle(CreatedUser(email='user@mail.ru'))
+
+    assert time.perf_counter() - started_at < 0.4
+
+
+async def test_handlers_are_looked_up_by_event_type():
+    handled = []
+
+    async def on_created(event, uow):
+        handled.append('created')
+
+    async def on_deleted(event, uow):
+        handled.append('deleted')
+
+    bus = make_bus({CreatedUser: [on_created], DeletedUser: [on_deleted]})
+
+    await bus.handle(CreatedUser(email='user@mail.ru'))
+
+    assert handled == ['created']
+
+
+async def test_worker_event_handlers_run_only_for_published_events():
+    handled = []
+
+    async def on_created(event, uow):
+        handled.append('created')
+
+    async def on_published(event, uow):
+        handled.append('published')
+
+    bus = make_bus({CreatedUser: [on_created]}, worker_event_handlers={CreatedUser: [on_published]})
+
+    await bus.handle(CreatedUser(email='user@mail.ru'))
+    await bus.handle_worker_event(CreatedUser(email='user@mail.ru'))
+    await bus.handle_worker_event(DeletedUser(id=1, email='user@mail.ru', tag='@user'))
+
+    assert handled == ['created', 'published']
+
+
+async def test_slow_and_failing_handlers_do_not_affect_others():
+    handled = []
+
+    async def hanging(event, uow):
+        await asyncio.sleep(60)
+
+    async def failing(event, uow):
+        raise RuntimeError
+
+    async def working(event, uow):
+        handled.append(event.id)
+
+    bus = make_bus({DeletedUser: [hanging, failing, working]}, handler_timeout=0.05)
+
+    await bus.handle(DeletedUser(id=1, email='user@mail.ru', tag='@user'))
+
+    assert handled == [1]
+    assert bus.metrics_snapshot()['event_handler_failures'] == 1
+    assert bus.metrics_snapshot()['event_handler_timeouts'] == 1
+
+
+async def test_events_from_command_are_fanned_out_under_concurrency_cap():
+    running, peak = 0, 0
+
+    async def tracked(event, uow):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    async def delete_users(command, uow):
+        return 'deleted'
+
+    events = [DeletedUser(id=number, email=f'{number}@mail.ru', tag=f'@{number}') for number in range(10)]
+    uows = iter([FakeUnitOfWork(events)])
+    bus = make_bus(
+        {DeletedUser: [tracked]},
+        uow_factory=lambda: next(uows, None) or FakeUnitOfWork(),
+        command_handlers={DeleteUserById: delete_users},
+        max_concurrent_handlers=3,
+    )
+
+    assert await bus.handle(DeleteUserById(id=1)) == 'deleted'
+    assert peak == 3
+
+
+class RecordingMiddleware(Middleware):
+    def __init__(self, label, calls):
+        self.label = label
+        self.calls = calls
+
+    async def __call__(self, name, message, call_next):
+        self.calls.append((self.label, name))
+
+        return await call_next()
+
+
+async def test_middlewares_wrap_commands_and_each_event_handler_in_order():
+    calls = []
+
+    async def delete_user(cmd, uow):
+        return 'deleted'
+
+    async def on_deleted(event, uow):
+        calls.append(('handler', 'on_deleted'))
+
+    uows = iter([FakeUnitOfWork([DeletedUser(id=1, email='user@mail.ru', tag='@user')])])
+    bus = make_bus(
+        {DeletedUser: [on_deleted]},
+        uow_factory=lambda: next(uows, None) or FakeUnitOfWork(),
+        command_handlers={DeleteUserById: delete_user},
+        middlewares=[RecordingMiddleware('outer', calls), RecordingMiddleware('inner', calls)],
+    )
+
+    assert await bus.handle(DeleteUserById(id=1)) == 'deleted'
+    assert calls == [
+        ('outer', 'DeleteUserById'),
+        ('inner', 'DeleteUserById'),
+        ('outer', 'DeletedUser:on_deleted'),
+        ('inner', 'DeletedUser:on_deleted'),
+        ('handler', 'on_deleted'),
+    ]
+
+
+async def test_timing_and_in_flight_are_tracked_per_message_type():
+    timing, in_flight = TimingMiddleware(), InFlightMiddleware()
+    release = asyncio.Event()
+
+    async def delete_user(cmd, uow):
+        await release.wait()
+
+        if cmd.id == 2:
+            raise RuntimeError
+
+    bus = make_bus({}, command_handlers={DeleteUserById: delete_user}, middlewares=[in_flight, timing])
+    tasks = [asyncio.create_task(bus.handle(DeleteUserById(id=number))) for number in (1, 2)]
+    await asyncio.sleep(0)
+
+    assert in_flight.metrics_snapshot() == {'total': 2, 'peak': 2, 'by_name': {'DeleteUserById': 2}}
+
+    release.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert in_flight.metrics_snapshot()['total'] == 0
+    assert timing.metrics_snapshot()['DeleteUserById']['count'] == 2
+    assert timing.metrics_snapshot()['DeleteUserById']['errors'] == 1
+
+
+async def test_slow_messages_use_per_type_thresholds(caplog):
+    slow = SlowMessageMiddleware(default_threshold=60, thresholds={'DeletedUser:sleepy': 0.01})
+
+    async def sleepy(event, uow):
+        await asyncio.sleep(0.02)
+
+    async def quick(event, uow):
+        pass
+
+    bus = make_bus({DeletedUser: [sleepy, quick]}, middlewares=[slow])
+
+    await bus.handle(DeletedUser(id=1, email='user@mail.ru', tag='@user'))
+
+    assert slow.metrics_snapshot() == {'slow': 1}
+    assert 'DeletedUser:sleepy' in caplog.text
+
+
+async def test_sampled_middleware_skips_unsampled_messages():
+    timing = TimingMiddleware()
+    samples = iter([0.05, 0.5, 0.05])
+
+    async def delete_user(cmd, uow):
+        pass
+
+    bus = make_bus(
+        {},
+        command_handlers={DeleteUserById: delete_user},
+        middlewares=[SampledMiddleware(timing, rate=0.1, sample=lambda: next(samples))],
+    )
+
+    for number in range(3):
+        await bus.handle(DeleteUserById(id=number))
+
+    assert timing.metrics_snapshot()['DeleteUserById']['count'] == 2
+
+
+def make_query_bus(executions, coalesced_queries=(GetUserById,), release=None):
+    async def get_user_by_id(query, uow):
+        executions.append(query.id)
+        await (release.wait() if release else asyncio.sleep(0.01))
+
+        if query.id < 0:
+            raise ValueError
+
+        return {'id': query.id}
+
+    return make_bus(
+        {},
+        query_handlers={GetUserById: get_user_by_id},
+        coalesced_queries=coalesced_queries,
+    )
+
+
+async def test_identical_concurrent_queries_are_executed_once():
+    executions = []
+    bus = make_query_bus(executions)
+
+    results = await asyncio.gather(*(bus.handle(GetUserById(id=number % 2)) for number in range(50)))
+
+    assert sorted(executions) == [0, 1]
+    assert results == [{'id': number % 2} for number in range(50)]
+    assert bus.metrics_snapshot()['query_executions'] == {'GetUserById': 2}
+    assert bus.metrics_snapshot()['query_executions_saved'] == {'GetUserById': 48}
+
+    await bus.handle(GetUserById(id=0))
+
+    assert len(executions) == 3
+
+
+async def test_queries_are_coalesced_only_for_opted_in_types():
+    executions = []
+    bus = make_query_bus(executions, coalesced_queries=())
+
+    await asyncio.gather(*(bus.handle(GetUserById(id=1)) for _ in range(5)))
+
+    assert executions == [1] * 5
+
+
+async def test_error_is_shared_by_all_waiters():
+    bus = make_query_bus([])
+
+    results = await asyncio.gather(*(bus.handle(GetUserById(id=-1)) for _ in range(3)), return_exceptions=True)
+
+    assert [type(result) for result in results] == [ValueError] * 3
+
+
+async def test_cancelled_waiter_does_not_cancel_shared_execution():
+    release, executions = asyncio.Event(), []
+    bus = make_query_bus(executions, release=release)
+    first = asyncio.create_task(bus.handle(GetUserById(id=1)))
+    second = asyncio.create_task(bus.handle(GetUserById(id=1)))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    release.set()
+
+    assert await second == {'id': 1}
+    assert first.cancelled()
+    assert executions == [1]
+
+
+async def test_execution_is_cancelled_with_its_last_waiter():
+    release = asyncio.Event()
+    bus = make_query_bus([], release=release)
+    waiter = asyncio.create_task(bus.handle(GetUserById(id=1)))
+    await asyncio.sleep(0)
+    (flight,) = bus._query_flights.values()
+
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert flight.task.cancelled()
+    assert bus._query_flights == {}
@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import select
+
+from backend.core.orm.models import OutboxMessages
+from backend.core.service_layer.outbox import OutboxRelay
+from backend.core.service_layer.unit_of_work import make_session_factory
+from backend.users.domain.commands import DeleteUsersByIds, RegisterUser
+from backend.users.exceptions import UserHasAlreadyBeenCreated
+from backend.users.orm.models import Users
+from backend.users.service_layer.handlers import delete_users_by_ids, register_user
+
+
+async def get_outbox(sqlite_engine) -> list[tuple[str, dict]]:
+    async with make_session_factory(sqlite_engine)() as session:
+        messages = (await session.execute(select(OutboxMessages).order_by(OutboxMessages.id))).scalars().all()
+
+    return [(message.channel, message.payload) for message in messages]
+
+
+async def test_events_are_written_to_outbox_with_the_change(sqlite_engine, sqlite_uow, password_hasher):
+    await register_user(RegisterUser(tag='@new', email='new@mail.ru', password='pass'), sqlite_uow, password_hasher)
+    await delete_users_by_ids(DeleteUsersByIds(ids=[1]), sqlite_uow)
+
+    assert await get_outbox(sqlite_engine) == [
+        ('CreatedUser', {'email': 'new@mail.ru', 'id': 1, 'tag': '@new'}),
+        ('DeletedUser', {'id': 1, 'email': 'new@mail.ru', 'tag': '@new'}),
+    ]
+    assert [type(event).__name__ for event in sqlite_uow.collect_new_events()] == ['DeletedUser']
+
+
+def test_unit_of_work_that_was_not_entered_has_no_events(sqlite_uow):
+    assert list(sqlite_uow.collect_new_events()) == []
+
+
+async def test_rolled_back_change_leaves_no_outbox_messages(sqlite_engine, sqlite_uow):
+    async with sqlite_uow:
+        await sqlite_uow.users.add(Users(tag='@new', email='new@mail.ru', password='hash', role_id=1))
+
+    async with sqlite_uow:
+        assert await sqlite_uow.users.get_by_email('new@mail.ru') is None
+
+    assert await get_outbox(sqlite_engine) == []
+
+
+async def test_failed_registration_leaves_no_outbox_messages(sqlite_engine, sqlite_uow, password_hasher):
+    cmd = RegisterUser(tag='@new', email='new@mail.ru', password='pass')
+    await register_user(cmd, sqlite_uow, password_hasher)
+
+    with pytest.raises(UserHasAlreadyBeenCreated):
+        await register_user(RegisterUser(tag='@new', email='new@mail.ru', password='pass'), sqlite_uow, password_hasher)
+
+    assert len(await get_outbox(sqlite_engine)) == 1
+
+
+async def test_relay_publishes_outbox_in_order_and_removes_it(sqlite_engine, sqlite_uow):
+    async with sqlite_uow:
+        for number in range(5):
+            await sqlite_uow.users.add(Users(tag=f'@{number}', email=f'{number}@mail.ru', password='hash', role_id=1))
+
+        await sqlite_uow.commit()
+
+    published = []
+    relay = OutboxRelay(
+        session_factory=make_session_factory(sqlite_engine),
+        publish=lambda channel, payload: published.append((channel, payload['email'])),
+        batch_size=2,
+        poll_interval=0,
+    )
+
+    assert [await relay.relay_once() for _ in range(4)] == [2, 2, 1, 0]
+    assert published == [('CreatedUser', f'{number}@mail.ru') for number in range(5)]
+    assert await get_outbox(sqlite_engine) == []
+    assert relay.metrics_snapshot()['published'] == 5
+    assert relay.metrics_snapshot()['dispatch_lag_seconds']['count'] == 5
+
+
+async def test_relay_keeps_messages_when_publish_fails(sqlite_engine, sqlite_uow):
+    async with sqlite_uow:
+        await sqlite_uow.users.add(Users(tag='@new', email='new@mail.ru', password='hash', role_id=1))
+        await sqlite_uow.commit()
+
+    async def publish(channel, payload):
+        raise ConnectionError
+
+    relay = OutboxRelay(make_session_factory(sqlite_engine), publish, batch_size=10, poll_interval=0)
+
+    with pytest.raises(ConnectionError):
+        await relay.relay_once()
+
+    assert len(await get_outbox(sqlite_engine)) == 1
+    assert relay.published == 0
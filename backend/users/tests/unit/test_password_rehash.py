@@ -0,0 +1,105 @@
+import pytest
+from passlib.context import CryptContext
+
+from backend.core.service_layer.unit_of_work import SqlAlchemyUnitOfWork
+from backend.users.domain.commands import AuthenticateUser
+from backend.users.exceptions import IncorrectInfoForAuthenticateUser
+from backend.users.orm.models import Users
+from backend.users.service_layer.handlers import authenticate_user
+
+OLD_CONTEXT = CryptContext(schemes=['bcrypt'], bcrypt__rounds=4)
+NEW_CONTEXT = CryptContext(
+    schemes=['argon2', 'bcrypt'],
+    deprecated='auto',
+    argon2__type='ID',
+    argon2__time_cost=1,
+    argon2__memory_cost=1024,
+    argon2__parallelism=1,
+)
+
+
+async def add_user(uow, password_hash):
+    async with uow:
+        uow.session.add(Users(tag='@user', email='user@mail.ru', password=password_hash, role_id=1))
+        await uow.session.commit()
+
+
+@pytest.fixture
+def login(sqlite_uow, password_hasher, token_store, login_throttle):
+    async def login(password):
+        cmd = AuthenticateUser(email='user@mail.ru', password=password)
+
+        return await authenticate_user(cmd, sqlite_uow, password_hasher, token_store, login_throttle)
+
+    return login
+
+
+async def stored_hash(uow):
+    async with uow:
+        return (await uow.users.get_by_email('user@mail.ru')).password
+
+
+async def test_outdated_hash_is_replaced_on_login(sqlite_uow, login, monkeypatch):
+    pytest.importorskip('argon2')
+    monkeypatch.setattr('backend.users.service_layer.auth.pwd_context', NEW_CONTEXT)
+    await add_user(sqlite_uow, OLD_CONTEXT.hash('password'))
+
+    await login('password')
+    password_hash = await stored_hash(sqlite_uow)
+
+    assert password_hash.startswith('$argon2id$')
+    assert NEW_CONTEXT.verify('password', password_hash)
+
+
+async def test_current_hash_is_kept_and_wrong_password_is_rejected(sqlite_uow, login, monkeypatch):
+    monkeypatch.setattr('backend.users.service_layer.auth.pwd_context', OLD_CONTEXT)
+    password_hash = OLD_CONTEXT.hash('password')
+    await add_user(sqlite_uow, password_hash)
+
+    await login('password')
+
+    with pytest.raises(IncorrectInfoForAuthenticateUser):
+        await login('wrong')
+
+    assert await stored_hash(sqlite_uow) == password_hash
+
+
+async def test_password_is_verified_outside_of_transaction(sqlite_uow, password_hasher, login, monkeypatch):
+    monkeypatch.setattr('backend.users.service_layer.auth.pwd_context', OLD_CONTEXT)
+    await add_user(sqlite_uow, OLD_CONTEXT.hash('password'))
+    verify_and_update = password_hasher.verify_and_update
+    in_transaction = []
+
+    async def recording_verify_and_update(*args):
+        in_transaction.append(sqlite_uow.session.in_transaction())
+
+        return await verify_and_update(*args)
+
+    monkeypatch.setattr(password_hasher, 'verify_and_update', recording_verify_and_update)
+
+    await login('password')
+
+    assert in_transaction == [False]
+
+
+async def test_rehash_keeps_password_changed_during_verification(sqlite_uow, password_hasher, login, monkeypatch):
+    pytest.importorskip('argon2')
+    monkeypatch.setattr('backend.users.service_layer.auth.pwd_context', NEW_CONTEXT)
+    await add_user(sqlite_uow, OLD_CONTEXT.hash('password'))
+    verify_and_update = password_hasher.verify_and_update
+    changed_hash = OLD_CONTEXT.hash('changed')
+
+    async def verify_and_update_while_password_changes(*args):
+        other_uow = SqlAlchemyUnitOfWork(session_factory=sqlite_uow.session_factory, replica_router=None)
+
+        async with other_uow:
+            await other_uow.users.update_password(await other_uow.users.get_by_email('user@mail.ru'), changed_hash)
+            await other_uow.commit()
+
+        return await verify_and_update(*args)
+
+    monkeypatch.setattr(password_hasher, 'verify_and_update', verify_and_update_while_password_changes)
+
+    await login('password')
+
+    assert await stored_hash(sqlite_uow) == changed_hash
@@ -0,0 +1,38 @@
+from backend.users.tests.conftest import add_users
+
+
+async def test_read_repository_returns_plain_dicts_without_password(sqlite_uow):
+    await add_users(sqlite_uow, 3, roles=2)
+
+    async with sqlite_uow:
+        users_data = await sqlite_uow.users_view.get_all()
+
+    assert users_data == [
+        {'id': number + 1, 'tag': f'@{number}', 'email': f'{number}@mail.ru', 'role_id': number % 2 + 1}
+        for number in range(3)
+    ]
+
+
+async def test_read_repository_lookups(sqlite_uow):
+    await add_users(sqlite_uow, 3, roles=2)
+
+    async with sqlite_uow:
+        by_id = await sqlite_uow.users_view.get_by_id(2)
+        by_email = await sqlite_uow.users_view.get_by_email('1@mail.ru')
+        by_tag = await sqlite_uow.users_view.get_by_tag('@1')
+        by_filter = await sqlite_uow.users_view.get_by_filter({'role_id': 2})
+        missing = await sqlite_uow.users_view.get_by_id(100)
+
+    assert by_id == by_email == by_tag
+    assert [user['tag'] for user in by_filter] == ['@1']
+    assert missing is None
+    assert 'password' not in by_id
+
+
+async def test_read_repository_does_not_load_orm_entities(sqlite_uow):
+    await add_users(sqlite_uow, 3, roles=2)
+
+    async with sqlite_uow:
+        await sqlite_uow.users_view.get_all()
+
+        assert len(sqlite_uow.session.identity_map) == 0
@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+from backend.core.adapters.redis_eventpublisher import RedisEventPublisher
+from backend.users.domain.events import CreatedUser
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def publish(self, channel, message):
+        self.commands.append((channel, message))
+
+    async def execute(self):
+        if self.redis.fail:
+            raise ConnectionError
+
+        self.redis.batches.append(self.commands)
+
+
+class FakeRedis:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+
+    def pipeline(self, transaction):
+        assert transaction is False
+
+        return FakePipeline(self)
+
+
+async def test_events_are_flushed_in_one_pipeline_by_size():
+    redis = FakeRedis()
+    publisher = RedisEventPublisher(redis, max_batch_size=3, flush_interval=60)
+
+    await asyncio.gather(*(
+        publisher.publish('CreatedUser', CreatedUser(email=f'{number}@mail.ru', id=number, tag=f'@{number}'))
+        for number in range(3)
+    ))
+
+    assert len(redis.batches) == 1
+    assert [channel for channel, _ in redis.batches[0]] == ['CreatedUser'] * 3
+    assert json.loads(redis.batches[0][0][1]) == {'email': '0@mail.ru', 'id': 0, 'tag': '@0'}
+    assert publisher.metrics_snapshot()['published'] == 3
+
+
+async def test_partial_batch_is_flushed_by_time():
+    redis = FakeRedis()
+    publisher = RedisEventPublisher(redis, max_batch_size=100, flush_interval=0.01)
+
+    await asyncio.gather(publisher.publish('a', {'n': 1}), publisher.publish('b', {'n': 2}))
+
+    assert redis.batches == [[('a', '{"n": 1}'), ('b', '{"n": 2}')]]
+
+
+async def test_publish_fails_when_pipeline_fails():
+    publisher = RedisEventPublisher(FakeRedis(fail=True), max_batch_size=2, flush_interval=60)
+
+    results = await asyncio.gather(
+        publisher.publish('a', {}),
+        publisher.publish('a', {}),
+        return_exceptions=True,
+    )
+
+    assert [type(result) for result in results] == [ConnectionError, ConnectionError]
+    assert publisher.metrics_snapshot()['failures'] == 1
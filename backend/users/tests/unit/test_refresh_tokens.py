@@ -0,0 +1,52 @@
+import pytest
+
+from backend.core.adapters.local_cache import StaleWhileRevalidateCache
+from backend.users.adapters.token_cache import VerifiedTokenCache
+from backend.users.domain.commands import AuthenticateUser, RefreshTokens, RevokeTokens
+from backend.users.domain.queries import GetCurrentUser
+from backend.users.exceptions import RefreshTokenIsInvalid, TokenRevoked
+from backend.users.orm.models import Users
+from backend.users.service_layer.auth import get_password_hash
+from backend.users.service_layer.handlers import authenticate_user, get_current_user, refresh_tokens, revoke_tokens
+
+
+@pytest.fixture
+async def tokens(sqlite_uow, password_hasher, token_store, login_throttle):
+    async with sqlite_uow:
+        sqlite_uow.session.add(Users(tag='@me', email='me@mail.ru', password=get_password_hash('password'), role_id=1))
+        await sqlite_uow.session.commit()
+
+    cmd = AuthenticateUser(email='me@mail.ru', password='password')
+
+    return await authenticate_user(cmd, sqlite_uow, password_hasher, token_store, login_throttle)
+
+
+async def get_me(uow, token_store, access_token):
+    current_user_cache = StaleWhileRevalidateCache(max_size=10, ttl=60, stale_ttl=60)
+    query = GetCurrentUser(token=access_token)
+
+    return await get_current_user(query, uow, current_user_cache, VerifiedTokenCache(max_size=10), token_store)
+
+
+async def test_refresh_token_is_rotated(sqlite_uow, token_store, tokens):
+    refreshed = await refresh_tokens(RefreshTokens(tokens['refresh_token']), sqlite_uow, token_store)
+
+    assert refreshed['refresh_token'] != tokens['refresh_token']
+    assert (await get_me(sqlite_uow, token_store, refreshed['access_token']))['email'] == 'me@mail.ru'
+
+    with pytest.raises(RefreshTokenIsInvalid):
+        await refresh_tokens(RefreshTokens(tokens['refresh_token']), sqlite_uow, token_store)
+
+
+async def test_logout_revokes_access_and_refresh_tokens(sqlite_uow, token_store, tokens):
+    await revoke_tokens(RevokeTokens(**tokens), token_store)
+
+    with pytest.raises(TokenRevoked):
+        await get_me(sqlite_uow, token_store, tokens['access_token'])
+
+    with pytest.raises(RefreshTokenIsInvalid):
+        await refresh_tokens(RefreshTokens(tokens['refresh_token']), sqlite_uow, token_store)
+
+
+async def test_logout_ignores_invalid_access_token(token_store):
+    await revoke_tokens(RevokeTokens(access_token='garbage', refresh_token='unknown'), token_store)
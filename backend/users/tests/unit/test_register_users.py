@@ -0,0 +1,74 @@
+import pytest
+
+from backend.core.service_layer.unit_of_work import SqlAlchemyUnitOfWork
+from backend.users.domain.commands import RegisterUser, RegisterUsers
+from backend.users.exceptions import BadRequest
+from backend.users.orm.models import Users
+from backend.users.service_layer.auth import verify_password
+from backend.users.service_layer.handlers import register_users
+
+
+async def test_register_users_reports_result_per_user(sqlite_uow, password_hasher):
+    async with sqlite_uow:
+        sqlite_uow.session.add(Users(tag='@taken', email='taken@mail.ru', password='hash', role_id=1))
+        await sqlite_uow.session.commit()
+
+    cmd = RegisterUsers(users=[
+        RegisterUser(tag='@first', email='first@mail.ru', password='first'),
+        RegisterUser(tag='@second', email='taken@mail.ru', password='second'),
+        RegisterUser(tag='@taken', email='third@mail.ru', password='third'),
+        RegisterUser(tag='@first', email='fourth@mail.ru', password='fourth'),
+        RegisterUser(tag='@fifth', email='fifth@mail.ru', password='fifth'),
+    ])
+
+    results = await register_users(cmd, sqlite_uow, password_hasher)
+
+    assert [result['status'] for result in results] == [
+        'created', 'duplicate_email', 'duplicate_tag', 'duplicate_tag', 'created',
+    ]
+
+    async with sqlite_uow:
+        created = await sqlite_uow.users.get_by_email('fifth@mail.ru')
+
+        assert results[4]['id'] == created.id
+        assert verify_password('fifth', created.password)
+
+
+async def test_register_users_rejects_too_large_batch(sqlite_uow, password_hasher, monkeypatch):
+    monkeypatch.setattr('backend.users.service_layer.handlers.settings.USERS_REGISTER_BATCH_MAX_SIZE', 1)
+    cmd = RegisterUsers(users=[
+        RegisterUser(tag='@first', email='first@mail.ru', password='first'),
+        RegisterUser(tag='@second', email='second@mail.ru', password='second'),
+    ])
+
+    with pytest.raises(BadRequest):
+        await register_users(cmd, sqlite_uow, password_hasher)
+
+
+async def test_register_users_hashes_outside_of_transaction(sqlite_uow, password_hasher, monkeypatch):
+    hash_password = password_hasher.hash
+    in_transaction = []
+
+    async def hash_while_email_is_taken(password):
+        in_transaction.append(sqlite_uow.session.in_transaction())
+
+        if password == 'first':
+            other_uow = SqlAlchemyUnitOfWork(session_factory=sqlite_uow.session_factory, replica_router=None)
+
+            async with other_uow:
+                other_uow.session.add(Users(tag='@other', email='first@mail.ru', password='hash', role_id=1))
+                await other_uow.session.commit()
+
+        return await hash_password(password)
+
+    monkeypatch.setattr(password_hasher, 'hash', hash_while_email_is_taken)
+    cmd = RegisterUsers(users=[
+        RegisterUser(tag='@first', email='first@mail.ru', password='first'),
+        RegisterUser(tag='@second', email='second@mail.ru', password='second'),
+    ])
+
+    results = await register_users(cmd, sqlite_uow, password_hasher)
+
+    assert in_transaction == [False, False]
+    assert [result['status'] for result in results] == ['duplicate_email', 'created']
+    assert 'id' in results[1] and 'id' not in results[0]
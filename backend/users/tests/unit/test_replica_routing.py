@@ -0,0 +1,108 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from backend.core.service_layer.routing import LEAST_LOADED, Replica, ReplicaRouter, caller_scope, read_only_scope
+from backend.core.service_layer.unit_of_work import SqlAlchemyUnitOfWork, make_session_factory
+
+
+@pytest.fixture
+async def engines(tmp_path):
+    engines = {
+        name: create_async_engine(f'sqlite+aiosqlite:///{tmp_path / name}.db')
+        for name in ('primary', 'replica_0', 'replica_1')
+    }
+    yield engines
+
+    for engine in engines.values():
+        await engine.dispose()
+
+
+def make_router(engines, lags=None, **kwargs):
+    lags = lags or {}
+
+    async def lag_probe(engine):
+        return lags.get(engine.url.database.rsplit('/', 1)[-1].removesuffix('.db'), 0.0)
+
+    replicas = [
+        Replica(name, engines[name], make_session_factory(engines[name]))
+        for name in ('replica_0', 'replica_1')
+    ]
+
+    return ReplicaRouter(replicas=replicas, lag_probe=lag_probe, **kwargs)
+
+
+async def open_session_database(engines, router) -> str:
+    uow = SqlAlchemyUnitOfWork(session_factory=make_session_factory(engines['primary']), replica_router=router)
+
+    async with uow:
+        return uow.session.bind.url.database.rsplit('/', 1)[-1].removesuffix('.db')
+
+
+async def test_queries_are_routed_to_replicas_in_round_robin(engines):
+    router = make_router(engines, read_your_writes_window=0)
+
+    with read_only_scope():
+        databases = [await open_session_database(engines, router) for _ in range(4)]
+
+    assert databases == ['replica_0', 'replica_1', 'replica_0', 'replica_1']
+
+
+async def commit_write(engines, router):
+    uow = SqlAlchemyUnitOfWork(session_factory=make_session_factory(engines['primary']), replica_router=router)
+
+    async with uow:
+        await uow.commit()
+
+
+async def test_committed_write_makes_reads_of_the_same_client_sticky(engines):
+    router = make_router(engines, read_your_writes_window=60)
+
+    with caller_scope('writer'):
+        assert await open_session_database(engines, router) == 'primary'
+
+        with read_only_scope():
+            assert await open_session_database(engines, router) == 'replica_0'
+
+        await commit_write(engines, router)
+
+        with read_only_scope():
+            assert await open_session_database(engines, router) == 'primary'
+
+    with caller_scope('reader'), read_only_scope():
+        assert await open_session_database(engines, router) == 'replica_1'
+
+    await commit_write(engines, router)
+
+    with read_only_scope():
+        assert await open_session_database(engines, router) == 'replica_0'
+
+    assert router.sticky_reads == 1
+
+
+async def test_lagging_replicas_are_skipped(engines):
+    router = make_router(engines, lags={'replica_0': 30.0}, max_lag=5.0)
+
+    with read_only_scope():
+        databases = {await open_session_database(engines, router) for _ in range(3)}
+
+    assert databases == {'replica_1'}
+
+
+async def test_reads_fall_back_to_primary_when_all_replicas_lag(engines):
+    router = make_router(engines, lags={'replica_0': 30.0, 'replica_1': 30.0}, max_lag=5.0)
+
+    with read_only_scope():
+        assert await open_session_database(engines, router) == 'primary'
+
+    assert router.fallbacks == 1
+
+
+async def test_least_loaded_strategy_picks_replica_with_fewer_open_sessions(engines):
+    router = make_router(engines, strategy=LEAST_LOADED)
+    busy_uow = SqlAlchemyUnitOfWork(session_factory=make_session_factory(engines['primary']), replica_router=router)
+
+    with read_only_scope():
+        async with busy_uow:
+            assert await open_session_database(engines, router) == 'replica_1'
+
+        assert await open_session_database(engines, router) == 'replica_0'
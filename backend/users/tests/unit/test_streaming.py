@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from backend.core.adapters.streaming import json_array_stream, ndjson_stream
+from backend.users.domain.queries import StreamAllUsers
+from backend.users.orm.models import Users
+from backend.users.service_layer.handlers import stream_all_users
+
+
+async def rows(count):
+    for number in range(count):
+        yield {'id': number, 'tag': f'@{number}'}
+
+
+async def collect(chunks) -> str:
+    return ''.join([chunk async for chunk in chunks])
+
+
+@pytest.mark.parametrize('count', [0, 1, 5, 10])
+async def test_json_array_stream_produces_valid_json(count):
+    body = await collect(json_array_stream(rows(count), chunk_size=3))
+
+    assert json.loads(body) == [row async for row in rows(count)]
+
+
+async def test_ndjson_stream_produces_one_object_per_line():
+    body = await collect(ndjson_stream(rows(5), chunk_size=2))
+
+    assert [json.loads(line) for line in body.splitlines()] == [row async for row in rows(5)]
+
+
+async def test_stream_all_users_reads_every_user_in_id_order(sqlite_uow):
+    async with sqlite_uow:
+        for number in range(25):
+            sqlite_uow.session.add(Users(tag=f'@{number}', email=f'{number}@mail.ru', password='hash', role_id=1))
+
+        await sqlite_uow.session.commit()
+
+    users_data = await stream_all_users(StreamAllUsers(), sqlite_uow)
+
+    assert [user['tag'] async for user in users_data] == [f'@{number}' for number in range(25)]
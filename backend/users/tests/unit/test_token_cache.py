@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from backend.core.adapters.local_cache import StaleWhileRevalidateCache
+from backend.users.adapters.token_cache import VerifiedTokenCache
+from backend.users.domain.queries import GetCurrentUser
+from backend.users.exceptions import NotFoundUser, TokenIsInvalid
+from backend.users.orm.models import Users
+from backend.users.service_layer.auth import create_access_token, create_user_access_token
+from backend.users.service_layer.handlers import get_current_user
+
+USER_DATA = {'id': 1, 'tag': '@me', 'email': 'me@mail.ru', 'role_id': 1}
+
+
+@pytest.fixture
+async def user(sqlite_uow):
+    async with sqlite_uow:
+        sqlite_uow.session.add(Users(tag='@me', email='me@mail.ru', password='hash', role_id=1))
+        await sqlite_uow.session.commit()
+
+
+def current_user_cache():
+    return StaleWhileRevalidateCache(max_size=10, ttl=60, stale_ttl=60)
+
+
+def test_token_cache_drops_expired_and_evicted_users():
+    cache = VerifiedTokenCache(max_size=10)
+    cache.set('expired', {'sub': '1', 'exp': time.time() - 1})
+    cache.set('first', {'sub': '1', 'exp': time.time() + 60})
+    cache.set('second', {'sub': '2', 'exp': time.time() + 60})
+
+    assert cache.get('expired') is None
+
+    cache.evict_user(1)
+
+    assert cache.get('first') is None
+    assert cache.get('second') is not None
+
+
+def test_token_cache_is_bounded():
+    cache = VerifiedTokenCache(max_size=1)
+    cache.set('first', {'sub': '1', 'exp': time.time() + 60})
+    cache.set('second', {'sub': '2', 'exp': time.time() + 60})
+
+    assert cache.get('first') is None
+    assert cache.evictions == 1
+
+
+async def test_verified_token_is_cached_only_for_existing_user(sqlite_uow, user, token_store):
+    token_cache = VerifiedTokenCache(max_size=10)
+    missing_user_token = create_access_token({'sub': '100'})
+
+    with pytest.raises(NotFoundUser):
+        query = GetCurrentUser(missing_user_token)
+        await get_current_user(query, sqlite_uow, current_user_cache(), token_cache, token_store)
+
+    with pytest.raises(TokenIsInvalid):
+        query = GetCurrentUser('garbage')
+        await get_current_user(query, sqlite_uow, current_user_cache(), token_cache, token_store)
+
+    query = GetCurrentUser(create_access_token({'sub': '1'}))
+    await get_current_user(query, sqlite_uow, current_user_cache(), token_cache, token_store)
+
+    assert token_cache.metrics_snapshot()['size'] == 1
+
+
+async def test_profile_claims_answer_without_database(sqlite_uow, user, token_store, monkeypatch):
+    monkeypatch.setattr('backend.users.service_layer.auth.settings.USERS_TOKEN_PROFILE_CLAIMS', True)
+    token_cache = VerifiedTokenCache(max_size=10)
+    query = GetCurrentUser(create_user_access_token(USER_DATA))
+
+    assert await get_current_user(query, sqlite_uow, current_user_cache(), token_cache, token_store) == USER_DATA
+
+    sqlite_uow.session_factory = None
+
+    assert await get_current_user(query, sqlite_uow, current_user_cache(), token_cache, token_store) == USER_DATA
+    assert token_cache.hits == 1
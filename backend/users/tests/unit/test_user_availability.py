@@ -0,0 +1,182 @@
+import pytest
+from redis.exceptions import ConnectionError
+
+from backend.bootstrap import bootstrap
+from backend.core.adapters.bloom import CountingBloomFilter
+from backend.core.service_layer.unit_of_work import SqlAlchemyUnitOfWork, make_session_factory
+from backend.users.adapters.availability import InMemoryUserAvailabilityFilter, RedisUserAvailabilityFilter
+from backend.users.domain.commands import DeleteUserById, RebuildUserAvailabilityFilter, RegisterUser
+from backend.users.domain.queries import CheckUserAvailability
+from backend.users.exceptions import BadRequest
+
+
+class FakeBitsPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args) for name, args in self.commands]
+
+
+class FakeBitsRedis:
+    """Битовые строки Redis в словаре множеств установленных битов; скрипт добавления повторён на python."""
+
+    def __init__(self):
+        self.keys: dict[str, set] = {}
+        self.fail = False
+
+    def pipeline(self, transaction):
+        return FakeBitsPipeline(self)
+
+    def register_script(self, script):
+        async def add(keys, args):
+            for key in keys:
+                if key in self.keys:
+                    self.keys[key].update(args)
+
+        return add
+
+    async def set(self, key, value, nx, ex):
+        if key in self.keys:
+            return None
+
+        self.keys[key] = set()
+
+        return True
+
+    async def exists(self, key):
+        if self.fail:
+            raise ConnectionError
+
+        return int(key in self.keys)
+
+    async def setbit(self, key, position, value):
+        bits = self.keys.setdefault(key, set())
+
+        if value:
+            bits.add(position)
+
+    async def getbit(self, key, position):
+        return int(position in self.keys.get(key, ()))
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.keys.pop(key, None)
+
+    async def rename(self, key, new_key):
+        self.keys[new_key] = self.keys.pop(key)
+
+
+async def users_stream(*users_data):
+    for user_data in users_data:
+        yield user_data
+
+
+@pytest.fixture
+def availability_filter():
+    return InMemoryUserAvailabilityFilter(capacity=1000, error_rate=0.01)
+
+
+@pytest.fixture
+def bus(sqlite_engine, availability_filter):
+    session_factory = make_session_factory(sqlite_engine)
+
+    return bootstrap(
+        uow_factory=lambda: SqlAlchemyUnitOfWork(session_factory=session_factory, replica_router=None),
+        publish=lambda *args: None,
+        availability_filter=availability_filter,
+    )
+
+
+def test_counting_bloom_filter_has_no_false_negatives_and_supports_remove():
+    bloom = CountingBloomFilter(capacity=1000, error_rate=0.01)
+    items = [f'item-{number}' for number in range(1000)]
+
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    assert sum(f'other-{number}' in bloom for number in range(10000)) < 300
+
+    for item in items:
+        bloom.remove(item)
+
+    assert not any(item in bloom for item in items)
+
+
+async def test_free_values_are_answered_by_filter_without_database(bus, availability_filter):
+    await bus.handle(RegisterUser(tag='@taken', email='taken@mail.ru', password='password'))
+    await bus.handle(RebuildUserAvailabilityFilter())
+
+    availability = await bus.handle(CheckUserAvailability(email='free@mail.ru', tag='@free'))
+
+    assert availability == {'email': True, 'tag': True}
+    assert availability_filter.filter_answers == 2
+    assert availability_filter.database_checks == 0
+
+    availability = await bus.handle(CheckUserAvailability(email='taken@mail.ru', tag='@free'))
+
+    assert availability == {'email': False, 'tag': True}
+    assert availability_filter.database_checks == 1
+
+
+async def test_filter_follows_register_and_delete(bus, availability_filter):
+    await bus.handle(RebuildUserAvailabilityFilter())
+    await bus.handle(RegisterUser(tag='@new', email='new@mail.ru', password='password'))
+
+    assert await bus.handle(CheckUserAvailability(tag='@new')) == {'tag': False}
+
+    await bus.handle(DeleteUserById(id=1))
+
+    assert not await availability_filter.might_be_taken(tag='@new')
+
+
+async def test_database_is_used_until_filter_is_built(bus, availability_filter):
+    assert await bus.handle(CheckUserAvailability(email='free@mail.ru')) == {'email': True}
+    assert availability_filter.database_checks == 1
+
+    with pytest.raises(BadRequest):
+        await bus.handle(CheckUserAvailability())
+
+
+async def test_redis_filter_is_shared_between_workers():
+    redis = FakeBitsRedis()
+    first, second = (
+        RedisUserAvailabilityFilter(redis, capacity=1000, error_rate=0.01, rebuild_interval=600) for _ in range(2)
+    )
+
+    await first.add(email='early@mail.ru', tag='@early')
+
+    assert await second.might_be_taken(email='early@mail.ru')
+    assert not second.ready
+
+    await first.rebuild(users_stream({'email': 'taken@mail.ru', 'tag': '@taken'}))
+    await second.rebuild(users_stream())
+    await second.add(email='new@mail.ru', tag='@new')
+
+    assert await first.might_be_taken(email='new@mail.ru')
+    assert await first.might_be_taken(tag='@taken')
+    assert not await first.might_be_taken(email='free@mail.ru', tag='@free')
+    assert not await second.might_be_taken(email='free@mail.ru')
+    assert second.ready
+
+
+async def test_redis_filter_falls_back_to_database_on_errors():
+    redis = FakeBitsRedis()
+    availability_filter = RedisUserAvailabilityFilter(redis, capacity=1000, error_rate=0.01, rebuild_interval=600)
+    await availability_filter.rebuild(users_stream())
+
+    redis.fail = True
+
+    assert await availability_filter.might_be_taken(email='free@mail.ru')
+    assert availability_filter.metrics_snapshot()['redis_errors'] == 1
@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+import pytest
+from redis.exceptions import ConnectionError
+
+from backend.bootstrap import bootstrap
+from backend.core.adapters.cache import InMemoryCache, RedisCache
+from backend.core.adapters.local_cache import StaleWhileRevalidateCache
+from backend.core.adapters.notifications import AbstractNotifications
+from backend.core.service_layer.unit_of_work import SqlAlchemyUnitOfWork, make_session_factory
+from backend.users.domain.commands import DeleteUserById, DeleteUsersByEmails, RegisterUser
+from backend.users.domain.events import DeletedUser
+from backend.users.domain.queries import GetUserByEmail, GetUserById
+from backend.users.exceptions import NotFoundUser
+from backend.users.adapters.token_cache import VerifiedTokenCache
+from backend.users.orm.models import Users
+
+
+class FakeNotifications(AbstractNotifications):
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, destination, message):
+        self.sent.append((destination, message))
+
+
+class UnavailableRedis:
+    """Redis, который отвечает ошибкой соединения или зависает на hang секунд."""
+
+    def __init__(self, hang: float = 0):
+        self.hang = hang
+
+    async def _call(self, *args, **kwargs):
+        if self.hang:
+            await asyncio.sleep(self.hang)
+
+        raise ConnectionError
+
+    get = set = delete = _call
+
+
+@pytest.fixture
+def cache():
+    return InMemoryCache()
+
+
+@pytest.fixture
+def bus(sqlite_engine, cache):
+    session_factory = make_session_factory(sqlite_engine)
+
+    return bootstrap(
+        uow_factory=lambda: SqlAlchemyUnitOfWork(session_factory=session_factory, replica_router=None, cache=cache),
+        notifications=FakeNotifications(),
+        publish=lambda *args: None,
+        cache=cache,
+    )
+
+
+async def add_user(bus, number):
+    await bus.handle(RegisterUser(tag=f'@{number}', email=f'{number}@mail.ru', password='password'))
+
+
+async def test_lookup_is_served_from_cache_after_first_query(bus, cache, sqlite_engine):
+    await add_user(bus, 1)
+
+    first = await bus.handle(GetUserById(id=1))
+
+    async with make_session_factory(sqlite_engine)() as session:
+        user = await session.get(Users, 1)
+        user.tag = '@changed'
+        await session.commit()
+
+    second = await bus.handle(GetUserById(id=1))
+
+    assert first == second
+    assert cache.stats.hits == 1
+
+
+async def test_missing_user_is_cached_and_invalidated_on_register(bus, cache):
+    with pytest.raises(NotFoundUser):
+        await bus.handle(GetUserByEmail(email='1@mail.ru'))
+
+    with pytest.raises(NotFoundUser):
+        await bus.handle(GetUserByEmail(email='1@mail.ru'))
+
+    assert cache.stats.negative_hits == 1
+
+    await add_user(bus, 1)
+
+    assert (await bus.handle(GetUserByEmail(email='1@mail.ru')))['tag'] == '@1'
+
+
+async def test_delete_commands_invalidate_cached_user(bus, cache):
+    await add_user(bus, 1)
+    await add_user(bus, 2)
+    await bus.handle(GetUserById(id=1))
+    await bus.handle(GetUserByEmail(email='2@mail.ru'))
+
+    await bus.handle(DeleteUserById(id=1))
+    await bus.handle(DeleteUsersByEmails(emails=['2@mail.ru']))
+
+    with pytest.raises(NotFoundUser):
+        await bus.handle(GetUserById(id=1))
+
+    with pytest.raises(NotFoundUser):
+        await bus.handle(GetUserByEmail(email='2@mail.ru'))
+
+
+async def test_in_memory_cache_evicts_least_recently_used_keys():
+    cache = InMemoryCache(max_size=2)
+
+    await cache.set('first', '1', ttl=60)
+    await cache.set('second', '2', ttl=60)
+    await cache.get('first')
+    await cache.set('third', '3', ttl=60)
+
+    assert await cache.get('second') is None
+    assert await cache.get('first') == '1'
+    assert cache.stats.evictions == 1
+
+
+@pytest.mark.parametrize('redis', [UnavailableRedis(), UnavailableRedis(hang=10)])
+async def test_unavailable_cache_falls_through_to_database(sqlite_engine, redis):
+    cache = RedisCache(redis, timeout=0.05)
+    session_factory = make_session_factory(sqlite_engine)
+    bus = bootstrap(
+        uow_factory=lambda: SqlAlchemyUnitOfWork(session_factory=session_factory, replica_router=None, cache=cache),
+        notifications=FakeNotifications(),
+        publish=lambda *args: None,
+        cache=cache,
+    )
+
+    await add_user(bus, 1)
+
+    assert (await bus.handle(GetUserById(id=1)))['tag'] == '@1'
+    assert cache.stats.errors == 3
+    assert cache.stats.hits == cache.stats.invalidations == 0
+
+
+async def test_deletion_published_by_another_process_evicts_worker_caches(sqlite_engine):
+    current_user_cache = StaleWhileRevalidateCache(max_size=10, ttl=60, stale_ttl=60)
+    token_cache = VerifiedTokenCache(max_size=10)
+    session_factory = make_session_factory(sqlite_engine)
+    bus = bootstrap(
+        uow_factory=lambda: SqlAlchemyUnitOfWork(session_factory=session_factory, replica_router=None),
+        notifications=FakeNotifications(),
+        publish=lambda *args: None,
+        current_user_cache=current_user_cache,
+        token_cache=token_cache,
+    )
+    current_user_cache.set(1, {'id': 1, 'tag': '@1'})
+    token_cache.set('token', {'sub': '1', 'exp': time.time() + 60})
+
+    await bus.handle_worker_event(DeletedUser(id=1, email='1@mail.ru', tag='@1'))
+
+    assert current_user_cache.get(1) is None
+    assert token_cache.get('token') is None
@@ -0,0 +1,71 @@
+import pytest
+
+from backend.users.domain.queries import GetUsersByFilter
+from backend.users.exceptions import BadRequest
+from backend.users.service_layer.handlers import get_users_by_filter
+from backend.users.service_layer.helpers import encode_cursor
+from backend.users.tests.conftest import add_users
+
+
+def users_filter(id=None, tag=None, email=None, role_id=None, **params):
+    return GetUsersByFilter(id, tag, email, role_id, **params)
+
+
+async def walk_pages(uow, **params):
+    pages = []
+    cursor = None
+
+    while True:
+        page = await get_users_by_filter(users_filter(cursor=cursor, **params), uow)
+        pages.append([user['id'] for user in page['items']])
+        cursor = page['next_cursor']
+
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize('sort, expected', [('id', list(range(1, 8))), ('-id', list(range(7, 0, -1)))])
+async def test_pages_cover_all_users_in_order(sqlite_uow, sort, expected):
+    await add_users(sqlite_uow, 7, roles=3)
+
+    pages = await walk_pages(sqlite_uow, sort=sort, limit=3)
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert sum(pages, []) == expected
+
+
+async def test_not_unique_sort_key_is_tied_by_id(sqlite_uow):
+    await add_users(sqlite_uow, 7, roles=3)
+
+    pages = await walk_pages(sqlite_uow, sort='-role_id', limit=2)
+
+    assert sum(pages, []) == [6, 3, 5, 2, 7, 4, 1]
+
+
+async def test_filters_apply_to_every_page(sqlite_uow):
+    await add_users(sqlite_uow, 7, roles=3)
+
+    pages = await walk_pages(sqlite_uow, role_id=1, limit=2)
+
+    assert pages == [[1, 4], [7]]
+
+
+@pytest.mark.parametrize('cursor', ['garbage', encode_cursor('-id', 3), encode_cursor('id')])
+async def test_invalid_cursor_is_rejected(sqlite_uow, cursor):
+    with pytest.raises(BadRequest):
+        await get_users_by_filter(users_filter(cursor=cursor, sort='id'), sqlite_uow)
+
+
+@pytest.mark.parametrize('sort, after', [
+    ('role_id', [1]),
+    ('role_id', [1, 2, 3]),
+    ('role_id', [1, 'abc']),
+    ('id', ['abc']),
+    ('id', [{'id': 1}]),
+    ('id', [True]),
+    ('tag', [1]),
+    ('-email', [None]),
+])
+async def test_cursor_key_not_matching_sort_columns_is_rejected(sqlite_uow, sort, after):
+    with pytest.raises(BadRequest):
+        await get_users_by_filter(users_filter(cursor=encode_cursor(sort, *after), sort=sort), sqlite_uow)
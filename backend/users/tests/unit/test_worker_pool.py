@@ -0,0 +1,57 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend.core.adapters.worker_pool import WorkerPool, WorkerPoolSaturated
+
+
+async def test_run_returns_result_and_records_timings():
+    pool = WorkerPool(max_workers=1, max_queue=1)
+
+    assert await pool.run(sum, [1, 2, 3]) == 6
+
+    metrics = pool.metrics_snapshot()
+    pool.shutdown()
+
+    assert metrics['completed'] == 1
+    assert metrics['in_flight'] == 0
+    assert metrics['queue_wait_seconds']['count'] == metrics['run_seconds']['count'] == 1
+
+
+async def test_saturated_pool_rejects_without_queueing():
+    pool = WorkerPool(max_workers=1, max_queue=1)
+    release = threading.Event()
+    running = [asyncio.create_task(pool.run(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(WorkerPoolSaturated):
+        await pool.run(sum, [1])
+
+    release.set()
+    await asyncio.gather(*running)
+    metrics = pool.metrics_snapshot()
+    pool.shutdown()
+
+    assert metrics['rejected'] == 1
+    assert metrics['completed'] == 2
+    assert metrics['queue_wait_seconds']['sum'] > 0
+
+
+async def test_event_loop_is_not_blocked_while_hashing(password_hasher):
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    ticking = asyncio.create_task(ticker())
+    password_hash = await password_hasher.hash('password')
+    ticking.cancel()
+
+    assert ticks > 5
+    assert await password_hasher.verify('password', password_hash)
+    assert not await password_hasher.verify('wrong', password_hash)